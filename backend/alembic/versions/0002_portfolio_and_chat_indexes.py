@@ -0,0 +1,42 @@
+"""Portfolio and chat lookup indexes
+
+Foreign-key and ordering indexes for the hot read paths: portfolio views
+(items by portfolio ordered by order_index), a user's portfolios,
+conversation history and share lookups. Built with CREATE INDEX
+CONCURRENTLY on PostgreSQL so large tables stay writable.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from app.db.migrations import create_index_online, drop_index_online
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_portfolios_user_id', 'portfolios', ['user_id']),
+    ('ix_projects_portfolio_order', 'projects', ['portfolio_id', 'order_index']),
+    ('ix_skills_portfolio_order', 'skills', ['portfolio_id', 'order_index']),
+    ('ix_experiences_portfolio_order', 'experiences', ['portfolio_id', 'order_index']),
+    ('ix_conversations_user_id', 'conversations', ['user_id']),
+    ('ix_messages_conversation_created', 'messages', ['conversation_id', 'created_at']),
+    ('ix_shares_portfolio_id', 'shares', ['portfolio_id']),
+]
+
+
+def upgrade() -> None:
+    for index_name, table_name, columns in INDEXES:
+        create_index_online(index_name, table_name, columns)
+
+
+def downgrade() -> None:
+    for index_name, table_name, _ in reversed(INDEXES):
+        drop_index_online(index_name, table_name)
@@ -0,0 +1,51 @@
+"""Per-user storage usage
+
+Running byte and file totals per user, kept in step with uploads so quota
+checks don't walk the upload tree. Files uploaded before this revision are
+counted from storage, so deleting one can't take a user below their real
+usage.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 14:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('storage_usage',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('bytes_used', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('file_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    from app.services.storage import get_storage
+    from app.services.upload_migration import migrate_layout, write_usage
+
+    try:
+        _, totals = migrate_layout(get_storage(), dry_run=True)
+    except Exception as e:
+        # Listing storage is the only step outside the database; don't fail the schema change over it
+        print(f"⚠️ Existing uploads not counted ({e}); run 'python -m app.services.upload_migration'")
+        return
+    counted, _ = write_usage(op.get_bind(), totals)
+    if counted:
+        print(f"📦 Counted existing uploads of {len(counted)} users")
+
+
+def downgrade() -> None:
+    op.drop_table('storage_usage')
@@ -0,0 +1,30 @@
+"""Truncated chat replies
+
+Marks assistant messages that were cut short because the visitor left or
+the request's deadline passed, so the partial text isn't mistaken for a
+complete answer.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 16:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('messages', sa.Column('is_truncated', sa.Boolean(), server_default=sa.false(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('messages', 'is_truncated')
@@ -3,6 +3,7 @@ Authentication Routes
 Handles user signup, login, token refresh, and logout
 """
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from datetime import datetime
 
@@ -10,8 +11,15 @@ from app.db.session import get_db
 from app.schemas.auth import Token, LoginRequest, RefreshTokenRequest
 from app.schemas.user import UserCreate, UserResponse
 from app.models.user import User
-from app.core.security import verify_password, get_password_hash, create_access_token, create_refresh_token
-from app.core.deps import get_current_user
+from app.core.security import verify_password, get_password_hash, decode_token
+from app.core.deps import get_current_user, security
+from app.services.tokens import (
+    RefreshTokenError,
+    RefreshTokenReuseError,
+    issue_tokens,
+    revoke_access_token,
+    rotate_refresh_token,
+)
 
 router = APIRouter()
 
@@ -94,19 +102,12 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
             detail="Account is inactive. Please contact support."
         )
     
-    # Update last login
+    # Update last login and start a new refresh token family
     user.last_login = datetime.utcnow()
+    tokens = issue_tokens(db, user)
     db.commit()
     
-    # Create tokens
-    access_token = create_access_token(data={"sub": str(user.id), "role": user.role.value})
-    refresh_token = create_refresh_token(data={"sub": str(user.id)})
-    
-    return {
-        "access_token": access_token,
-        "refresh_token": refresh_token,
-        "token_type": "bearer"
-    }
+    return tokens
 
 
 @router.post("/refresh", response_model=Token)
@@ -114,44 +115,24 @@ async def refresh_token(refresh_data: RefreshTokenRequest, db: Session = Depends
     """
     Get new access token using refresh token
     
-    Use this when access token expires (after 30 minutes)
+    Use this when access token expires (after 30 minutes). Each refresh token
+    works once: the response contains its replacement. Reusing an old refresh
+    token signs out every session started from the same login.
     """
-    from app.core.security import decode_token
-    
     try:
-        # Decode refresh token
-        payload = decode_token(refresh_data.refresh_token)
-        user_id = payload.get("sub")
-        
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid refresh token"
-            )
-        
-        # Get user
-        user = db.query(User).filter(User.id == int(user_id)).first()
-        if not user or not user.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found or inactive"
-            )
-        
-        # Create new tokens
-        new_access_token = create_access_token(data={"sub": str(user.id), "role": user.role.value})
-        new_refresh_token = create_refresh_token(data={"sub": str(user.id)})
-        
-        return {
-            "access_token": new_access_token,
-            "refresh_token": new_refresh_token,
-            "token_type": "bearer"
-        }
-        
-    except Exception as e:
+        _, tokens = rotate_refresh_token(db, refresh_data.refresh_token)
+    except RefreshTokenReuseError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token reuse detected, please log in again"
+        )
+    except RefreshTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired refresh token"
         )
+    
+    return tokens
 
 
 @router.get("/me", response_model=UserResponse)
@@ -165,17 +146,18 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 
 @router.post("/logout")
-async def logout(current_user: User = Depends(get_current_user)):
+async def logout(
+    current_user: User = Depends(get_current_user),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+):
     """
     Logout current user
     
-    Note: Since we're using JWT (stateless), actual logout happens on client side
-    by deleting the token. This endpoint is for logging the logout event.
+    Revokes the access token and every refresh token from the same login,
+    so neither can be used again.
     """
-    # In a production app, you might want to:
-    # - Add token to blacklist
-    # - Log the logout event
-    # - Clear any server-side sessions
+    revoke_access_token(db, decode_token(credentials.credentials))
     
     return {
         "message": "Successfully logged out",
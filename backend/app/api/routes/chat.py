@@ -0,0 +1,376 @@
+"""
+Chat Routes
+Real-time AI chat over a WebSocket
+
+Protocol (JSON text frames):
+
+    client → server
+        {"type": "auth", "token": "<access token>"}          first frame, once
+        {"type": "start", "portfolio_id": 1}                  or "slug" / "conversation_id"
+        {"type": "message", "content": "...", "triggered_by_voice": false, "timeout": 20}
+        {"type": "ping"}
+
+    server → client
+        {"type": "ready", "user_id": 1}
+        {"type": "conversation", "conversation_id": 3, "portfolio_id": 1, "history": [...]}
+        {"type": "typing", "is_typing": true}
+        {"type": "token", "content": "..."}                  streamed reply text
+        {"type": "done", "conversation_id": 3}               "degraded" / "truncated": true, see below
+        {"type": "error", "detail": "...", "retry_after": 6}  retry_after only when rate limited
+        {"type": "pong"}
+
+When the LLM circuit breaker is open, the call waited past its scheduler
+deadline, or the completion fails before any text arrived, the reply is a
+fallback (an earlier answer to the same question or matching portfolio
+lines; see app.services.chat_fallback) streamed as a single token frame,
+and "done" carries "degraded": true.
+
+A reply has a time budget: the message's "timeout" (seconds), else the
+handshake's X-Request-Timeout header. When it runs out mid-answer, or the
+client disconnects, the upstream completion is closed (generation stops and
+its scheduler slot is freed) and the text so far is saved as a truncated
+message; "done" then carries "truncated": true.
+
+The access token from the auth frame is re-checked (expiry and revocation)
+on every later frame; once it is no longer valid the socket is closed with
+4401 and the client must reconnect with a fresh token.
+"""
+import asyncio
+import json
+import math
+from contextlib import aclosing
+from typing import Callable, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from sqlalchemy.orm import Session
+
+from app.core.circuit_breaker import CircuitOpenError
+from app.core.config import settings
+from app.core.deadlines import deadline_after, parse_timeout, timeout_from_headers
+from app.core.deps import access_token_claims, user_from_token
+from app.core.ratelimit import get_rate_limiter
+from app.core.tracing import Span, span
+from app.db.session import get_session_factory
+from app.services.chat import ChatAccessError, ChatSession
+from app.services.chat_fallback import FALLBACK_MODEL, AnswerCache, fallback_answer, get_answer_cache
+from app.services.llm import LLMClient, get_llm
+from app.services.llm_scheduler import DeadlineExceeded
+from app.services.message_writer import MessageWriter, get_message_writer
+
+router = APIRouter()
+
+# Application close codes (4000-4999)
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_AUTH_TIMEOUT = 4408
+CLOSE_SLOW_CONSUMER = 4429
+
+WS_PATH = "/api/chat/ws"  # Rate limit rules are matched against this path
+
+
+class ChatConnection:
+    """
+    Protocol handler for one authenticated socket
+
+    Backpressure works at both ends:
+    - Inbound: user messages queue up to CHAT_WS_MAX_PENDING while a reply
+      is generating; beyond that the client gets a "busy" error.
+    - Outbound: model tokens go through a bounded buffer. When the client
+      reads slowly the buffer fills and the model stream is paused; whatever
+      has accumulated is sent as one frame. A client that stalls for
+      CHAT_WS_SEND_TIMEOUT is disconnected.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        session: ChatSession,
+        llm: LLMClient,
+        token: str,
+        answers: Optional[AnswerCache] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.websocket = websocket
+        self.session = session
+        self.llm = llm
+        self.token = token  # Re-checked on every frame
+        self.user_id = session.user_id
+        self.answers = answers or get_answer_cache()
+        self.timeout = timeout  # Default reply budget, from the handshake headers
+        self.limiter = get_rate_limiter()
+        self.inbox: asyncio.Queue = asyncio.Queue(maxsize=settings.CHAT_WS_MAX_PENDING)
+        self.broken = False
+
+    async def send(self, payload: dict) -> None:
+        await asyncio.wait_for(
+            self.websocket.send_text(json.dumps(payload)),
+            timeout=settings.CHAT_WS_SEND_TIMEOUT,
+        )
+
+    async def error(self, detail: str, **extra) -> None:
+        await self.send({"type": "error", "detail": detail, **extra})
+
+    async def run(self) -> None:
+        worker = asyncio.create_task(self._process_inbox())
+        try:
+            await self._receive_loop()
+        finally:
+            worker.cancel()
+            try:
+                await worker
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    async def _receive_loop(self) -> None:
+        while not self.broken:
+            try:
+                raw = await asyncio.wait_for(
+                    self.websocket.receive_text(), timeout=settings.CHAT_WS_IDLE_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                await self.websocket.close(code=1000, reason="Idle timeout")
+                return
+            except WebSocketDisconnect:
+                return
+
+            try:
+                frame = json.loads(raw)
+                frame_type = frame.get("type")
+            except (ValueError, AttributeError):
+                await self.error("Frames must be JSON objects")
+                continue
+
+            if not await self._authorized():
+                return
+            if frame_type == "ping":
+                await self.send({"type": "pong"})
+            elif frame_type == "start":
+                await self._enqueue(frame)
+            elif frame_type == "message":
+                content = frame.get("content")
+                if not isinstance(content, str) or not content.strip():
+                    await self.error("Message content is required")
+                elif len(content) > settings.CHAT_MAX_MESSAGE_CHARS:
+                    await self.error(f"Messages are limited to {settings.CHAT_MAX_MESSAGE_CHARS} characters")
+                else:
+                    try:
+                        timeout = parse_timeout(frame.get("timeout")) or self.timeout
+                    except (TypeError, ValueError) as e:
+                        await self.error(str(e))
+                        continue
+                    if await self._allowed():
+                        # The budget starts now, so time spent queued behind earlier messages counts
+                        await self._enqueue({**frame, "deadline": deadline_after(timeout)})
+            else:
+                await self.error(f"Unknown frame type {frame_type!r}")
+
+    async def _authorized(self) -> bool:
+        """The token may have expired or been revoked since the socket opened"""
+        try:
+            access_token_claims(self.token)
+        except HTTPException as e:
+            self.broken = True
+            await self.websocket.close(code=CLOSE_UNAUTHORIZED, reason=e.detail)
+            return False
+        return True
+
+    async def _allowed(self) -> bool:
+        """Apply the chat rate limits to each message, as for HTTP requests"""
+        client = self.websocket.client
+        rejection = await self.limiter.check(
+            "MESSAGE", WS_PATH, str(self.user_id), client.host if client else None
+        )
+        if rejection is None:
+            return True
+        _, result = rejection
+        await self.error("Too many requests", retry_after=max(1, math.ceil(result.retry_after)))
+        return False
+
+    async def _enqueue(self, frame: dict) -> None:
+        try:
+            self.inbox.put_nowait(frame)
+        except asyncio.QueueFull:
+            await self.error("Still answering earlier messages, please wait")
+
+    async def _process_inbox(self) -> None:
+        """Handle queued frames strictly in order, one at a time"""
+        while True:
+            frame = await self.inbox.get()
+            try:
+                if frame["type"] == "start":
+                    await self._open(frame)
+                else:
+                    await self._reply(frame)
+            except (WebSocketDisconnect, RuntimeError, asyncio.TimeoutError):
+                self.broken = True
+                return
+
+    async def _open(self, frame: dict) -> None:
+        try:
+            with span("chat.open"):
+                state = await asyncio.to_thread(
+                    self.session.open,
+                    conversation_id=frame.get("conversation_id"),
+                    portfolio_id=frame.get("portfolio_id"),
+                    slug=frame.get("slug"),
+                )
+        except ChatAccessError as e:
+            await self.error(str(e))
+            return
+        await self.send({"type": "conversation", **state})
+
+    async def _reply(self, frame: dict) -> None:
+        # One span per message; its stages (persistence, queueing, first token, ...) nest inside
+        with span("chat.message", conversation_id=self.session.conversation_id) as message_span:
+            await self._answer(frame, message_span)
+
+    async def _answer(self, frame: dict, message_span: Span) -> None:
+        question = frame["content"]
+        with span("chat.persist_user"):
+            await asyncio.to_thread(
+                self.session.add_user_message,
+                question,
+                bool(frame.get("triggered_by_voice", False)),
+            )
+        await self.send({"type": "typing", "is_typing": True})
+
+        deadline = frame.get("deadline")
+        outbox: asyncio.Queue = asyncio.Queue(maxsize=settings.CHAT_WS_SEND_BUFFER)
+        writer = asyncio.create_task(self._drain(outbox))
+        parts = []
+        failed = truncated = False
+        budget = asyncio.timeout_at(deadline)
+        try:
+            async with budget:
+                # aclosing: leaving early closes the upstream completion instead of letting it run on
+                async with aclosing(
+                    self.llm.stream(self.session.prompt(), flow=self.session.candidate_id, deadline=deadline)
+                ) as tokens:
+                    async for token in tokens:
+                        if self.broken:
+                            truncated = True
+                            break
+                        parts.append(token)
+                        await outbox.put(token)  # Waits here while the client catches up
+        except (CircuitOpenError, DeadlineExceeded):
+            failed = True  # Known overload or outage; no need to log every rejected chat
+        except TimeoutError as e:
+            if not budget.expired():
+                print(f"❌ Chat completion failed: {e!r}")
+            truncated = bool(parts)
+            failed = not parts
+        except asyncio.CancelledError:
+            # The client disconnected mid-answer; keep what was said so far. Queued
+            # directly rather than from a thread: a cancelled task can't rely on awaiting,
+            # and it must not block the loop either, so a full queue drops it
+            writer.cancel()
+            if parts:
+                self.session.add_ai_message("".join(parts), self.llm.model, truncated=True, block=False)
+            raise
+        except Exception as e:
+            print(f"❌ Chat completion failed: {e}")
+            failed = True
+        await outbox.put(None)
+        await writer
+
+        if self.broken:
+            if parts:
+                await asyncio.to_thread(self.session.add_ai_message, "".join(parts), self.llm.model, True)
+            return
+
+        done = {"type": "done", "conversation_id": self.session.conversation_id}
+        if failed and not parts:
+            with span("chat.fallback"):
+                answer = fallback_answer(self.answers, self.session.portfolio_id, question, self.session.context_lines)
+            await self.send({"type": "token", "content": answer})
+            with span("chat.persist_reply"):
+                await asyncio.to_thread(self.session.add_ai_message, answer, FALLBACK_MODEL)
+            done["degraded"] = True
+        elif parts:
+            answer = "".join(parts)
+            with span("chat.persist_reply"):
+                await asyncio.to_thread(self.session.add_ai_message, answer, self.llm.model, truncated)
+            if truncated:
+                done["truncated"] = True
+            elif not failed:
+                self.answers.put(self.session.portfolio_id, question, answer)
+        await self.send({"type": "typing", "is_typing": False})
+        if failed and parts:
+            await self.error("The assistant is unavailable right now, please try again")
+        message_span.set("outcome", "degraded" if "degraded" in done else "truncated" if truncated else "ok")
+        await self.send(done)
+
+    async def _drain(self, outbox: asyncio.Queue) -> None:
+        """Send buffered tokens, batching whatever piled up into one frame"""
+        while True:
+            token = await outbox.get()
+            finished = token is None
+            chunk = [] if finished else [token]
+            while not finished and not outbox.empty():
+                token = outbox.get_nowait()
+                finished = token is None
+                if not finished:
+                    chunk.append(token)
+
+            if chunk and not self.broken:
+                try:
+                    await self.send({"type": "token", "content": "".join(chunk)})
+                except asyncio.TimeoutError:
+                    # Keep consuming so the producer never blocks on a dead client
+                    self.broken = True
+                    await self.websocket.close(code=CLOSE_SLOW_CONSUMER, reason="Client too slow")
+                except (WebSocketDisconnect, RuntimeError):
+                    self.broken = True
+            if finished:
+                return
+
+
+@router.websocket("/ws")
+async def chat_socket(
+    websocket: WebSocket,
+    session_factory: Callable[[], Session] = Depends(get_session_factory),
+    llm: LLMClient = Depends(get_llm),
+    writer: MessageWriter = Depends(get_message_writer),
+    answers: AnswerCache = Depends(get_answer_cache)
+):
+    """
+    AI chat over a WebSocket
+
+    Authenticates with the first frame, then keeps the conversation,
+    history and portfolio context in memory for the life of the socket.
+    No database session is held in between; each step opens its own.
+    """
+    await websocket.accept()
+
+    try:
+        raw = await asyncio.wait_for(websocket.receive_text(), timeout=settings.CHAT_WS_AUTH_TIMEOUT)
+        frame = json.loads(raw)
+        token = frame.get("token") if frame.get("type") == "auth" else None
+    except asyncio.TimeoutError:
+        await websocket.close(code=CLOSE_AUTH_TIMEOUT, reason="Authentication timed out")
+        return
+    except WebSocketDisconnect:
+        return
+    except (ValueError, AttributeError):
+        token = None
+
+    if not token:
+        await websocket.close(code=CLOSE_UNAUTHORIZED, reason="First frame must be an auth frame")
+        return
+
+    def authenticate() -> int:
+        with session_factory() as db:
+            return user_from_token(token, db).id
+
+    try:
+        with span("chat.auth"):
+            user_id = await asyncio.to_thread(authenticate)
+    except HTTPException as e:
+        await websocket.close(code=CLOSE_UNAUTHORIZED, reason=e.detail)
+        return
+
+    session = ChatSession(session_factory, user_id, history_limit=settings.CHAT_HISTORY_MESSAGES, writer=writer)
+    connection = ChatConnection(
+        websocket, session, llm, token, answers, timeout=timeout_from_headers(websocket.headers)
+    )
+    await connection.send({"type": "ready", "user_id": session.user_id})
+    await connection.run()
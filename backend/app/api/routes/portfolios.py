@@ -0,0 +1,130 @@
+"""
+Portfolio Routes
+Public portfolio views and bulk import/export
+"""
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.core.compression import content_etag, etag_matches
+from app.core.config import settings
+from app.core.deps import get_current_user, get_optional_user, get_read_db
+from app.core.singleflight import SingleFlight
+from app.db.session import get_db
+from app.models.portfolio import Portfolio, PortfolioVisibility
+from app.models.user import User
+from app.schemas.portfolio import PortfolioImport, PortfolioImportResult, PortfolioResponse
+from app.services.portfolio_bulk import import_items, iter_portfolio_ndjson
+from app.services.portfolio_serializer import dumps, load_portfolio_payload
+
+router = APIRouter()
+
+# Visitors opening the same portfolio at once share one load
+portfolio_loads = SingleFlight("portfolio")
+
+
+def _load_shared(bind, slug: str) -> Optional[dict]:
+    # Own session: the load may outlive the request that started it
+    with Session(bind=bind) as db:
+        return load_portfolio_payload(db, slug)
+
+
+@router.get("/slug/{slug}", response_model=PortfolioResponse)
+async def get_portfolio(
+    slug: str,
+    request: Request,
+    current_user: Optional[User] = Depends(get_optional_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get a full portfolio by slug
+
+    - Public and unlisted portfolios are visible to everyone
+    - Private portfolios are only visible to their owner
+    - Includes projects, skills and experiences
+    - ETag / If-None-Match for revalidation (the ETag also keys the
+      compressed-body cache)
+    - Concurrent requests for the same slug share one database read
+    """
+    bind = db.get_bind()  # Primary or replica, as routed for this request
+    payload = await portfolio_loads.do(
+        (slug, id(bind)),
+        lambda: asyncio.to_thread(_load_shared, bind, slug)
+    )
+
+    is_owner = current_user is not None and payload is not None and payload["user_id"] == current_user.id
+    if payload is None or (payload["visibility"] == PortfolioVisibility.PRIVATE and not is_owner):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio not found"
+        )
+
+    # Trusted DB rows - encode directly instead of re-validating through PortfolioResponse
+    body = dumps(payload)
+    etag = content_etag(body)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache" if payload["visibility"] == PortfolioVisibility.PRIVATE else "public, no-cache"
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _require_owner(db: Session, portfolio_id: int, user: User) -> None:
+    owner_id = db.execute(select(Portfolio.user_id).where(Portfolio.id == portfolio_id)).scalar()
+    if owner_id is None or owner_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio not found"
+        )
+
+
+@router.post("/{portfolio_id}/import", response_model=PortfolioImportResult, status_code=status.HTTP_201_CREATED)
+def import_portfolio_items(
+    portfolio_id: int,
+    payload: PortfolioImport,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Add many projects, skills and experiences at once
+
+    - All items are created in one transaction (all or nothing)
+    - ``replace: true`` deletes the portfolio's existing items first
+    - At most PORTFOLIO_IMPORT_MAX_ITEMS items per request
+    """
+    total = len(payload.projects) + len(payload.skills) + len(payload.experiences)
+    if total > settings.PORTFOLIO_IMPORT_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Imports are limited to {settings.PORTFOLIO_IMPORT_MAX_ITEMS} items"
+        )
+
+    _require_owner(db, portfolio_id, current_user)
+    return import_items(db, portfolio_id, payload, batch_size=settings.PORTFOLIO_BULK_BATCH_SIZE)
+
+
+@router.get("/{portfolio_id}/export")
+def export_portfolio(
+    portfolio_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Download a portfolio as NDJSON (owner only)
+
+    The first line is the portfolio (``"type": "portfolio"``), followed by one
+    line per project, skill and experience, streamed as they are read.
+    """
+    _require_owner(db, portfolio_id, current_user)
+    # The session closes before the body streams; the generator opens its own connection
+    return StreamingResponse(
+        iter_portfolio_ndjson(db.get_bind(), portfolio_id, batch_size=settings.PORTFOLIO_BULK_BATCH_SIZE),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="portfolio-{portfolio_id}.ndjson"'}
+    )
@@ -2,27 +2,67 @@
 Upload Routes
 Handles file uploads for LinkedIn profiles, resumes, and documents
 """
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
+from fastapi import APIRouter, Depends, UploadFile, File, Form, Header, HTTPException, Request, Response, status
+from sqlalchemy import select
+from starlette.requests import ClientDisconnect
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi.responses import RedirectResponse
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+import asyncio
+import io
+import mimetypes
+import os
+import re
+import secrets
 import shutil
+import tempfile
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
 
+from app.core.config import settings
 from app.core.deps import get_current_user
+from app.core.file_response import RangeFileResponse
 from app.db.session import get_db
+from app.models.portfolio import Portfolio
 from app.models.user import User
 from app.schemas.upload import (
     UploadResponse,
+    ResumableUploadCreate,
+    ResumableUploadSession,
+    StorageUsageResponse,
     LinkedInUploadRequest,
-    LinkedInUploadResponse
+    LinkedInUploadResponse,
+    LinkedInImportResponse
 )
+from app.services.linkedin_import import LinkedInImportError, import_linkedin_export
+from app.services.resumable_uploads import (
+    ChecksumMismatch,
+    IncompleteUpload,
+    OffsetConflict,
+    ResumableUploads,
+    UploadNotFound,
+    UploadSessionError,
+    UploadTooLarge,
+    get_resumable_uploads,
+)
+from app.services.storage import (
+    StorageBackend,
+    StorageError,
+    StoredObject,
+    file_key,
+    get_storage,
+    legacy_file_key,
+    parse_file_key,
+)
+from app.services.storage_usage import QuotaExceeded, get_usage, release, reserved
+from app.services.thumbnails import content_hash, derivative_key, get_thumbnail_pipeline
 
 router = APIRouter()
 
-# Configure upload directory
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+# Local working directory: the local storage backend's files, thumbnails,
+# resumable uploads in progress and scratch copies (created on first write)
+UPLOAD_DIR = Path(settings.UPLOAD_DIR)
 
 # Allowed file types
 ALLOWED_RESUME_TYPES = {
@@ -46,6 +86,11 @@ ALLOWED_IMAGE_TYPES = {
 MAX_RESUME_SIZE = 10 * 1024 * 1024  # 10 MB
 MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5 MB
 
+THUMBNAIL_PATH = "/api/upload/thumbnails"
+FILES_PATH = "/api/upload/files"
+SESSIONS_PATH = "/api/upload/sessions"
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
 
 def validate_file_type(file: UploadFile, allowed_types: dict) -> str:
     """Validate file type and return extension"""
@@ -61,8 +106,8 @@ def validate_file_type(file: UploadFile, allowed_types: dict) -> str:
     return allowed_types[content_type]
 
 
-def validate_file_size(file: UploadFile, max_size: int) -> None:
-    """Validate file size"""
+def validate_file_size(file: UploadFile, max_size: int) -> int:
+    """Validate file size and return it"""
     file.file.seek(0, 2)  # Seek to end
     file_size = file.file.tell()
     file.file.seek(0)  # Reset to beginning
@@ -73,32 +118,119 @@ def validate_file_size(file: UploadFile, max_size: int) -> None:
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"File too large. Maximum size: {max_mb}MB"
         )
+    
+    return file_size
 
 
-def save_upload_file(file: UploadFile, user_id: int, category: str) -> str:
-    """Save uploaded file and return file path"""
-    # Create user directory
-    user_dir = UPLOAD_DIR / str(user_id) / category
-    user_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Generate unique filename
+def upload_key(user_id: int, category: str, file_name: str) -> str:
+    """
+    Storage key for a new upload: the user's category, timestamped name
+
+    The random part keeps two uploads of one name in the same second from
+    sharing a key (the second would replace the first, counted twice).
+    """
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    extension = Path(file.filename).suffix
-    filename = f"{timestamp}_{file.filename}"
-    file_path = user_dir / filename
+    return file_key(user_id, category, f"{timestamp}_{secrets.token_hex(4)}_{Path(file_name).name}")
+
+
+def validate_name(*parts: str) -> None:
+    """404 for anything but plain file and category names"""
+    for part in parts:
+        if not part or part.startswith(".") or "/" in part or "\\" in part:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="File not found"
+            )
+
+
+def find_user_file(storage: StorageBackend, user_id: int, category: str, filename: str) -> Optional[StoredObject]:
+    """One of the user's files, in the bucketed layout or (not yet migrated) the flat one"""
+    validate_name(category, filename)
+    for key in (file_key(user_id, category, filename), legacy_file_key(user_id, category, filename)):
+        stored = storage.stat(key)
+        if stored is not None:
+            return stored
+    return None
+
+
+@contextmanager
+def counted_upload(db: Session, user_id: int, size: int):
+    """Count a new file against the user's quota while it's stored; 413 when over"""
+    try:
+        with reserved(db, user_id, size, quota=settings.UPLOAD_QUOTA_BYTES):
+            yield
+    except QuotaExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+
+
+def save_upload_file(file: UploadFile, user_id: int, category: str, storage: StorageBackend) -> Tuple[str, int]:
+    """Save uploaded file and return its storage key and size"""
+    key = upload_key(user_id, category, file.filename)
+    size = storage.save(key, file.file, file.content_type)
+    return key, size
+
+
+def scratch_path() -> Path:
+    """Local file for work on uploads that live in remote storage"""
+    scratch_dir = UPLOAD_DIR / ".scratch"
+    scratch_dir.mkdir(parents=True, exist_ok=True)
+    handle, path = tempfile.mkstemp(dir=scratch_dir)
+    os.close(handle)
+    return Path(path)
+
+
+def image_derivatives(storage: StorageBackend, key: str, file: UploadFile) -> dict:
+    """Queue thumbnails for a stored image; rendering needs the image on local disk"""
+    local = storage.local_path(key)
+    if local is not None:
+        return schedule_thumbnails(str(local))
     
-    # Save file
-    with open(file_path, "wb") as buffer:
+    # Remote storage: render from a scratch copy, deleted once rendered
+    scratch = scratch_path()
+    file.file.seek(0)
+    with open(scratch, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
-    
-    return str(file_path)
+    return schedule_thumbnails(str(scratch), remove_source=True)
+
+
+def stored_file_response(path: Path, media_type: str, filename: str, inline: bool = True, headers: dict = None):
+    """Serve a file under UPLOAD_DIR, offloading to the front proxy when configured"""
+    relative = path.relative_to(UPLOAD_DIR).as_posix()
+    return RangeFileResponse(
+        path,
+        media_type=media_type,
+        filename=filename,
+        inline=inline,
+        headers=headers,
+        offload=settings.DOWNLOAD_OFFLOAD,
+        offload_uri=settings.DOWNLOAD_ACCEL_PREFIX.rstrip("/") + "/" + relative,
+    )
+
+
+def schedule_thumbnails(file_path: str, digest: Optional[str] = None, remove_source: bool = False) -> dict:
+    """Queue WebP derivatives for an uploaded image; returns response fields"""
+    pipeline = get_thumbnail_pipeline()
+    digest = digest or content_hash(file_path)
+    try:
+        pipeline.schedule(file_path, digest, remove_source=remove_source)
+    except Exception as e:
+        # The original is stored either way; thumbnails are an optimization
+        print(f"⚠️  Could not queue thumbnails for {file_path}: {e}")
+    return {
+        "content_hash": digest,
+        "thumbnails": {str(width): f"{THUMBNAIL_PATH}/{digest}/{width}.webp" for width in pipeline.widths},
+    }
 
 
 @router.post("/resume", response_model=UploadResponse)
 async def upload_resume(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage)
 ):
     """
     Upload resume file (PDF, DOCX, DOC)
@@ -112,34 +244,36 @@ async def upload_resume(
     extension = validate_file_type(file, ALLOWED_RESUME_TYPES)
     
     # Validate file size
-    validate_file_size(file, MAX_RESUME_SIZE)
+    file_size = validate_file_size(file, MAX_RESUME_SIZE)
     
-    # Save file
-    try:
-        file_path = save_upload_file(file, current_user.id, "resumes")
+    # Save file (counted against the quota; uncounted again if saving fails)
+    with counted_upload(db, current_user.id, file_size):
+        try:
+            key, size = await asyncio.to_thread(save_upload_file, file, current_user.id, "resumes", storage)
+            
+            return UploadResponse(
+                success=True,
+                message="Resume uploaded successfully",
+                file_path=storage.location(key),
+                file_name=file.filename,
+                file_type=file.content_type,
+                file_size=size,
+                category="resume"
+            )
         
-        return UploadResponse(
-            success=True,
-            message="Resume uploaded successfully",
-            file_path=file_path,
-            file_name=file.filename,
-            file_type=file.content_type,
-            file_size=Path(file_path).stat().st_size,
-            category="resume"
-        )
-    
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to upload file: {str(e)}"
-        )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to upload file: {str(e)}"
+            )
 
 
 @router.post("/documents", response_model=List[UploadResponse])
 async def upload_documents(
     files: List[UploadFile] = File(..., description="Multiple files to upload"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage)
 ):
     """
     Upload multiple document files (images, PDFs)
@@ -162,28 +296,31 @@ async def upload_documents(
             # Determine file type and validate
             if file.content_type in ALLOWED_IMAGE_TYPES:
                 extension = validate_file_type(file, ALLOWED_IMAGE_TYPES)
-                validate_file_size(file, MAX_IMAGE_SIZE)
+                file_size = validate_file_size(file, MAX_IMAGE_SIZE)
                 category = "images"
             elif file.content_type in ALLOWED_RESUME_TYPES:
                 extension = validate_file_type(file, ALLOWED_RESUME_TYPES)
-                validate_file_size(file, MAX_RESUME_SIZE)
+                file_size = validate_file_size(file, MAX_RESUME_SIZE)
                 category = "documents"
             else:
                 # Skip invalid files with warning
                 continue
             
-            # Save file
-            file_path = save_upload_file(file, current_user.id, category)
+            # Save file (off the event loop: remote storage uploads take network round trips)
+            with counted_upload(db, current_user.id, file_size):
+                key, size = await asyncio.to_thread(save_upload_file, file, current_user.id, category, storage)
+            derivatives = await asyncio.to_thread(image_derivatives, storage, key, file) if category == "images" else {}
             
             uploaded_files.append(
                 UploadResponse(
                     success=True,
                     message=f"File uploaded successfully",
-                    file_path=file_path,
+                    file_path=storage.location(key),
                     file_name=file.filename,
                     file_type=file.content_type,
-                    file_size=Path(file_path).stat().st_size,
-                    category=category
+                    file_size=size,
+                    category=category,
+                    **derivatives
                 )
             )
         
@@ -214,7 +351,8 @@ async def upload_documents(
 async def upload_linkedin_data(
     data: LinkedInUploadRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage)
 ):
     """
     Upload LinkedIn profile URL or raw data
@@ -223,6 +361,7 @@ async def upload_linkedin_data(
     - Or accepts raw LinkedIn data (JSON export)
     - Stores for AI parsing in next step
     - Returns confirmation
+    - For LinkedIn's ZIP/CSV data export use ``POST /linkedin/export``
     """
     # TODO: In next step, integrate LinkedIn scraping or parsing
     # For now, just store the URL/data
@@ -244,21 +383,18 @@ async def upload_linkedin_data(
     
     elif data.raw_data:
         # Store raw LinkedIn data
-        user_dir = UPLOAD_DIR / str(current_user.id) / "linkedin"
-        user_dir.mkdir(parents=True, exist_ok=True)
-        
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_path = user_dir / f"linkedin_data_{timestamp}.json"
-        
-        with open(file_path, "w") as f:
-            f.write(data.raw_data)
+        key = file_key(current_user.id, "linkedin", f"linkedin_data_{timestamp}_{secrets.token_hex(4)}.json")
+        raw = data.raw_data.encode()
+        with counted_upload(db, current_user.id, len(raw)):
+            await asyncio.to_thread(storage.save, key, io.BytesIO(raw), "application/json")
         
         return LinkedInUploadResponse(
             success=True,
             message="LinkedIn data received. Will be processed by AI.",
             profile_url=None,
             data_source="raw_data",
-            stored_path=str(file_path)
+            stored_path=storage.location(key)
         )
     
     else:
@@ -268,10 +404,414 @@ async def upload_linkedin_data(
         )
 
 
+@router.post("/linkedin/export", response_model=LinkedInImportResponse)
+def import_linkedin_archive(
+    file: UploadFile = File(..., description="LinkedIn data export (ZIP) or Positions/Skills/Projects CSV"),
+    portfolio_id: int = Form(...),
+    replace: bool = Form(False),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Import a LinkedIn data export into a portfolio
+    
+    - Accepts the ZIP from LinkedIn's "Get a copy of your data", or a single CSV
+    - Positions become experiences; skills and projects map directly
+    - Parsed and inserted in batches, so large exports use little memory
+    - ``replace`` clears the imported sections before adding rows
+    """
+    validate_file_size(file, settings.LINKEDIN_MAX_EXPORT_SIZE)
+    
+    owner_id = db.execute(select(Portfolio.user_id).where(Portfolio.id == portfolio_id)).scalar()
+    if owner_id is None or owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio not found"
+        )
+    
+    try:
+        result = import_linkedin_export(
+            db,
+            portfolio_id,
+            file.file,
+            file.filename,
+            replace=replace,
+            batch_size=settings.PORTFOLIO_BULK_BATCH_SIZE,
+            max_uncompressed=settings.LINKEDIN_MAX_UNCOMPRESSED_SIZE,
+        )
+    except LinkedInImportError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return LinkedInImportResponse(
+        success=True,
+        message=f"Imported {', '.join(result['sections'])} from LinkedIn",
+        portfolio_id=portfolio_id,
+        experiences=result.get("experiences", 0),
+        skills=result.get("skills", 0),
+        projects=result.get("projects", 0),
+        skipped=result["skipped"]
+    )
+
+
+def session_response(session: dict) -> ResumableUploadSession:
+    return ResumableUploadSession(
+        upload_id=session["upload_id"],
+        upload_url=f"{SESSIONS_PATH}/{session['upload_id']}",
+        file_name=session["file_name"],
+        size=session["size"],
+        offset=session["offset"],
+        chunk_size=settings.UPLOAD_CHUNK_SIZE,
+        expires_at=datetime.fromtimestamp(session["expires_at"], tz=timezone.utc)
+    )
+
+
+def session_error(e: UploadSessionError) -> HTTPException:
+    """Map a resumable upload failure onto its HTTP response"""
+    if isinstance(e, UploadNotFound):
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    if isinstance(e, OffsetConflict):
+        # Upload-Offset tells the client where to resume
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
+            headers={"Upload-Offset": str(e.offset)}
+        )
+    if isinstance(e, UploadTooLarge):
+        return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    if isinstance(e, IncompleteUpload):
+        return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if isinstance(e, ChecksumMismatch):
+        return HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post("/sessions", response_model=ResumableUploadSession, status_code=status.HTTP_201_CREATED)
+def create_upload_session(
+    data: ResumableUploadCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    uploads: ResumableUploads = Depends(get_resumable_uploads)
+):
+    """
+    Start a resumable upload (large documents, flaky connections)
+    
+    - Declare the file name, type, total size and optionally its SHA-256
+    - Send the bytes with ``PATCH upload_url`` in chunks
+    - Finish with ``POST upload_url/complete``
+    - Sessions idle for UPLOAD_SESSION_TTL_HOURS are deleted
+    - Images up to 5MB (as on /documents), documents up to UPLOAD_RESUMABLE_MAX_SIZE
+    - Refused up front (413) when the file can't fit in your storage quota
+    """
+    if data.content_type in ALLOWED_IMAGE_TYPES:
+        category = "images"
+        max_size = MAX_IMAGE_SIZE  # Thumbnails are rendered from the whole image
+    elif data.content_type in ALLOWED_RESUME_TYPES:
+        category = data.category
+        max_size = settings.UPLOAD_RESUMABLE_MAX_SIZE
+    else:
+        allowed = ", ".join({**ALLOWED_RESUME_TYPES, **ALLOWED_IMAGE_TYPES}.values())
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid file type. Allowed types: {allowed}"
+        )
+    
+    # Early answer only; the quota is enforced when the upload completes
+    bytes_used, _ = get_usage(db, current_user.id)
+    if settings.UPLOAD_QUOTA_BYTES and bytes_used + data.size > settings.UPLOAD_QUOTA_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(QuotaExceeded(bytes_used, data.size, settings.UPLOAD_QUOTA_BYTES))
+        )
+    
+    try:
+        session = uploads.create(
+            current_user.id,
+            Path(data.file_name).name,
+            data.content_type,
+            data.size,
+            category,
+            checksum=data.checksum,
+            max_size=max_size
+        )
+    except UploadSessionError as e:
+        raise session_error(e)
+    
+    return session_response(session)
+
+
+@router.get("/sessions/{upload_id}", response_model=ResumableUploadSession)
+def get_upload_session(
+    upload_id: str,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    uploads: ResumableUploads = Depends(get_resumable_uploads)
+):
+    """
+    Where an upload stands - after a dropped connection, resume from ``offset``
+    """
+    try:
+        session = uploads.get(upload_id, current_user.id)
+    except UploadSessionError as e:
+        raise session_error(e)
+    
+    response.headers["Upload-Offset"] = str(session["offset"])
+    response.headers["Cache-Control"] = "no-store"
+    return session_response(session)
+
+
+@router.patch("/sessions/{upload_id}", response_model=ResumableUploadSession)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., ge=0, description="Byte offset this chunk starts at"),
+    upload_checksum: Optional[str] = Header(None, description='"sha256 <hex digest>" of this chunk'),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    uploads: ResumableUploads = Depends(get_resumable_uploads)
+):
+    """
+    Append a chunk (raw bytes as the request body)
+    
+    - ``Upload-Offset`` must equal the session's current offset (409 otherwise,
+      with the right offset in the response header)
+    - The body is written to disk as it streams in, never buffered whole
+    - With ``Upload-Checksum: sha256 <hex>`` the chunk is verified and kept
+      only if it matches; without it, bytes received before a disconnect are
+      kept
+    """
+    # Release the pooled connection; a chunk can take minutes on a slow link
+    user_id = current_user.id
+    db.commit()
+    
+    chunk_checksum = None
+    if upload_checksum:
+        algorithm, _, digest = upload_checksum.partition(" ")
+        if algorithm.lower() != "sha256" or not SHA256_PATTERN.match(digest.strip().lower()):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Upload-Checksum must be 'sha256 <hex digest>'"
+            )
+        chunk_checksum = digest.strip().lower()
+    
+    try:
+        session = await uploads.append(
+            upload_id, user_id, upload_offset, request.stream(), chunk_checksum=chunk_checksum
+        )
+    except UploadSessionError as e:
+        raise session_error(e)
+    except ClientDisconnect:
+        # Bytes that arrived are kept; nobody is left to read a response
+        return Response(status_code=status.HTTP_400_BAD_REQUEST)
+    
+    response.headers["Upload-Offset"] = str(session["offset"])
+    return session_response(session)
+
+
+@router.post("/sessions/{upload_id}/complete", response_model=UploadResponse)
+def complete_upload_session(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    uploads: ResumableUploads = Depends(get_resumable_uploads),
+    storage: StorageBackend = Depends(get_storage)
+):
+    """
+    Finish a resumable upload
+    
+    - Every byte must have arrived; the whole-file SHA-256 is checked against
+      the one given when the session was created
+    - The file lands in your uploads like a regular upload; images get
+      thumbnails
+    """
+    try:
+        session = uploads.get(upload_id, current_user.id)
+    except UploadSessionError as e:
+        raise session_error(e)
+    key = upload_key(current_user.id, session["category"], session["file_name"])
+    destination = storage.local_path(key) or scratch_path()
+    is_image = session["category"] == "images"
+    
+    with counted_upload(db, current_user.id, session["size"]):
+        try:
+            session, digest = uploads.complete(upload_id, current_user.id, destination)
+        except UploadSessionError as e:
+            raise session_error(e)
+        
+        if storage.local_path(key) is None:
+            # Remote storage: upload the finished file; images keep the local copy until rendered
+            try:
+                storage.save_file(key, destination, session["content_type"], move=not is_image)
+            except StorageError as e:
+                destination.unlink(missing_ok=True)
+                raise HTTPException(
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail=f"Failed to store file: {e}"
+                )
+    
+    derivatives = {}
+    if is_image:
+        derivatives = schedule_thumbnails(str(destination), digest, remove_source=storage.local_path(key) is None)
+    return UploadResponse(
+        success=True,
+        message="File uploaded successfully",
+        file_path=storage.location(key),
+        file_name=session["file_name"],
+        file_type=session["content_type"],
+        file_size=session["size"],
+        category=session["category"],
+        **derivatives
+    )
+
+
+@router.delete("/sessions/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+def cancel_upload_session(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    uploads: ResumableUploads = Depends(get_resumable_uploads)
+):
+    """Abandon a resumable upload and delete the bytes received"""
+    try:
+        uploads.abort(upload_id, current_user.id)
+    except UploadSessionError as e:
+        raise session_error(e)
+
+
+@router.get("/thumbnails/{digest}/{width}.webp")
+async def get_thumbnail(digest: str, width: int):
+    """
+    Resized WebP copy of an uploaded image
+    
+    - Addressed by the original's SHA-256, so responses never change and are
+      cached for a year
+    - Images narrower than ``width`` are served at their own width
+    - Rendered on another node: redirects to the copy in remote storage
+    - Not authenticated: the hash is unguessable and only known to clients
+      that were shown the image
+    """
+    pipeline = get_thumbnail_pipeline()
+    if not SHA256_PATTERN.match(digest) or width not in pipeline.widths:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Thumbnail not found"
+        )
+    
+    available = pipeline.available(digest)
+    if not available:
+        # Just uploaded: wait for the render if this worker is running it
+        await pipeline.wait(digest)
+        available = pipeline.available(digest)
+    if not available:
+        published = await asyncio.to_thread(pipeline.published, digest)
+        if published:
+            served = min((w for w in published if w >= width), default=published[-1])
+            return RedirectResponse(pipeline.storage.url(derivative_key(digest, served)), status_code=307)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Thumbnail not found"
+        )
+    
+    served = min((w for w in available if w >= width), default=available[-1])
+    return stored_file_response(
+        pipeline.path(digest, served),
+        media_type="image/webp",
+        filename=f"{width}.webp",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
+
+@router.api_route("/files/{category}/{filename}", methods=["GET", "HEAD"])
+async def download_file(
+    category: str,
+    filename: str,
+    current_user: User = Depends(get_current_user),
+    storage: StorageBackend = Depends(get_storage)
+):
+    """
+    Download one of your uploaded files
+    
+    - Supports Range requests (PDF viewers and video seek fetch pieces)
+    - ETag / If-None-Match for revalidation
+    - Bytes are sent by the front proxy when DOWNLOAD_OFFLOAD is set
+    - With S3 storage, redirects to a short-lived presigned URL instead
+    - Only the owner's files are reachable
+    """
+    stored = await asyncio.to_thread(find_user_file, storage, current_user.id, category, filename)
+    if stored is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    inline = media_type == "application/pdf" or media_type.startswith("image/")
+    
+    path = storage.local_path(stored.key)
+    if path is None:
+        return RedirectResponse(
+            storage.url(stored.key, filename=filename, inline=inline),
+            status_code=307,
+            headers={"Cache-Control": "private, no-store"}
+        )
+    
+    return stored_file_response(
+        path,
+        media_type=media_type,
+        filename=filename,
+        inline=inline,
+        headers={"Cache-Control": "private, no-cache"}
+    )
+
+
+@router.delete("/files/{category}/{filename}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_file(
+    category: str,
+    filename: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage)
+):
+    """
+    Delete one of your uploaded files
+    
+    - Its size is given back to your storage quota
+    """
+    stored = find_user_file(storage, current_user.id, category, filename)
+    if stored is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+    storage.delete(stored.key)
+    release(db, current_user.id, stored.size)
+
+
+@router.get("/usage", response_model=StorageUsageResponse)
+def get_storage_usage(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    How much of your storage quota your uploads take
+    
+    - Read from a per-user counter, not by walking your files
+    - ``quota_bytes`` is 0 when uploads are unlimited
+    """
+    bytes_used, file_count = get_usage(db, current_user.id)
+    return StorageUsageResponse(
+        bytes_used=bytes_used,
+        file_count=file_count,
+        quota_bytes=settings.UPLOAD_QUOTA_BYTES
+    )
+
+
 @router.get("/list")
 async def list_uploads(
     current_user: User = Depends(get_current_user),
-    category: Optional[str] = None
+    category: Optional[str] = None,
+    storage: StorageBackend = Depends(get_storage)
 ):
     """
     List all uploaded files for current user
@@ -279,29 +819,29 @@ async def list_uploads(
     - Returns list of uploaded files
     - Optional filter by category (resumes, documents, images, linkedin)
     """
-    user_dir = UPLOAD_DIR / str(current_user.id)
+    if category:
+        validate_name(category)
+    prefix = f"{current_user.id}/{category}/" if category else f"{current_user.id}/"
+    stored = await asyncio.to_thread(lambda: list(storage.list(prefix)))
     
-    if not user_dir.exists():
+    if not stored:
         return {"files": [], "message": "No uploads found"}
     
     files = []
     
-    # Determine which directories to scan
-    if category:
-        dirs_to_scan = [user_dir / category] if (user_dir / category).exists() else []
-    else:
-        dirs_to_scan = [d for d in user_dir.iterdir() if d.is_dir()]
-    
-    for dir_path in dirs_to_scan:
-        for file_path in dir_path.iterdir():
-            if file_path.is_file():
-                files.append({
-                    "file_name": file_path.name,
-                    "category": dir_path.name,
-                    "file_size": file_path.stat().st_size,
-                    "upload_date": datetime.fromtimestamp(file_path.stat().st_ctime).isoformat(),
-                    "file_path": str(file_path)
-                })
+    for item in stored:
+        parsed = parse_file_key(item.key)
+        if parsed is None:
+            continue
+        _, file_category, file_name = parsed
+        files.append({
+            "file_name": file_name,
+            "category": file_category,
+            "file_size": item.size,
+            "upload_date": item.modified.isoformat(),
+            "file_path": storage.location(item.key),
+            "download_url": f"{FILES_PATH}/{file_category}/{file_name}"
+        })
     
     return {
         "files": files,
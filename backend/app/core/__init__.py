@@ -1,21 +1,25 @@
 """
 Core Package
 """
-from app.core.config import settings, get_settings
-from app.core.security import (
-    verify_password,
-    get_password_hash,
-    create_access_token,
-    create_refresh_token,
-    decode_token
-)
+import importlib
 
-__all__ = [
-    "settings",
-    "get_settings",
-    "verify_password",
-    "get_password_hash",
-    "create_access_token",
-    "create_refresh_token",
-    "decode_token",
-]
+# Exports are resolved lazily so importing app.core.config does not pay for
+# passlib/bcrypt and jose until security helpers are actually used
+_EXPORTS = {
+    "settings": "app.core.config",
+    "get_settings": "app.core.config",
+    "verify_password": "app.core.security",
+    "get_password_hash": "app.core.security",
+    "create_access_token": "app.core.security",
+    "create_refresh_token": "app.core.security",
+    "decode_token": "app.core.security",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_path = _EXPORTS.get(name)
+    if module_path is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module_path), name)
@@ -0,0 +1,111 @@
+"""
+Circuit Breaker
+Stop calling a dependency that is failing or too slow
+
+The breaker watches the outcome of the last ``window`` calls. A call counts
+against the dependency when it fails or when it is slower than
+``slow_seconds``, so a backend that still answers but takes 40 seconds to
+do it trips the breaker just like one returning errors.
+
+    closed      calls go through; once at least ``min_calls`` were seen and
+                the share of bad ones reaches ``failure_ratio``, it opens
+    open        calls fail immediately with CircuitOpenError for
+                ``cooldown_seconds``, then it goes half-open
+    half_open   a single trial call goes through; success closes the
+                breaker, failure opens it for another cooldown
+
+Callers wrap each call in ``acquire()`` ... ``record()`` (or ``release()``
+when the call was abandoned without an outcome, e.g. the client left).
+State is per process and only touched from the event loop.
+"""
+import time
+from collections import deque
+from typing import Callable, Deque
+
+from app.core.metrics import get_counter
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """The breaker is open; the dependency isn't being called"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable (circuit open)")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        failure_ratio: float = 0.5,
+        min_calls: int = 5,
+        slow_seconds: float = 10.0,
+        cooldown_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.slow_seconds = slow_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.clock = clock
+        self._outcomes: Deque[bool] = deque(maxlen=window)  # True = bad call
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_running = False
+        self.trips = get_counter(f"{name}.breaker_trips")
+        self.rejected = get_counter(f"{name}.breaker_rejected")
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self.clock() - self._opened_at >= self.cooldown_seconds:
+            self._state = HALF_OPEN
+        return self._state
+
+    def retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.cooldown_seconds - self.clock())
+
+    def acquire(self) -> None:
+        """Permission for one call; raises CircuitOpenError"""
+        state = self.state
+        if state == CLOSED:
+            return
+        if state == HALF_OPEN and not self._trial_running:
+            self._trial_running = True
+            return
+        self.rejected.inc()
+        raise CircuitOpenError(self.name, self.retry_after() or self.cooldown_seconds)
+
+    def release(self) -> None:
+        """The acquired call ended without an outcome"""
+        self._trial_running = False
+
+    def record(self, ok: bool, latency: float) -> None:
+        """Outcome of an acquired call; ``latency`` is what the caller waited for"""
+        bad = not ok or latency > self.slow_seconds
+        if self._state == HALF_OPEN:
+            self._trial_running = False
+            if bad:
+                self._open()
+            else:
+                self._state = CLOSED
+                self._outcomes.clear()
+            return
+        if self._state == OPEN:
+            return  # A call from before the breaker opened
+
+        self._outcomes.append(bad)
+        if len(self._outcomes) >= self.min_calls and sum(self._outcomes) / len(self._outcomes) >= self.failure_ratio:
+            self._open()
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = self.clock()
+        self._outcomes.clear()
+        self.trips.inc()
+        print(f"⚠️ Circuit breaker {self.name} opened for {self.cooldown_seconds:g}s")
@@ -0,0 +1,365 @@
+"""
+Response Compression
+gzip / brotli / zstd content negotiation for API responses
+
+The client's Accept-Encoding picks the encoding; when it accepts several
+equally, zstd is preferred over brotli over gzip (smaller and faster to
+decode). brotli and zstd need the optional ``brotli`` and ``zstandard``
+packages; without them only gzip is offered.
+
+What gets compressed:
+    text and JSON-like bodies of at least COMPRESSION_MIN_SIZE bytes
+    streamed bodies, chunk by chunk; Server-Sent Events are flushed after
+    every event so the client never waits on the compressor's buffer
+
+Left alone: images and other binary types, responses that already have a
+Content-Encoding, byte ranges (they address the uncompressed file) and
+``Cache-Control: no-transform``.
+
+Cacheable responses (an ETag, 200, not ``no-store``) keep their compressed
+bodies in a per-worker LRU keyed by ETag and encoding, so a hot portfolio
+is compressed once per change rather than once per request. The ETag is
+sent weak (``W/"..."``) on compressed responses, as the bytes differ from
+the identity representation.
+"""
+import asyncio
+import hashlib
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.metrics import get_counter
+
+try:
+    import brotli  # Optional: Content-Encoding br
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard  # Optional: Content-Encoding zstd
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/problem+json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+THREAD_THRESHOLD = 256 * 1024  # Bigger bodies are compressed off the event loop
+
+cache_hits = get_counter("compression.cache_hits")
+cache_misses = get_counter("compression.cache_misses")
+bytes_in = get_counter("compression.bytes_in")
+bytes_out = get_counter("compression.bytes_out")
+
+
+class Encoder(ABC):
+    """Streaming compressor for one response body"""
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    @abstractmethod
+    def flush(self) -> bytes:
+        """Everything compressed so far, decodable by the client right away"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def finish(self) -> bytes:
+        raise NotImplementedError
+
+
+class GzipEncoder(Encoder):
+    def __init__(self, level: int = 6):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder(Encoder):
+    def __init__(self, quality: int = 5):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder(Encoder):
+    def __init__(self, level: int = 3):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def available_encodings() -> List[str]:
+    """Encodings this process can produce, most preferred first"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+def negotiate(accept_encoding: str, encodings: Sequence[str]) -> Optional[str]:
+    """
+    Pick an encoding from an Accept-Encoding header; None for identity
+
+    The client's q-values win; among equal ones, the order of ``encodings``.
+    """
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def content_etag(body: bytes) -> str:
+    """Strong ETag derived from the body"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires; compressed responses carry W/ ETags"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == bare:
+            return True
+    return False
+
+
+class CompressedCache:
+    """LRU of compressed bodies keyed by (ETag, encoding), bounded in bytes"""
+
+    def __init__(self, max_bytes: int, max_entry_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes or max(max_bytes // 8, 1)
+        self.size = 0
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+
+    def get(self, etag: str, encoding: str) -> Optional[bytes]:
+        body = self._entries.get((etag, encoding))
+        if body is not None:
+            self._entries.move_to_end((etag, encoding))
+        return body
+
+    def put(self, etag: str, encoding: str, body: bytes) -> None:
+        if len(body) > self.max_entry_bytes:
+            return
+        previous = self._entries.pop((etag, encoding), None)
+        if previous is not None:
+            self.size -= len(previous)
+        self._entries[(etag, encoding)] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "").lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses per the request's Accept-Encoding"""
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+        zstd_level: int = 3,
+        cache_bytes: int = 32 * 1024 * 1024,
+        encodings: Optional[Sequence[str]] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = list(encodings or available_encodings())
+        self.cache = CompressedCache(cache_bytes) if cache_bytes else None
+        self._factories = {
+            "gzip": lambda: GzipEncoder(gzip_level),
+            "br": lambda: BrotliEncoder(brotli_quality),
+            "zstd": lambda: ZstdEncoder(zstd_level),
+        }
+
+    def encoder(self, encoding: str) -> Encoder:
+        return self._factories[encoding]()
+
+    def compress(self, encoding: str, body: bytes) -> bytes:
+        encoder = self.encoder(encoding)
+        return encoder.compress(body) + encoder.finish()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        responder = _Responder(self, encoding, send)
+        await self.app(scope, receive, responder)
+
+
+class _Responder:
+    """Wraps ``send`` for one response; decides on the first body message"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start = None
+        self.encoder: Optional[Encoder] = None
+        self.flush_each = False
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if self.passthrough:
+            await self.send(message)
+            return
+        if message["type"] == "http.response.start":
+            message["headers"] = list(message.get("headers", []))  # Edited in place below
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            if not self._eligible(message["status"], headers):
+                self.passthrough = True
+                if _compressible(headers):
+                    MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.encoder is None:
+            if not more_body:
+                await self._send_whole(body)
+                return
+            await self._start_stream()
+        await self._send_chunk(body, more_body)
+
+    def _eligible(self, status: int, headers: Headers) -> bool:
+        if status < 200 or status in (204, 206, 304):
+            return False
+        if "content-encoding" in headers or "content-range" in headers:
+            return False
+        if headers.get("accept-ranges", "none") != "none":
+            return False  # Range requests address the uncompressed bytes
+        if "no-transform" in headers.get("cache-control", ""):
+            return False
+        return self.encoding is not None and _compressible(headers)
+
+    def _headers(self) -> MutableHeaders:
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers.add_vary_header("Accept-Encoding")
+        headers["content-encoding"] = self.encoding
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["etag"] = f"W/{etag}"
+        return headers
+
+    async def _send_whole(self, body: bytes) -> None:
+        headers = Headers(raw=self.start["headers"])
+        if len(body) < self.middleware.minimum_size:
+            MutableHeaders(raw=self.start["headers"]).add_vary_header("Accept-Encoding")
+            await self.send(self.start)
+            await self.send({"type": "http.response.body", "body": body})
+            return
+
+        cache = self.middleware.cache
+        etag = headers.get("etag")
+        cacheable = (
+            cache is not None and etag is not None and self.start["status"] == 200
+            and "no-store" not in headers.get("cache-control", "")
+        )
+        compressed = cache.get(etag, self.encoding) if cacheable else None
+        if compressed is not None:
+            cache_hits.inc()
+        else:
+            if len(body) >= THREAD_THRESHOLD:
+                compressed = await asyncio.to_thread(self.middleware.compress, self.encoding, body)
+            else:
+                compressed = self.middleware.compress(self.encoding, body)
+            if cacheable:
+                cache_misses.inc()
+                cache.put(etag, self.encoding, compressed)
+        bytes_in.inc(len(body))
+        bytes_out.inc(len(compressed))
+
+        response_headers = self._headers()
+        response_headers["content-length"] = str(len(compressed))
+        await self.send(self.start)
+        await self.send({"type": "http.response.body", "body": compressed})
+
+    async def _start_stream(self) -> None:
+        headers = self._headers()
+        if "content-length" in headers:
+            del headers["content-length"]
+        self.flush_each = headers.get("content-type", "").startswith("text/event-stream")
+        self.encoder = self.middleware.encoder(self.encoding)
+        await self.send(self.start)
+
+    async def _send_chunk(self, body: bytes, more_body: bool) -> None:
+        bytes_in.inc(len(body))
+        data = self.encoder.compress(body) if body else b""
+        if not more_body:
+            data += self.encoder.finish()
+        elif self.flush_each and body:
+            data += self.encoder.flush()  # Each event reaches the client as soon as it's sent
+        bytes_out.inc(len(data))
+        if data or not more_body:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
@@ -17,6 +17,17 @@ class Settings(BaseSettings):
     # Server
     HOST: str = "0.0.0.0"
     PORT: int = 8000
+    LAZY_ROUTERS: bool = True  # Load API routes after startup so /health answers first
+    COLD_START_BUDGET_MS: int = 1000  # Target time from import to serving /health
+    DIAGNOSTICS_NETWORKS: List[str] = ["127.0.0.1/32", "::1/128"]  # Clients allowed /health/db and /health/startup
+    
+    # Process Manager (python -m app.server)
+    WEB_CONCURRENCY: int = 0  # Worker processes; 0 = one per available CPU core
+    PRELOAD_APP: bool = True  # Import the app once in the master and fork workers from it
+    WORKER_BOOT_TIMEOUT: int = 60  # Seconds a new worker has to warm up and start serving
+    WORKER_GRACEFUL_TIMEOUT: int = 30  # Seconds a stopping worker gets to finish in-flight requests
+    WORKER_MAX_REQUESTS: int = 0  # Recycle a worker after this many requests (0 = never)
+    WORKER_MAX_REQUESTS_JITTER: int = 0  # Random extra requests per worker, so they don't all recycle at once
     
     # Database
     DATABASE_URL: str
@@ -26,17 +37,61 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str = "localhost"
     POSTGRES_PORT: int = 5432
     
+    # Read Replicas
+    DATABASE_REPLICA_URLS: List[str] = []  # Read-only replicas for read-heavy endpoints
+    REPLICA_STICKY_SECONDS: int = 5  # Keep a user's reads on the primary after they write
+    
+    # Database Connection Pool
+    DB_POOL_SIZE: int = 5  # Persistent connections per worker
+    DB_MAX_OVERFLOW: int = 10  # Extra connections allowed under burst load
+    DB_POOL_TIMEOUT: int = 30  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced
+    DB_POOL_PRE_PING: str = "idle"  # "always", "idle" or "never"
+    DB_POOL_PRE_PING_IDLE_SECONDS: int = 30  # Ping only connections idle longer than this
+    
+    # Database Migrations
+    DB_MIGRATE_ON_STARTUP: bool = True  # Run pending Alembic migrations at boot; False only checks the version
+    
     # JWT
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    REVOCATION_SYNC_SECONDS: int = 5  # How quickly a logout on one worker reaches the others
     
     # OpenAI
     OPENAI_API_KEY: str
     OPENAI_MODEL: str = "gpt-4"
     OPENAI_TEMPERATURE: float = 0.7
     OPENAI_MAX_TOKENS: int = 1000
+    LLM_TIMEOUT_SECONDS: float = 30  # Wait this long for the first (or next) token before failing the call
+    LLM_SLOW_CALL_SECONDS: float = 10  # Calls slower than this to the first token count as failures
+    LLM_BREAKER_WINDOW: int = 20  # Recent calls the circuit breaker judges the backend by
+    LLM_BREAKER_FAILURE_RATIO: float = 0.5  # Share of failed or slow calls that opens the breaker
+    LLM_BREAKER_MIN_CALLS: int = 5  # Calls needed in the window before it can open
+    LLM_BREAKER_COOLDOWN_SECONDS: float = 30  # Fail fast this long before trying the backend again
+    LLM_MAX_CONCURRENCY: int = 16  # Model calls in flight per worker
+    LLM_BACKGROUND_CONCURRENCY: int = 4  # Slots background jobs may hold; the rest stay free for chat
+    LLM_INTERACTIVE_DEADLINE_SECONDS: float = 15  # Chat calls still queued after this get the fallback answer
+    LLM_BACKGROUND_DEADLINE_SECONDS: float = 600  # Background calls still queued after this are dropped
+    
+    # Chat
+    CHAT_HISTORY_MESSAGES: int = 20  # Earlier messages sent to the model as context
+    CHAT_MAX_MESSAGE_CHARS: int = 4000
+    CHAT_COALESCE_COMPLETIONS: bool = True  # Identical prompts in flight share one completion
+    CHAT_ANSWER_CACHE_SIZE: int = 1000  # Recent answers kept to reply with while the LLM is unavailable
+    CHAT_WS_AUTH_TIMEOUT: int = 10  # Seconds a new socket has to send its auth frame
+    CHAT_WS_IDLE_TIMEOUT: int = 600  # Close sockets with no client frames for this long
+    CHAT_WS_MAX_PENDING: int = 4  # Queued messages per socket before new ones are rejected
+    CHAT_WS_SEND_BUFFER: int = 256  # Tokens buffered per socket before the model stream pauses
+    CHAT_WS_SEND_TIMEOUT: int = 10  # Seconds a client may stall reading before it's disconnected
+    CHAT_WRITE_BATCH_SIZE: int = 100  # Messages per INSERT in the write-behind queue
+    CHAT_WRITE_FLUSH_MS: int = 50  # How long the writer waits to fill a batch
+    CHAT_WRITE_MAX_PENDING: int = 10000  # Queued messages before chats wait for the database
+    
+    # Portfolio Bulk Import/Export
+    PORTFOLIO_IMPORT_MAX_ITEMS: int = 2000  # Projects + skills + experiences per import request
+    PORTFOLIO_BULK_BATCH_SIZE: int = 500  # Rows per INSERT on import and per cursor fetch on export
     
     # CORS
     CORS_ORIGINS: List[str] = [
@@ -48,9 +103,61 @@ class Settings(BaseSettings):
     ]
     ALLOWED_HOSTS: List[str] = ["*"]
     
+    # Rate Limiting ("N/second", "N/minute", "N/hour"; empty disables a rule)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory" (per worker) or "redis" (shared)
+    RATE_LIMIT_REDIS_URL: str = ""  # e.g. redis://localhost:6379/0
+    RATE_LIMIT_DEFAULT: str = "300/minute"  # Per client IP across all /api routes
+    RATE_LIMIT_LOGIN: str = "10/minute"  # Per client IP for login and signup (bcrypt is expensive)
+    RATE_LIMIT_CHAT: str = "20/minute"  # Per user for chat (LLM quota)
+    RATE_LIMIT_CHAT_GLOBAL: str = "600/minute"  # All users combined for chat
+    
+    # Response Compression (br and zstd need the optional brotli / zstandard packages)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # Smaller bodies are sent uncompressed
+    COMPRESSION_GZIP_LEVEL: int = 6  # 1-9
+    COMPRESSION_BROTLI_QUALITY: int = 5  # 0-11; above ~6 gets slow for on-the-fly use
+    COMPRESSION_ZSTD_LEVEL: int = 3  # 1-19
+    COMPRESSION_CACHE_BYTES: int = 33554432  # 32MB of compressed bodies per worker, keyed by ETag (0 disables)
+    
+    # Tracing (per-stage histograms are always kept; the exporter writes sampled spans)
+    TRACING_ENABLED: bool = True
+    TRACING_EXPORTER: str = "none"  # "none", "console" or "file"
+    TRACING_FILE: str = "traces.jsonl"  # JSON lines written by the file exporter
+    TRACING_SAMPLE_RATE: float = 1.0  # Share of new traces exported; incoming traceparent flags win
+    
     # File Upload
     MAX_UPLOAD_SIZE: int = 5242880  # 5MB
     UPLOAD_DIR: str = "uploads"
+    LINKEDIN_MAX_EXPORT_SIZE: int = 52428800  # 50MB LinkedIn export archive
+    LINKEDIN_MAX_UNCOMPRESSED_SIZE: int = 209715200  # 200MB of CSVs inside it (zip bomb guard)
+    UPLOAD_RESUMABLE_MAX_SIZE: int = 104857600  # 100MB per file through the resumable upload sessions
+    UPLOAD_CHUNK_SIZE: int = 8388608  # 8MB chunk size suggested to resumable upload clients
+    UPLOAD_SESSION_TTL_HOURS: int = 24  # Unfinished upload sessions are deleted after this long idle
+    UPLOAD_SESSION_GC_SECONDS: int = 900  # How often expired upload sessions are cleaned up
+    UPLOAD_PARTIAL_DIR: str = ""  # Resumable uploads in progress; empty = UPLOAD_DIR/.partial (share it across nodes)
+    UPLOAD_QUOTA_BYTES: int = 1073741824  # 1GB of stored uploads per user (0 = unlimited)
+    
+    DOWNLOAD_OFFLOAD: str = ""  # "", "x-accel-redirect" (nginx) or "x-sendfile" (Apache/lighttpd)
+    DOWNLOAD_ACCEL_PREFIX: str = "/_protected/uploads"  # nginx internal location mapped to UPLOAD_DIR
+    
+    # File Storage
+    STORAGE_BACKEND: str = "local"  # "local" (UPLOAD_DIR) or "s3" (any S3-compatible service)
+    S3_BUCKET: str = ""
+    S3_REGION: str = "us-east-1"
+    S3_ENDPOINT_URL: str = ""  # e.g. http://localhost:9000 for MinIO; empty = AWS
+    S3_ACCESS_KEY_ID: str = ""
+    S3_SECRET_ACCESS_KEY: str = ""
+    S3_PREFIX: str = ""  # Key prefix inside the bucket, e.g. "aiva/"
+    S3_PART_SIZE: int = 8388608  # 8MB multipart part size (S3 minimum is 5MB)
+    S3_UPLOAD_CONCURRENCY: int = 4  # Parts of one file uploaded in parallel
+    S3_MAX_CONNECTIONS: int = 20  # Pooled keep-alive connections to the storage service per worker
+    S3_URL_EXPIRES: int = 300  # Seconds a presigned download URL stays valid
+    
+    # Image Thumbnails
+    THUMBNAIL_WIDTHS: List[int] = [160, 480, 960]  # WebP derivative widths in pixels
+    THUMBNAIL_QUALITY: int = 80  # WebP quality (0-100)
+    THUMBNAIL_WORKERS: int = 2  # Processes rendering thumbnails per server worker
     
     # Email (Optional)
     SMTP_HOST: str = "smtp.gmail.com"
@@ -0,0 +1,40 @@
+"""
+Request Deadlines
+Time budgets passed in by clients and proxies
+
+A caller that will give up after N seconds says so with
+``X-Request-Timeout: N`` (seconds, decimals allowed). The budget becomes an
+absolute deadline on the ``time.monotonic()`` clock - the same clock as
+``loop.time()`` - and is handed down to the LLM scheduler and the
+completion stream, so work nobody will wait for is dropped or stopped
+instead of finished. A deadline only ever tightens the server's own limits.
+"""
+import time
+from typing import Any, Mapping, Optional
+
+DEADLINE_HEADER = "x-request-timeout"
+MAX_TIMEOUT_SECONDS = 3600.0
+
+
+def parse_timeout(value: Any) -> Optional[float]:
+    """Seconds from a header or frame value; None when missing, ValueError when invalid"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError("timeout must be a number of seconds")
+    seconds = float(value)
+    if not 0 < seconds <= MAX_TIMEOUT_SECONDS:
+        raise ValueError(f"timeout must be between 0 and {MAX_TIMEOUT_SECONDS:g} seconds")
+    return seconds
+
+
+def deadline_after(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else time.monotonic() + seconds
+
+
+def timeout_from_headers(headers: Mapping[str, str]) -> Optional[float]:
+    """Budget from ``X-Request-Timeout``; malformed values are ignored"""
+    try:
+        return parse_timeout(headers.get(DEADLINE_HEADER))
+    except (TypeError, ValueError):
+        return None
@@ -2,25 +2,26 @@
 Authentication Dependencies
 FastAPI dependencies for protecting routes
 """
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.routing import PRIMARY_COOKIE
+from app.db.session import get_db, get_session_router
 from app.core.security import decode_token
+from app.core.revocation import revocations
+from app.core.tracing import span, start_span
 from app.models.user import User, UserRole
-from typing import Optional
+from typing import Generator, Optional
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+def access_token_claims(token: str) -> dict:
     """
-    Get current authenticated user from JWT token
+    Validate an access token's signature, expiry, type and revocation
+    No DB query, so the chat WebSocket repeats it for every message
     """
-    token = credentials.credentials
     payload = decode_token(token)
     
     if payload is None:
@@ -36,6 +37,24 @@ async def get_current_user(
             detail="Invalid token type",
         )
     
+    # In-memory lookup of the token id and its session family (no DB query)
+    if revocations.is_revoked(payload.get("jti"), payload.get("fid")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return payload
+
+
+def user_from_token(token: str, db: Session) -> User:
+    """
+    Resolve an access token to an active user
+    Shared by bearer-authenticated routes and the chat WebSocket
+    """
+    payload = access_token_claims(token)
+    
     user_id: Optional[int] = payload.get("sub")
     if user_id is None:
         raise HTTPException(
@@ -59,6 +78,47 @@ async def get_current_user(
     return user
 
 
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Get current authenticated user from JWT token
+    """
+    with span("auth.get_current_user"):
+        user = user_from_token(credentials.credentials, db)
+    
+    # Lets the session router pin this user's reads after they commit a write
+    db.info["user_id"] = user.id
+    
+    return user
+
+
+def get_read_db(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> Generator[Session, None, None]:
+    """
+    Read-only database session dependency
+    Routes to a read replica unless the caller recently committed a write
+    (on this worker, or on any worker per the read-your-writes cookie)
+    """
+    user_id: Optional[int] = None
+    if credentials is not None:
+        payload = decode_token(credentials.credentials)
+        if payload and payload.get("sub") is not None:
+            user_id = int(payload["sub"])
+    
+    router = get_session_router()
+    held = start_span("db.read_session")
+    db = router.read_session(user_id, pinned=router.pinned_until(request.cookies.get(PRIMARY_COOKIE)))
+    try:
+        yield db
+    finally:
+        db.close()
+        held.end()
+
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
@@ -108,12 +168,13 @@ async def get_current_admin(
 
 
 def get_optional_user(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
-    db: Session = Depends(get_db)
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_read_db)
 ) -> Optional[User]:
     """
     Get current user if token is provided, otherwise return None
     Useful for public endpoints that behave differently for authenticated users
+    (reads the user through the route's read session, so no primary connection)
     """
     if credentials is None:
         return None
@@ -124,6 +185,9 @@ def get_optional_user(
     if payload is None or payload.get("type") != "access":
         return None
     
+    if revocations.is_revoked(payload.get("jti"), payload.get("fid")):
+        return None
+    
     user_id: Optional[int] = payload.get("sub")
     if user_id is None:
         return None
@@ -0,0 +1,189 @@
+"""
+File Responses
+Serve stored files with HTTP Range support and zero-copy transfer
+
+Body bytes take the cheapest path available:
+
+1. Proxy offload - with DOWNLOAD_OFFLOAD set, the app only authorizes the
+   request and answers with ``X-Accel-Redirect`` (nginx) or ``X-Sendfile``
+   (Apache/lighttpd); the proxy sends the file with sendfile(2) and handles
+   Range itself. No file bytes pass through Python.
+2. ASGI zero-copy - servers advertising the ``http.response.zerocopysend``
+   extension are handed the open file, offset and count.
+3. ASGI pathsend - servers advertising ``http.response.pathsend`` are
+   handed the path (whole-file responses only).
+4. Fallback - ``os.pread`` in 256KB chunks from a worker thread.
+"""
+import os
+import stat
+from email.utils import formatdate
+from pathlib import Path
+from typing import Mapping, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+
+CHUNK_SIZE = 256 * 1024
+OFFLOAD_HEADERS = {"x-accel-redirect": "X-Accel-Redirect", "x-sendfile": "X-Sendfile"}
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``bytes=`` range into inclusive (start, end)
+
+    Returns None when the header should be ignored (not bytes, malformed, or
+    several ranges - a full 200 response is always a valid answer). Raises
+    RangeNotSatisfiable when the range lies entirely past the end of the file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if first == "":
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def content_disposition(filename: str, inline: bool) -> str:
+    disposition = "inline" if inline else "attachment"
+    ascii_name = filename.encode("ascii", "ignore").decode().replace('"', "") or "download"
+    return f"{disposition}; filename=\"{ascii_name}\"; filename*=utf-8''{quote(filename)}"
+
+
+class RangeFileResponse(Response):
+    """
+    Response for a file on disk with Range, conditional and offload support
+
+    ``offload`` is "", "x-accel-redirect" or "x-sendfile". For
+    X-Accel-Redirect, ``offload_uri`` is the internal location the proxy
+    maps to the file.
+    """
+
+    def __init__(
+        self,
+        path: os.PathLike,
+        media_type: str = "application/octet-stream",
+        filename: Optional[str] = None,
+        inline: bool = True,
+        headers: Optional[Mapping[str, str]] = None,
+        offload: str = "",
+        offload_uri: Optional[str] = None,
+    ):
+        self.path = Path(path)
+        self.media_type = media_type
+        self.background = None
+        self.status_code = 200
+        self.offload = offload.lower()
+        self.offload_uri = offload_uri
+        self.extra_headers = dict(headers or {})
+        if filename:
+            self.extra_headers.setdefault("content-disposition", content_disposition(filename, inline))
+        self.raw_headers = []  # Headers are built per request in __call__
+
+    def _send_headers(self, status: int, headers: dict):
+        raw = [(k.lower().encode("latin-1"), str(v).encode("latin-1")) for k, v in headers.items()]
+        return {"type": "http.response.start", "status": status, "headers": raw}
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            result = await anyio.to_thread.run_sync(os.stat, self.path)
+        except FileNotFoundError:
+            result = None
+        if result is None or not stat.S_ISREG(result.st_mode):
+            await send(self._send_headers(404, {"content-length": "0"}))
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        size = result.st_size
+        etag = f'"{result.st_mtime_ns:x}-{size:x}"'
+        last_modified = formatdate(result.st_mtime, usegmt=True)
+        headers = {
+            "content-type": self.media_type,
+            "accept-ranges": "bytes",
+            "etag": etag,
+            "last-modified": last_modified,
+            **self.extra_headers,
+        }
+        request = Headers(scope=scope)
+        head = scope.get("method") == "HEAD"
+
+        if self.offload in OFFLOAD_HEADERS:
+            # The proxy streams the file (and applies Range); we send headers only
+            target = self.offload_uri if self.offload == "x-accel-redirect" else str(self.path.resolve())
+            headers[OFFLOAD_HEADERS[self.offload]] = target
+            headers["content-length"] = "0"
+            await send(self._send_headers(200, headers))
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if etag in request.get("if-none-match", ""):
+            headers.pop("content-type")
+            await send(self._send_headers(304, headers))
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        status_code, start, end = 200, 0, size - 1
+        range_header = request.get("range")
+        if_range = request.get("if-range")
+        if range_header and size and (if_range is None or if_range in (etag, last_modified)):
+            try:
+                byte_range = parse_range(range_header, size)
+            except RangeNotSatisfiable:
+                await send(self._send_headers(416, {"content-range": f"bytes */{size}", "content-length": "0"}))
+                await send({"type": "http.response.body", "body": b""})
+                return
+            if byte_range is not None:
+                status_code, (start, end) = 206, byte_range
+                headers["content-range"] = f"bytes {start}-{end}/{size}"
+
+        count = end - start + 1 if size else 0
+        headers["content-length"] = str(count)
+        await send(self._send_headers(status_code, headers))
+        if head or count == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as f:
+                await send({"type": "http.response.zerocopysend", "file": f, "offset": start, "count": count})
+            return
+        if "http.response.pathsend" in extensions and status_code == 200:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+            return
+
+        fd = await anyio.to_thread.run_sync(os.open, self.path, os.O_RDONLY)
+        try:
+            offset, remaining = start, count
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(os.pread, fd, min(CHUNK_SIZE, remaining), offset)
+                if not chunk:
+                    break  # File truncated under us; the client sees a short body
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            os.close(fd)
@@ -0,0 +1,182 @@
+"""
+In-process Metrics
+Lightweight counters, gauges and histograms for runtime telemetry
+"""
+import bisect
+import threading
+from typing import Dict, List, Optional, Sequence
+
+# Default latency buckets (seconds) - 1ms to 10s
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram
+
+    Observations are counted into cumulative-style buckets so snapshots can
+    be merged across workers and aggregated offline.
+    """
+
+    def __init__(self, name: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # Last slot = +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record a single observation"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+            if value > self._max:
+                self._max = value
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Estimate a percentile (0-100) from bucket upper bounds"""
+        with self._lock:
+            total = self._count
+            counts = list(self._counts)
+            maximum = self._max
+        if total == 0:
+            return None
+
+        target = total * q / 100.0
+        running = 0
+        for index, count in enumerate(counts):
+            running += count
+            if running >= target:
+                return self.buckets[index] if index < len(self.buckets) else maximum
+        return maximum
+
+    def reset(self) -> None:
+        """Clear all observations"""
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self._sum = 0.0
+            self._count = 0
+            self._max = 0.0
+
+    def snapshot(self) -> dict:
+        """Return a JSON-serializable view of the histogram"""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+            total_sum = self._sum
+            maximum = self._max
+
+        bounds: List[str] = [str(b) for b in self.buckets] + ["+Inf"]
+        return {
+            "count": total,
+            "sum": round(total_sum, 6),
+            "max": round(maximum, 6),
+            "mean": round(total_sum / total, 6) if total else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "buckets": dict(zip(bounds, counts)),
+        }
+
+
+class Counter:
+    """Monotonic counter"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        """Increment the counter"""
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def reset(self) -> None:
+        """Reset the counter to zero"""
+        with self._lock:
+            self._value = 0
+
+
+class Gauge:
+    """Current value of something that goes up and down (queue depth, in-flight calls)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: int) -> None:
+        with self._lock:
+            self._value = value
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+
+_histograms: Dict[str, Histogram] = {}
+_counters: Dict[str, Counter] = {}
+_gauges: Dict[str, Gauge] = {}
+_registry_lock = threading.Lock()
+
+
+def get_histogram(name: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    """Get or create a named histogram"""
+    histogram = _histograms.get(name)
+    if histogram is None:
+        with _registry_lock:
+            histogram = _histograms.setdefault(name, Histogram(name, buckets))
+    return histogram
+
+
+def get_counter(name: str) -> Counter:
+    """Get or create a named counter"""
+    counter = _counters.get(name)
+    if counter is None:
+        with _registry_lock:
+            counter = _counters.setdefault(name, Counter(name))
+    return counter
+
+
+def get_gauge(name: str) -> Gauge:
+    """Get or create a named gauge"""
+    gauge = _gauges.get(name)
+    if gauge is None:
+        with _registry_lock:
+            gauge = _gauges.setdefault(name, Gauge(name))
+    return gauge
+
+
+def metrics_snapshot(prefix: str = "") -> dict:
+    """Snapshot all registered metrics, optionally filtered by name prefix"""
+    return {
+        "histograms": {
+            name: h.snapshot() for name, h in list(_histograms.items()) if name.startswith(prefix)
+        },
+        "counters": {
+            name: c.value for name, c in list(_counters.items()) if name.startswith(prefix)
+        },
+        "gauges": {
+            name: g.value for name, g in list(_gauges.items()) if name.startswith(prefix)
+        },
+    }
@@ -0,0 +1,349 @@
+"""
+Rate Limiting
+Token-bucket rate limits per client IP, per user and per route
+
+Buckets use GCRA (the generic cell rate algorithm), which behaves exactly
+like a token bucket but stores a single timestamp per key - the time the
+bucket will be full again - instead of a token count and a refill time.
+
+Backends:
+    MemoryBackend  per-process dict, no locks (the middleware only touches
+                   it from the event loop thread)
+    RedisBackend   shared by every worker and host, one atomic Lua call per
+                   hit
+"""
+import math
+import re
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.core.metrics import get_counter
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_LIMIT_PATTERN = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$")
+
+rejected = get_counter("ratelimit.rejected")
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    remaining: int
+    retry_after: float  # Seconds until the request would be allowed
+
+
+@dataclass(frozen=True)
+class Limit:
+    """``count`` requests per ``period`` seconds, with bursts up to ``count``"""
+    count: int
+    period: float
+
+    @property
+    def interval(self) -> float:
+        """Seconds for one token to refill"""
+        return self.period / self.count
+
+    @property
+    def capacity(self) -> float:
+        """Bucket size expressed in seconds"""
+        return self.period
+
+    def __str__(self) -> str:
+        return f"{self.count}/{self.period:g}s"
+
+
+def parse_limit(value: str) -> Limit:
+    """Parse "10/minute", "5/second" or "100/15minutes" into a Limit"""
+    match = _LIMIT_PATTERN.match(value)
+    if not match:
+        raise ValueError(f"Invalid rate limit {value!r}, expected e.g. '10/minute'")
+    count, multiplier, unit = match.groups()
+    if int(count) <= 0:
+        raise ValueError(f"Rate limit count must be positive: {value!r}")
+    return Limit(int(count), PERIODS[unit] * int(multiplier or 1))
+
+
+def gcra(tat: Optional[float], now: float, limit: Limit, cost: int = 1) -> Tuple[RateLimitResult, float]:
+    """
+    Apply one hit to a bucket
+
+    ``tat`` is the bucket's theoretical arrival time (None for a new key).
+    Returns the result and the new tat to store.
+    """
+    tat = now if tat is None or tat < now else tat
+    new_tat = tat + limit.interval * cost
+    excess = new_tat - now - limit.capacity
+    if excess > 1e-9:
+        return RateLimitResult(False, 0, excess), tat
+    remaining = int((limit.capacity - (new_tat - now)) / limit.interval + 1e-9)
+    return RateLimitResult(True, remaining, 0.0), new_tat
+
+
+class MemoryBackend:
+    """
+    In-process buckets
+
+    Each hit is one dict lookup, a little float arithmetic and one store.
+    Keys whose bucket has refilled completely are dropped in periodic sweeps,
+    so memory is bounded by the number of recently active clients.
+    """
+
+    def __init__(self, sweep_every: int = 10_000, clock=time.monotonic):
+        self._tats: Dict[str, float] = {}
+        self._hits = 0
+        self._sweep_every = sweep_every
+        self._clock = clock
+
+    async def hit(self, key: str, limit: Limit, cost: int = 1) -> RateLimitResult:
+        return (await self.hit_all([(key, limit)], cost))[0]
+
+    async def hit_all(self, buckets: Sequence[Tuple[str, Limit]], cost: int = 1) -> List[RateLimitResult]:
+        """Hit every bucket if all of them allow it, else none (no tokens taken)"""
+        now = self._clock()
+        outcomes = [gcra(self._tats.get(key), now, limit, cost) for key, limit in buckets]
+        if all(result.allowed for result, _ in outcomes):
+            for (key, _), (_, tat) in zip(buckets, outcomes):
+                self._tats[key] = tat
+        self._hits += 1
+        if self._hits >= self._sweep_every:
+            self._sweep(now)
+        return [result for result, _ in outcomes]
+
+    def _sweep(self, now: float) -> None:
+        self._hits = 0
+        for key in [key for key, tat in self._tats.items() if tat <= now]:
+            self._tats.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+# KEYS = bucket keys; ARGV = cost, then interval and capacity (seconds) per key.
+# Every bucket is checked before any is updated, so a rejected request takes
+# no tokens. Uses the Redis server clock so every host agrees on "now"
+GCRA_SCRIPT = """
+local cost = tonumber(ARGV[1])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local results, tats, allowed = {}, {}, true
+for i, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[i * 2])
+    local capacity = tonumber(ARGV[i * 2 + 1])
+    local tat = tonumber(redis.call('GET', key) or now)
+    if tat < now then tat = now end
+    local new_tat = tat + interval * cost
+    local excess = new_tat - now - capacity
+    if excess > 1e-9 then
+        allowed = false
+        results[i] = {0, 0, tostring(excess)}
+    else
+        tats[i] = new_tat
+        results[i] = {1, math.floor((capacity - (new_tat - now)) / interval + 1e-9), '0'}
+    end
+end
+if allowed then
+    for i, key in ipairs(KEYS) do
+        redis.call('SET', key, tostring(tats[i]), 'PX', math.ceil((tats[i] - now) * 1000))
+    end
+end
+return results
+"""
+
+
+class RedisBackend:
+    """Buckets shared across workers and hosts, stored in Redis"""
+
+    def __init__(self, url: str = "", prefix: str = "ratelimit:", client=None):
+        import redis.asyncio as redis
+
+        self._client = client if client is not None else redis.from_url(url)
+        self._script = self._client.register_script(GCRA_SCRIPT)
+        self._prefix = prefix
+
+    async def hit(self, key: str, limit: Limit, cost: int = 1) -> RateLimitResult:
+        return (await self.hit_all([(key, limit)], cost))[0]
+
+    async def hit_all(self, buckets: Sequence[Tuple[str, Limit]], cost: int = 1) -> List[RateLimitResult]:
+        """Hit every bucket if all of them allow it, else none (no tokens taken)"""
+        args: List[float] = [cost]
+        for _, limit in buckets:
+            args += [limit.interval, limit.capacity]
+        results = await self._script(keys=[self._prefix + key for key, _ in buckets], args=args)
+        return [
+            RateLimitResult(bool(allowed), int(remaining), float(retry_after))
+            for allowed, remaining, retry_after in results
+        ]
+
+
+def create_backend(name: str, redis_url: str = ""):
+    """
+    Build the configured backend
+
+    "redis" never falls back to in-process buckets: with several workers
+    that would silently multiply every limit by the worker count.
+    """
+    if name == "memory":
+        return MemoryBackend()
+    if name != "redis":
+        raise ValueError(f"Unknown rate limit backend {name!r}, expected 'memory' or 'redis'")
+    if not redis_url:
+        raise ValueError("RATE_LIMIT_BACKEND=redis requires RATE_LIMIT_REDIS_URL")
+    return RedisBackend(redis_url)
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """
+    A limit applied to requests under ``path_prefix``
+
+    ``scope`` picks the bucket key: "ip" (client address), "user" (JWT
+    subject, falling back to the IP for anonymous requests) or "route" (one
+    bucket shared by every caller).
+    """
+    name: str
+    path_prefix: str
+    limit: Limit
+    scope: str = "ip"
+    methods: Optional[frozenset] = None
+
+    def matches(self, method: str, path: str) -> bool:
+        return path.startswith(self.path_prefix) and (self.methods is None or method in self.methods)
+
+
+def default_rules(settings) -> List[RateLimitRule]:
+    """Rules built from settings; an empty limit string disables a rule"""
+    specs = [
+        ("auth", "/api/auth/login", settings.RATE_LIMIT_LOGIN, "ip", {"POST"}),
+        ("signup", "/api/auth/signup", settings.RATE_LIMIT_LOGIN, "ip", {"POST"}),
+        ("chat", "/api/chat", settings.RATE_LIMIT_CHAT, "user", None),
+        ("chat-global", "/api/chat", settings.RATE_LIMIT_CHAT_GLOBAL, "route", None),
+        ("api", "/api/", settings.RATE_LIMIT_DEFAULT, "ip", None),
+    ]
+    return [
+        RateLimitRule(name, prefix, parse_limit(limit), scope, frozenset(methods) if methods else None)
+        for name, prefix, limit, scope, methods in specs
+        if limit
+    ]
+
+
+@lru_cache(maxsize=4096)
+def _user_from_token(token: str) -> Optional[str]:
+    """JWT subject for a bearer token (verified, cached per token)"""
+    from app.core.security import decode_token
+
+    payload = decode_token(token)
+    return str(payload["sub"]) if payload and payload.get("sub") else None
+
+
+class RateLimiter:
+    """A backend and its rules, shared by the middleware and the chat WebSocket"""
+
+    def __init__(self, backend, rules: Sequence[RateLimitRule], enabled: bool = True):
+        self.backend = backend
+        self.rules = list(rules)
+        self.enabled = enabled
+
+    @staticmethod
+    def bucket_key(rule: RateLimitRule, user_id: Optional[str], ip: Optional[str]) -> str:
+        if rule.scope == "route":
+            return rule.name
+        if rule.scope == "user" and user_id is not None:
+            return f"{rule.name}:user:{user_id}"
+        return f"{rule.name}:ip:{ip or 'unknown'}"
+
+    async def check(
+        self, method: str, path: str, user_id: Optional[str] = None, ip: Optional[str] = None
+    ) -> Optional[Tuple[RateLimitRule, RateLimitResult]]:
+        """
+        Hit every matching bucket; returns the first rule and result that rejected, if any
+
+        The buckets are checked together: a request rejected by one rule
+        takes no tokens from the others.
+        """
+        if not self.enabled:
+            return None
+        rules = [rule for rule in self.rules if rule.matches(method, path)]
+        if not rules:
+            return None
+        results = await self.backend.hit_all(
+            [(self.bucket_key(rule, user_id, ip), rule.limit) for rule in rules]
+        )
+        for rule, result in zip(rules, results):
+            if not result.allowed:
+                rejected.inc()
+                get_counter(f"ratelimit.rejected.{rule.name}").inc()
+                return rule, result
+        return None
+
+
+@lru_cache()
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide limiter built from settings"""
+    from app.core.config import settings
+
+    return RateLimiter(
+        create_backend(settings.RATE_LIMIT_BACKEND, settings.RATE_LIMIT_REDIS_URL),
+        default_rules(settings),
+        enabled=settings.RATE_LIMIT_ENABLED,
+    )
+
+
+def _bearer_token(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return token.strip() if scheme.lower() == "bearer" and token else None
+    return None
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware enforcing rate limit rules
+
+    Requests that match no rule (health checks, docs) cost one prefix scan.
+    Rejected requests get 429 with ``Retry-After`` and never reach the app.
+    """
+
+    def __init__(self, app, backend=None, rules: Sequence[RateLimitRule] = (), enabled: bool = True, limiter=None):
+        self.app = app
+        self.limiter = limiter or RateLimiter(backend, rules, enabled)
+
+    def _needs_user(self, method: str, path: str) -> bool:
+        return any(rule.scope == "user" and rule.matches(method, path) for rule in self.limiter.rules)
+
+    async def __call__(self, scope, receive, send):
+        if not self.limiter.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method, path = scope["method"], scope["path"]
+        user_id = None
+        if self._needs_user(method, path):
+            token = _bearer_token(scope)
+            user_id = _user_from_token(token) if token else None
+        client = scope.get("client")
+
+        rejection = await self.limiter.check(method, path, user_id, client[0] if client else None)
+        if rejection is not None:
+            await self._reject(send, *rejection)
+            return
+
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    async def _reject(send, rule: RateLimitRule, result: RateLimitResult) -> None:
+        retry_after = str(max(1, math.ceil(result.retry_after)))
+        body = b'{"detail":"Too many requests"}'
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", retry_after.encode()),
+                (b"x-ratelimit-limit", str(rule.limit.count).encode()),
+                (b"x-ratelimit-remaining", b"0"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
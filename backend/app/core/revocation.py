@@ -0,0 +1,137 @@
+"""
+Token Revocation
+In-memory mirror of the revoked_tokens table for per-request checks
+
+Authenticating a request checks the access token's ``jti`` and session
+family ``fid`` against a dict - two hash lookups instead of a database
+query. Revocations made by this worker are visible immediately; a
+background task pulls other workers' revocations every
+REVOCATION_SYNC_SECONDS and purges rows that can no longer matter.
+
+The set stays small: entries are dropped once every access token that could
+carry them has expired (at most ACCESS_TOKEN_EXPIRE_MINUTES after revocation).
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import DateTime, Integer, String, column, delete, select, table
+from sqlalchemy.engine import Engine
+
+# Lightweight table handles - avoids importing the ORM models at startup
+revoked_tokens = table(
+    "revoked_tokens",
+    column("id", Integer),
+    column("token_id", String),
+    column("expires_at", DateTime(timezone=True)),
+)
+refresh_tokens = table(
+    "refresh_tokens",
+    column("expires_at", DateTime(timezone=True)),
+)
+
+PURGE_EVERY = 720  # Sync rounds between purges (an hour at the default 5s)
+
+# Ids can commit out of order under concurrent inserts, so each sync re-reads
+# a few rows below the high-water mark; re-adding an id is harmless
+SYNC_OVERLAP = 100
+
+
+def _epoch(value: datetime) -> float:
+    """Timestamp for a stored datetime (SQLite returns naive UTC values)"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class RevocationSet:
+    """Revoked token ids mapped to the time they stop mattering"""
+
+    def __init__(self, clock=time.time):
+        self._expiry: Dict[str, float] = {}
+        self._clock = clock
+        self.last_id = 0
+        self.last_sync: Optional[float] = None
+
+    def add(self, token_id: str, expires_at: float) -> None:
+        self._expiry[token_id] = max(expires_at, self._expiry.get(token_id, 0.0))
+
+    def is_revoked(self, *token_ids: Optional[str]) -> bool:
+        """True if any of the ids is revoked (None ids are ignored)"""
+        expiry = self._expiry
+        for token_id in token_ids:
+            if token_id is not None and token_id in expiry:
+                return True
+        return False
+
+    def prune(self) -> int:
+        """Drop entries whose tokens have all expired; returns how many"""
+        now = self._clock()
+        # Snapshot first: the sync thread prunes while the event loop may add
+        expired = [token_id for token_id, expires_at in list(self._expiry.items()) if expires_at <= now]
+        for token_id in expired:
+            self._expiry.pop(token_id, None)
+        return len(expired)
+
+    def clear(self) -> None:
+        self._expiry.clear()
+        self.last_id = 0
+        self.last_sync = None
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+
+revocations = RevocationSet()
+
+
+def revoke_local(token_ids: Iterable[str], expires_at: datetime) -> None:
+    """Make revocations visible in this process right away"""
+    timestamp = _epoch(expires_at)
+    for token_id in token_ids:
+        revocations.add(token_id, timestamp)
+
+
+def sync_revocations(engine: Engine, revocation_set: RevocationSet = revocations) -> int:
+    """Load revocations recorded since the last sync; returns rows read"""
+    now = datetime.now(timezone.utc)
+    query = (
+        select(revoked_tokens.c.id, revoked_tokens.c.token_id, revoked_tokens.c.expires_at)
+        .where(revoked_tokens.c.id > revocation_set.last_id - SYNC_OVERLAP)
+        .order_by(revoked_tokens.c.id)
+    )
+    if revocation_set.last_sync is None:
+        query = query.where(revoked_tokens.c.expires_at > now)
+
+    with engine.connect() as connection:
+        rows = connection.execute(query).all()
+
+    for row_id, token_id, expires_at in rows:
+        revocation_set.add(token_id, _epoch(expires_at))
+        revocation_set.last_id = max(revocation_set.last_id, row_id)
+    revocation_set.prune()
+    revocation_set.last_sync = time.time()
+    return len(rows)
+
+
+def purge_expired_tokens(engine: Engine) -> None:
+    """Delete refresh tokens and revocations that have expired"""
+    now = datetime.now(timezone.utc)
+    with engine.begin() as connection:
+        connection.execute(delete(refresh_tokens).where(refresh_tokens.c.expires_at < now))
+        connection.execute(delete(revoked_tokens).where(revoked_tokens.c.expires_at < now))
+
+
+async def run_revocation_sync(engine: Engine, interval: float) -> None:
+    """Background task: keep the revocation set in step with the database"""
+    rounds = 0
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(sync_revocations, engine)
+            rounds += 1
+            if rounds % PURGE_EVERY == 0:
+                await asyncio.to_thread(purge_expired_tokens, engine)
+        except Exception as e:
+            print(f"❌ Revocation sync failed: {e}")
@@ -3,6 +3,7 @@ Security utilities for password hashing and JWT tokens
 """
 from datetime import datetime, timedelta
 from typing import Optional, Any
+from uuid import uuid4
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
@@ -33,6 +34,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         )
     
     to_encode.update({"exp": expire, "type": "access"})
+    to_encode.setdefault("jti", uuid4().hex)  # Lets a single token be revoked
     encoded_jwt = jwt.encode(
         to_encode, 
         settings.SECRET_KEY, 
@@ -46,6 +48,7 @@ def create_refresh_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire, "type": "refresh"})
+    to_encode.setdefault("jti", uuid4().hex)
     
     encoded_jwt = jwt.encode(
         to_encode,
@@ -0,0 +1,146 @@
+"""
+Single Flight
+Collapse identical concurrent calls into one
+
+When a portfolio link is shared widely or many visitors ask the same
+question at the same moment, the same expensive work would otherwise run
+once per request. A ``SingleFlight`` group keys calls by operation and
+arguments: the first caller starts the work, callers arriving while it is
+in flight wait for that result instead of starting their own. Nothing is
+cached - once the call finishes, the next caller starts a fresh one.
+
+    portfolios = SingleFlight("portfolio")
+    payload = await portfolios.do(("slug", slug), lambda: asyncio.to_thread(load, slug))
+
+    llm = SingleFlight("llm")
+    async for token in llm.stream(prompt_key, lambda: client.stream(prompt)):
+        ...
+
+The shared work runs in its own task, so a caller that goes away (client
+disconnected) doesn't cancel it for the others; it is cancelled only when
+every caller has gone. Errors reach every caller.
+
+Shared streams replay what was already produced to late joiners, then
+follow live. The producer runs at its own pace and buffers every item, so
+use it for bounded streams (a completion capped at max_tokens).
+
+Metrics: ``singleflight.<name>.calls`` (work actually started) and
+``singleflight.<name>.collapsed`` (callers that joined one in flight).
+"""
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
+
+from app.core.metrics import get_counter
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class _Stream:
+    def __init__(self):
+        self.items: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.subscribers = 0
+
+    async def pump(self, source: AsyncIterator[Any]) -> None:
+        try:
+            async for item in source:
+                self.items.append(item)
+                self._notify()
+        except asyncio.CancelledError:
+            self.error = asyncio.CancelledError()
+            raise
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+
+    def _notify(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()  # Waiters hold the event that was current when they checked
+
+
+class SingleFlight:
+    """A group of keyed in-flight calls; one per kind of operation"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls_started = get_counter(f"singleflight.{name}.calls")
+        self.calls_collapsed = get_counter(f"singleflight.{name}.collapsed")
+        self._calls: Dict[Hashable, _Call] = {}
+        self._streams: Dict[Hashable, _Stream] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._streams)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Result of ``fn()``, shared with every caller using ``key`` while it runs"""
+        call = self._calls.get(key)
+        if call is None:
+            self.calls_started.inc()
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(self._calls, key, call))
+        else:
+            self.calls_collapsed.inc()
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if not call.task.done() and call.waiters == 1:
+                # Nobody else is waiting for it; later callers start afresh
+                self._forget(self._calls, key, call)
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    async def stream(self, key: Hashable, fn: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Items of ``fn()``, shared with every caller using ``key`` while it streams"""
+        shared = self._streams.get(key)
+        if shared is None:
+            self.calls_started.inc()
+            shared = _Stream()
+            shared.task = asyncio.ensure_future(shared.pump(fn()))
+            self._streams[key] = shared
+            shared.task.add_done_callback(lambda _: self._forget(self._streams, key, shared))
+        else:
+            self.calls_collapsed.inc()
+
+        shared.subscribers += 1
+        position = 0
+        try:
+            while True:
+                if position < len(shared.items):
+                    item = shared.items[position]
+                    position += 1
+                    yield item
+                    continue
+                if shared.done:
+                    if shared.error is not None:
+                        raise shared.error
+                    return
+                await shared.changed.wait()
+        finally:
+            shared.subscribers -= 1
+            if shared.subscribers == 0 and not shared.done:
+                # Last listener left; stop the upstream call and let it clean up before returning
+                self._forget(self._streams, key, shared)
+                shared.task.cancel()
+                await asyncio.wait({shared.task})
+
+    @staticmethod
+    def _forget(calls: dict, key: Hashable, call: Any) -> None:
+        if calls.get(key) is call:
+            del calls[key]
@@ -0,0 +1,136 @@
+"""
+Startup Phases
+Measured startup phases and lazy router loading for fast cold starts
+"""
+import asyncio
+import importlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Process-relative reference point: app.main imports this module before anything else
+_started_at = time.perf_counter()
+_phases: Dict[str, float] = {}
+_ready_at: Optional[float] = None
+
+
+def mark_process_start(started_at: float) -> None:
+    """Record when application import began"""
+    global _started_at
+    _started_at = started_at
+
+
+@contextmanager
+def phase(name: str):
+    """Time a named startup phase"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases[name] = round((time.perf_counter() - start) * 1000, 2)
+
+
+def record_phase(name: str, elapsed_ms: float) -> None:
+    """Record a phase measured elsewhere"""
+    _phases[name] = round(elapsed_ms, 2)
+
+
+def mark_ready() -> float:
+    """Mark the app as able to serve traffic and return total startup time (ms)"""
+    global _ready_at
+    _ready_at = time.perf_counter()
+    return round((_ready_at - _started_at) * 1000, 2)
+
+
+def startup_report(budget_ms: Optional[int] = None) -> dict:
+    """Return startup phase timings and how they compare to the budget"""
+    total = round((_ready_at - _started_at) * 1000, 2) if _ready_at else None
+    report = {
+        "ready": _ready_at is not None,
+        "total_ms": total,
+        "phases_ms": dict(_phases),
+    }
+    if budget_ms is not None:
+        report["budget_ms"] = budget_ms
+        report["within_budget"] = total is not None and total <= budget_ms
+    return report
+
+
+# (module path, URL prefix, OpenAPI tags)
+RouterSpec = Tuple[str, str, List[str]]
+
+
+class LazyRouters:
+    """
+    Imports route modules after the app starts serving
+
+    Route modules pull in passlib/bcrypt, jose, the ORM models and schemas.
+    Deferring them lets health checks answer immediately while the API
+    routes load in a worker thread; API requests that arrive early wait
+    for loading to finish instead of getting a 404.
+    """
+
+    def __init__(self, specs: Sequence[RouterSpec]):
+        self.specs = list(specs)
+        self.loaded = False
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+
+    def _import_modules(self) -> list:
+        return [importlib.import_module(module_path) for module_path, _, _ in self.specs]
+
+    def _include(self, app, modules: list) -> None:
+        with self._lock:
+            if self.loaded:
+                return
+            for module, (_, prefix, tags) in zip(modules, self.specs):
+                app.include_router(module.router, prefix=prefix, tags=tags)
+            app.openapi_schema = None  # Rebuild docs with the new routes
+            self.loaded = True
+
+    def load(self, app) -> None:
+        """Import and include all routers synchronously"""
+        if not self.loaded:
+            with phase("routers"):
+                self._include(app, self._import_modules())
+
+    async def _load_async(self, app) -> None:
+        with phase("routers"):
+            modules = await asyncio.to_thread(self._import_modules)
+            self._include(app, modules)
+
+    def start(self, app) -> asyncio.Task:
+        """Begin loading routers in the background"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._load_async(app))
+        return self._task
+
+    async def ensure_loaded(self, app) -> None:
+        """Wait for routers, starting the load if nobody has yet"""
+        if not self.loaded:
+            await asyncio.shield(self.start(app))
+
+
+class RouterGateMiddleware:
+    """
+    ASGI middleware that holds non-health requests until routers are loaded
+
+    Once loading has finished this is a single attribute check per request.
+    """
+
+    def __init__(self, app, routers: LazyRouters, fastapi_app, exempt_prefix: str = "/health"):
+        self.app = app
+        self.routers = routers
+        self.fastapi_app = fastapi_app
+        self.exempt_prefix = exempt_prefix
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not self.routers.loaded
+            and scope["type"] in ("http", "websocket")
+            and scope["path"] != "/"
+            and not scope["path"].startswith(self.exempt_prefix)
+        ):
+            await self.routers.ensure_loaded(self.fastapi_app)
+        await self.app(scope, receive, send)
@@ -0,0 +1,379 @@
+"""
+Tracing
+Lightweight spans for finding where a slow request spends its time
+
+A span times one stage of a request (auth, a query, history load, the LLM's
+time to first token, ...). Spans nest through a context variable, so a
+stage started inside another - also in ``asyncio.to_thread`` workers and
+tasks, which copy the context - becomes its child, and every span of a
+request shares one trace id.
+
+    with span("chat.retrieval", portfolio_id=3):
+        payload = load_portfolio_payload(db, slug)
+
+    timer = start_span("llm.first_token")   # Not made current; for generators
+    ...
+    timer.end()
+
+Every finished span is observed into the ``span.<name>`` histogram, so
+per-stage latency shows up in metrics_snapshot() without any exporter.
+Sampled traces are also handed to the exporter (TRACING_EXPORTER):
+
+    console   one line per span on stdout
+    file      JSON lines in TRACING_FILE, to aggregate offline with
+              ``python -m app.core.tracing summarize traces.jsonl``
+
+W3C trace context: an incoming ``traceparent`` header continues the
+caller's trace (its sampled flag is honoured), responses carry a
+``traceresponse`` header with our request span, and ``trace_headers()``
+gives the headers for outbound calls.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.config import settings
+from app.core.metrics import Histogram, get_histogram
+
+_TRACEPARENT = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(-.*)?$")
+INVALID_TRACE_ID = "0" * 32
+INVALID_SPAN_ID = "0" * 16
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace id, parent span id, sampled) from a traceparent header; None if invalid"""
+    if not value:
+        return None
+    match = _TRACEPARENT.match(value.strip())
+    if match is None:
+        return None
+    version, trace_id, span_id, flags, rest = match.groups()
+    if version == "ff" or (version == "00" and rest):
+        return None
+    if trace_id == INVALID_TRACE_ID or span_id == INVALID_SPAN_ID:
+        return None
+    return trace_id, span_id, bool(int(flags, 16) & 0x01)
+
+
+class Span:
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "sampled", "tracestate",
+        "attributes", "error", "started_at", "duration", "_start",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        sampled: bool,
+        tracestate: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.tracestate = tracestate
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.duration: Optional[float] = None
+        self._start = time.perf_counter()
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        if self.duration is not None:
+            return  # Already ended
+        self.duration = time.perf_counter() - self._start
+        if error is not None:
+            self.error = type(error).__name__
+        get_tracer().finish(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": round(self.started_at, 6),
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Stands in for spans while tracing is disabled"""
+    sampled = False
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def traceparent(self) -> Optional[str]:
+        return None
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class ConsoleExporter:
+    def export(self, span: Span) -> None:
+        error = f" ❌ {span.error}" if span.error else ""
+        print(f"🔍 {span.name} {span.duration * 1000:.1f}ms trace={span.trace_id[:8]} {span.attributes}{error}")
+
+    def close(self) -> None:
+        pass
+
+
+class FileExporter:
+    """
+    Appends spans as JSON lines
+
+    Every pre-fork worker appends to the same file, so each span goes out as
+    one unbuffered write to an O_APPEND descriptor: lines from different
+    processes never interleave, and a killed worker loses nothing written.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+
+    def export(self, span: Span) -> None:
+        line = (json.dumps(span.to_dict(), default=str) + "\n").encode("utf-8")
+        with self._lock:
+            if self._fd is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            os.write(self._fd, line)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+class Tracer:
+    def __init__(self, enabled: bool = True, exporter=None, sample_rate: float = 1.0):
+        self.enabled = enabled
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    def finish(self, span: Span) -> None:
+        get_histogram(f"span.{span.name}").observe(span.duration)
+        if span.sampled and self.exporter is not None:
+            try:
+                self.exporter.export(span)
+            except Exception as e:
+                print(f"⚠️ Exporting span {span.name} failed: {e}")
+
+    def close(self) -> None:
+        if self.exporter is not None:
+            self.exporter.close()
+
+
+@lru_cache()
+def get_tracer() -> Tracer:
+    """Process-wide tracer configured from settings"""
+    exporters = {
+        "none": lambda: None,
+        "console": ConsoleExporter,
+        "file": lambda: FileExporter(settings.TRACING_FILE),
+    }
+    if settings.TRACING_EXPORTER not in exporters:
+        raise ValueError(
+            f"Invalid TRACING_EXPORTER '{settings.TRACING_EXPORTER}'. Expected one of: {', '.join(exporters)}"
+        )
+    return Tracer(
+        enabled=settings.TRACING_ENABLED,
+        exporter=exporters[settings.TRACING_EXPORTER](),
+        sample_rate=settings.TRACING_SAMPLE_RATE,
+    )
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def start_span(
+    name: str,
+    parent: Optional[Span] = None,
+    traceparent: Optional[str] = None,
+    tracestate: Optional[str] = None,
+    **attributes: Any,
+) -> Span:
+    """
+    Start a span without making it current; call ``end()`` when the stage is over
+
+    The parent is ``parent``, else the current span, else the remote caller
+    from a ``traceparent`` header; without any, a new trace starts.
+    """
+    tracer = get_tracer()
+    if not tracer.enabled:
+        return NOOP_SPAN
+    parent = parent or _current.get()
+    if isinstance(parent, Span):
+        return Span(name, parent.trace_id, parent.span_id, parent.sampled, parent.tracestate, attributes)
+    remote = parse_traceparent(traceparent)
+    if remote is not None:
+        trace_id, parent_id, sampled = remote
+        return Span(name, trace_id, parent_id, sampled, tracestate, attributes)
+    sampled = tracer.sample_rate >= 1 or random.random() < tracer.sample_rate
+    return Span(name, secrets.token_hex(16), None, sampled, None, attributes)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Time the enclosed block as a child of the current span"""
+    current = start_span(name, **attributes)
+    if current is NOOP_SPAN:
+        yield current
+        return
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.end(e)
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+
+
+def trace_headers() -> Dict[str, str]:
+    """traceparent / tracestate for an outbound call made in the current span"""
+    current = _current.get()
+    if current is None:
+        return {}
+    headers = {"traceparent": current.traceparent()}
+    if current.tracestate:
+        headers["tracestate"] = current.tracestate
+    return headers
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the request's root span (HTTP and WebSocket)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket") or not get_tracer().enabled:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        root = start_span(
+            "http.request" if scope["type"] == "http" else "websocket",
+            traceparent=headers.get("traceparent"),
+            tracestate=headers.get("tracestate"),
+            method=scope.get("method", "GET"),
+            path=scope["path"],
+        )
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                root.set("status", message["status"])
+                MutableHeaders(scope=message).append("traceresponse", root.traceparent())
+            await send(message)
+
+        token = _current.set(root)
+        error = None
+        try:
+            await self.app(scope, receive, send_with_trace)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _current.reset(token)
+            root.end(error)
+
+
+_sqlalchemy_instrumented = False
+
+
+def instrument_sqlalchemy() -> None:
+    """Time every query run inside a trace as a ``db.query`` span"""
+    global _sqlalchemy_instrumented
+    if _sqlalchemy_instrumented:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:  # Background work (the message writer) isn't traced
+            operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+            conn.info.setdefault("trace_spans", []).append(start_span("db.query", operation=operation))
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            spans.pop().end()
+
+    @event.listens_for(Engine, "handle_error")
+    def _error(exception_context):
+        connection = exception_context.connection
+        spans = connection.info.get("trace_spans") if connection is not None else None
+        if spans:
+            spans.pop().end(exception_context.original_exception)
+
+    _sqlalchemy_instrumented = True
+
+
+def summarize(paths) -> Dict[str, dict]:
+    """Per-stage latency histograms from exported span files"""
+    histograms: Dict[str, Histogram] = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get("duration_ms") is None:
+                    continue
+                histogram = histograms.setdefault(record["name"], Histogram(record["name"]))
+                histogram.observe(record["duration_ms"] / 1000)
+    return {name: histograms[name].snapshot() for name in sorted(histograms)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate exported spans into per-stage latency histograms")
+    commands = parser.add_subparsers(dest="command", required=True)
+    summary = commands.add_parser("summarize", help="Histograms per span name (seconds)")
+    summary.add_argument("files", nargs="+", help="JSON lines written by the file exporter")
+    args = parser.parse_args()
+
+    report = summarize(args.files)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Warmup
+Preloading before fork and per-worker connection warming for the process manager
+
+``preload_app`` runs once in the master so the imported modules, models and
+settings are shared copy-on-write by every forked worker. ``warm_connections``
+runs in each worker before it accepts traffic, so the first real requests
+don't pay for opening connections or compiling statements.
+"""
+import time
+from typing import Dict
+
+from app.core.config import get_settings
+
+
+def preload_app(migrate: bool = True):
+    """
+    Import the application and everything it loads lazily
+
+    Returns the FastAPI app with all routers included. When ``migrate`` is
+    set the schema is checked (and upgraded) once here instead of racing
+    in every worker.
+    """
+    settings = get_settings()
+
+    from app.main import app, lazy_routers
+    lazy_routers.load(app)
+
+    from app.db.init_db import _register_models
+    _register_models()
+
+    # Load the bcrypt and JWT backends once, before fork
+    from app.core.security import create_access_token, decode_token, pwd_context
+    pwd_context.handler("bcrypt").get_backend()
+    decode_token(create_access_token({"sub": "warmup"}))
+
+    from app.db.session import get_session_router
+    router = get_session_router()
+    if migrate:
+        from app.db.migrations import ensure_schema
+        ensure_schema(router.primary_engine, migrate=settings.DB_MIGRATE_ON_STARTUP)
+
+    # Connections must not be shared across fork; children open their own
+    for engine in [router.primary_engine, *router.replica_engines]:
+        engine.dispose()
+
+    return app
+
+
+def warm_connections() -> Dict[str, float]:
+    """
+    Fill the worker's connection pools and statement cache; returns timings (ms)
+
+    Opens ``DB_POOL_SIZE`` connections on the primary and each replica, then
+    loads one public portfolio through the fast path so its statements sit
+    compiled in the engine's cache.
+    """
+    settings = get_settings()
+    timings: Dict[str, float] = {}
+
+    from sqlalchemy import select
+    from app.db.session import get_session_router
+    from app.models.portfolio import Portfolio, PortfolioVisibility
+    from app.services.portfolio_serializer import load_portfolio_payload
+
+    router = get_session_router()
+
+    start = time.perf_counter()
+    for engine in [router.primary_engine, *router.replica_engines]:
+        connections = [engine.connect() for _ in range(max(1, settings.DB_POOL_SIZE))]
+        for connection in connections:
+            connection.close()
+    timings["db_pool"] = round((time.perf_counter() - start) * 1000, 2)
+
+    start = time.perf_counter()
+    with router.read_session() as db:
+        slug = db.execute(
+            select(Portfolio.slug).where(Portfolio.visibility == PortfolioVisibility.PUBLIC).limit(1)
+        ).scalar()
+        if slug is not None:
+            load_portfolio_payload(db, slug)
+    timings["statements"] = round((time.perf_counter() - start) * 1000, 2)
+
+    return timings
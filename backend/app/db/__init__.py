@@ -1,14 +1,26 @@
 """
 DB Package
 """
-from app.db.session import Base, engine, SessionLocal, get_db
-from app.db.init_db import init_db, drop_db
-
-__all__ = [
-    "Base",
-    "engine",
-    "SessionLocal",
-    "get_db",
-    "init_db",
-    "drop_db",
-]
+import importlib
+
+# Resolved lazily so importing models does not create engines
+_EXPORTS = {
+    "Base": "app.db.session",
+    "engine": "app.db.session",
+    "SessionLocal": "app.db.session",
+    "get_db": "app.db.session",
+    "get_session_factory": "app.db.session",
+    "get_engine": "app.db.session",
+    "session_router": "app.db.session",
+    "init_db": "app.db.init_db",
+    "drop_db": "app.db.init_db",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_path = _EXPORTS.get(name)
+    if module_path is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module_path), name)
@@ -2,18 +2,35 @@
 Database initialization
 Import all models here to ensure they're registered with SQLAlchemy
 """
-from app.db.session import Base, engine
-from app.models.user import User
-from app.models.portfolio import Portfolio, Project, Skill, Experience
-from app.models.share import Share
-from app.models.message import Message, Conversation
+from app.db.session import Base, get_engine
 
 
-def init_db():
+def _register_models():
+    """
+    Import all models so they're registered on Base.metadata
+    Imported lazily because the model modules themselves import app.db
+    """
+    from app.models.user import User  # noqa: F401
+    from app.models.portfolio import Portfolio, Project, Skill, Experience  # noqa: F401
+    from app.models.share import Share  # noqa: F401
+    from app.models.message import Message, Conversation  # noqa: F401
+    from app.models.token import RefreshToken, RevokedToken  # noqa: F401
+    from app.models.storage import StorageUsage  # noqa: F401
+
+
+def init_db(engine=None):
     """Initialize database - create all tables"""
+    from app.db.migrations import stamp_head
+
+    _register_models()
+    engine = engine or get_engine()
     Base.metadata.create_all(bind=engine)
+    # The tables already match head; without a stamp the first upgrade
+    # would take them for a legacy schema and re-create newer tables
+    stamp_head(engine)
 
 
 def drop_db():
     """Drop all tables - use with caution!"""
-    Base.metadata.drop_all(bind=engine)
+    _register_models()
+    Base.metadata.drop_all(bind=get_engine())
@@ -0,0 +1,185 @@
+"""
+Schema migrations
+Boot-time schema version check and serialized Alembic upgrades
+
+Startup only runs a single ``SELECT version_num FROM alembic_version`` and
+compares it with ``SCHEMA_REVISION``. Alembic itself is imported only when
+an upgrade is actually needed, and upgrades are serialized across workers
+with a PostgreSQL advisory lock so concurrent boots don't race.
+"""
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+# Must match the newest file in alembic/versions (checked by test_migrations.py)
+SCHEMA_REVISION = "0005"
+
+# Revision describing databases created by the old create_all() startup
+LEGACY_REVISION = "0001"
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+MIGRATION_LOCK_ID = 0x41495641  # "AIVA"
+
+
+class SchemaOutOfDateError(RuntimeError):
+    """Raised when the database schema does not match the application"""
+
+
+def read_revision(connection: Connection) -> Optional[str]:
+    """Return the database's Alembic revision, or None if it has never been stamped"""
+    try:
+        revision = connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except DBAPIError:
+        revision = None
+    connection.rollback()  # Ends the read (and clears a failed transaction on PostgreSQL)
+    return revision
+
+
+def _has_legacy_tables(connection: Connection) -> bool:
+    from sqlalchemy import inspect
+    return inspect(connection).has_table("users")
+
+
+def alembic_config(connection: Optional[Connection] = None):
+    """Build an Alembic config, optionally bound to an existing connection"""
+    from alembic.config import Config
+
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    config.attributes["configure_logger"] = False
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+@contextmanager
+def _migration_lock(connection: Connection):
+    """Session-level advisory lock so only one process migrates at a time"""
+    if connection.dialect.name != "postgresql":
+        yield
+        return
+
+    connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+    connection.commit()
+    try:
+        yield
+    finally:
+        connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+        connection.commit()
+
+
+def upgrade_to_head(engine: Engine) -> Optional[str]:
+    """
+    Upgrade the database to the latest revision
+
+    Databases created by the old create_all() startup are stamped at the
+    initial revision first. Returns the revision the database started at.
+    """
+    from alembic import command
+
+    with engine.connect() as connection:
+        with _migration_lock(connection):
+            # Another worker may have migrated while we waited for the lock
+            revision = read_revision(connection)
+            if revision == SCHEMA_REVISION:
+                return revision
+
+            config = alembic_config(connection)
+            if revision is None and _has_legacy_tables(connection):
+                command.stamp(config, LEGACY_REVISION)
+                connection.commit()
+
+            command.upgrade(config, "head")
+            connection.commit()
+            return revision
+
+
+def stamp_head(engine: Engine) -> None:
+    """Record a schema built from the current models (create_all) as up to date"""
+    from alembic import command
+
+    with engine.connect() as connection:
+        command.stamp(alembic_config(connection), "head")
+        connection.commit()
+
+
+def ensure_schema(engine: Engine, migrate: bool) -> str:
+    """
+    Cheap boot-time schema check
+
+    Returns "current" when the schema already matches, "migrated" after a
+    successful upgrade. Raises SchemaOutOfDateError when the schema is
+    behind and ``migrate`` is False.
+    """
+    with engine.connect() as connection:
+        revision = read_revision(connection)
+
+    if revision == SCHEMA_REVISION:
+        return "current"
+
+    if not migrate:
+        raise SchemaOutOfDateError(
+            f"Database schema is at revision {revision or 'none'}, expected {SCHEMA_REVISION}. "
+            "Run 'alembic upgrade head'."
+        )
+
+    upgrade_to_head(engine)
+    return "migrated"
+
+
+# Helpers for use inside migration scripts
+
+def create_index_online(
+    index_name: str,
+    table_name: str,
+    columns: Sequence[str],
+    unique: bool = False,
+) -> None:
+    """
+    Create an index without blocking writes
+
+    On PostgreSQL this uses CREATE INDEX CONCURRENTLY outside the migration
+    transaction, dropping any INVALID leftover from an interrupted build
+    first. Other databases get a regular CREATE INDEX IF NOT EXISTS.
+    """
+    from alembic import op
+
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        op.create_index(index_name, table_name, list(columns), unique=unique, if_not_exists=True)
+        return
+
+    with op.get_context().autocommit_block():
+        invalid = bind.execute(
+            text(
+                "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ),
+            {"name": index_name},
+        ).first()
+        if invalid:
+            op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
+        op.create_index(
+            index_name,
+            table_name,
+            list(columns),
+            unique=unique,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def drop_index_online(index_name: str, table_name: str) -> None:
+    """Drop an index without blocking writes (DROP INDEX CONCURRENTLY on PostgreSQL)"""
+    from alembic import op
+
+    if op.get_bind().dialect.name != "postgresql":
+        op.drop_index(index_name, table_name=table_name, if_exists=True)
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,127 @@
+"""
+Database connection pool
+Pool configuration, pre-ping strategy and occupancy telemetry
+"""
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from app.core.metrics import get_counter, get_histogram
+
+PRE_PING_STRATEGIES = ("always", "idle", "never")
+
+checkout_wait = get_histogram("db.pool.checkout_wait_seconds")
+checkout_timeouts = get_counter("db.pool.checkout_timeouts")
+idle_pings = get_counter("db.pool.idle_pings")
+invalidated = get_counter("db.pool.invalidated")
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            checkout_timeouts.inc()
+            raise
+        finally:
+            checkout_wait.observe(time.perf_counter() - start)
+
+
+def build_engine_kwargs(settings: Any, url: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build create_engine() keyword arguments from settings
+
+    SQLite keeps SQLAlchemy's default pool, so pool sizing only applies to
+    server databases such as PostgreSQL.
+    """
+    strategy = settings.DB_POOL_PRE_PING
+    if strategy not in PRE_PING_STRATEGIES:
+        raise ValueError(
+            f"Invalid DB_POOL_PRE_PING '{strategy}'. "
+            f"Expected one of: {', '.join(PRE_PING_STRATEGIES)}"
+        )
+
+    kwargs: Dict[str, Any] = {
+        "echo": settings.DEBUG,
+        "pool_pre_ping": strategy == "always",
+    }
+
+    if not (url or settings.DATABASE_URL).startswith("sqlite"):
+        kwargs.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_use_lifo=True,  # Keeps surplus connections idle so recycle can reap them
+        )
+
+    return kwargs
+
+
+def install_pool_listeners(engine: Engine, strategy: str, idle_seconds: int) -> None:
+    """
+    Attach pool event listeners
+
+    With the "idle" strategy a connection is only pinged on checkout when it
+    has been sitting in the pool longer than ``idle_seconds``, so hot
+    connections skip the extra round trip that pool_pre_ping adds.
+    """
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        invalidated.inc()
+
+    if strategy != "idle":
+        return
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+
+        idle_pings.inc()
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except Exception:
+            # Tells the pool to discard this connection and retry with a fresh one
+            raise exc.DisconnectionError("Stale connection detected on checkout")
+        finally:
+            cursor.close()
+
+
+def pool_status(engine: Engine) -> Dict[str, Any]:
+    """Return live pool occupancy and checkout wait statistics"""
+    pool = engine.pool
+    status: Dict[str, Any] = {"pool_class": type(pool).__name__}
+
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+            max_overflow=pool._max_overflow,
+        )
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        status["utilization"] = round(pool.checkedout() / capacity, 3) if capacity else None
+
+    status.update(
+        checkout_wait=checkout_wait.snapshot(),
+        checkout_timeouts=checkout_timeouts.value,
+        idle_pings=idle_pings.value,
+        invalidated=invalidated.value,
+    )
+    return status
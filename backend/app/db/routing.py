@@ -0,0 +1,197 @@
+"""
+Read/write session routing
+Sends read-only sessions to replicas and writes to the primary database
+"""
+import itertools
+import math
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.datastructures import MutableHeaders
+
+PRIMARY_COOKIE = "read_primary_until"  # Unix time until which the client's reads stay on the primary
+
+
+class _WriteMarker:
+    """Set when the current request commits a write on the primary"""
+    __slots__ = ("wrote",)
+
+    def __init__(self):
+        self.wrote = False
+
+
+_request_writes: ContextVar[Optional[_WriteMarker]] = ContextVar("request_writes", default=None)
+
+
+class ReplicaWriteError(RuntimeError):
+    """Raised when a write is attempted through a read replica session"""
+
+
+class SessionRouter:
+    """
+    Routes sessions between a primary engine and zero or more replicas
+
+    Read sessions are spread round-robin over the replicas. After a user
+    commits a write on the primary, their reads stay on the primary for
+    ``sticky_seconds`` so they always see their own changes even if the
+    replicas are lagging (read-your-writes).
+
+    Each process remembers the users whose writes it handled; to pin a
+    client whichever worker or host serves its next request, the
+    ReadYourWritesMiddleware also hands it a cookie (see ``pinned_until``).
+    """
+
+    def __init__(
+        self,
+        primary_engine: Engine,
+        replica_engines: Optional[List[Engine]] = None,
+        sticky_seconds: float = 5.0,
+    ):
+        self.primary_engine = primary_engine
+        self.replica_engines = list(replica_engines or [])
+        self.sticky_seconds = sticky_seconds
+
+        self.primary_factory = sessionmaker(autocommit=False, autoflush=False, bind=primary_engine)
+        self.replica_factories = [
+            sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            for engine in self.replica_engines
+        ]
+
+        self._next_replica = itertools.count()
+        self._recent_writes: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+        event.listen(self.primary_factory, "after_flush", self._on_write)
+        event.listen(self.primary_factory, "do_orm_execute", self._on_execute)
+        event.listen(self.primary_factory, "after_commit", self._on_commit)
+        event.listen(self.primary_factory, "after_rollback", self._on_rollback)
+        for factory in self.replica_factories:
+            event.listen(factory, "before_flush", self._reject_write)
+
+    # Session factories
+
+    def write_session(self) -> Session:
+        """Return a session bound to the primary database"""
+        return self.primary_factory()
+
+    def read_session(self, user_id: Optional[int] = None, pinned: bool = False) -> Session:
+        """
+        Return a session for read-only work
+
+        Falls back to the primary when no replicas are configured, the caller
+        is ``pinned`` (its cookie says it wrote recently) or the user has
+        committed a write through this process within the stickiness window.
+        """
+        if not self.replica_factories or pinned or (user_id is not None and self.is_sticky(user_id)):
+            return self.primary_factory()
+
+        index = next(self._next_replica) % len(self.replica_factories)
+        session = self.replica_factories[index]()
+        session.info["read_only"] = True
+        return session
+
+    # Read-your-writes stickiness
+
+    def mark_write(self, user_id: int) -> None:
+        """Pin a user's reads to the primary for the stickiness window"""
+        with self._lock:
+            self._recent_writes[user_id] = time.monotonic() + self.sticky_seconds
+            if len(self._recent_writes) > 10000:
+                self._prune()
+
+    def is_sticky(self, user_id: int) -> bool:
+        """Check whether a user's reads must go to the primary"""
+        expires_at = self._recent_writes.get(user_id)
+        return expires_at is not None and expires_at > time.monotonic()
+
+    def pinned_until(self, cookie: Optional[str]) -> bool:
+        """
+        Check the PRIMARY_COOKIE value a client sent back
+
+        Values further ahead than the stickiness window (plus a second of
+        clock skew between hosts) are ignored, so a client can't pin itself
+        to the primary for longer.
+        """
+        try:
+            until = float(cookie) if cookie else 0.0
+        except ValueError:
+            return False
+        now = time.time()
+        return now < until <= now + self.sticky_seconds + 1
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for user_id in [u for u, expires in self._recent_writes.items() if expires <= now]:
+            del self._recent_writes[user_id]
+
+    # Session event hooks
+
+    @staticmethod
+    def _on_write(session, flush_context):
+        session.info["has_writes"] = True
+
+    @staticmethod
+    def _on_execute(orm_execute_state):
+        if not orm_execute_state.is_select:
+            orm_execute_state.session.info["has_writes"] = True
+
+    def _on_commit(self, session):
+        has_writes = session.info.pop("has_writes", False)
+        if not has_writes:
+            return
+        marker = _request_writes.get()
+        if marker is not None:
+            marker.wrote = True
+        user_id = session.info.get("user_id")
+        if user_id is not None:
+            self.mark_write(user_id)
+
+    @staticmethod
+    def _on_rollback(session):
+        session.info.pop("has_writes", None)
+
+    @staticmethod
+    def _reject_write(session, flush_context, instances):
+        if session.new or session.dirty or session.deleted:
+            raise ReplicaWriteError("Cannot write through a read replica session")
+
+
+class ReadYourWritesMiddleware:
+    """
+    Carries read-your-writes stickiness to whichever worker serves next
+
+    A response to a request that committed a write sets PRIMARY_COOKIE to the
+    end of the stickiness window; ``get_read_db`` keeps that client's reads on
+    the primary until then, on every worker and host.
+    """
+
+    def __init__(self, app, sticky_seconds: float):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        marker = _WriteMarker()
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and marker.wrote:
+                MutableHeaders(scope=message).append(
+                    "set-cookie",
+                    f"{PRIMARY_COOKIE}={time.time() + self.sticky_seconds:.3f}; "
+                    f"Max-Age={math.ceil(self.sticky_seconds)}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        token = _request_writes.set(marker)
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            _request_writes.reset(token)
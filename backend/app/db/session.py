@@ -1,21 +1,47 @@
 """
 Database connection and session management
 """
+from functools import lru_cache
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.orm import Session, sessionmaker
 from typing import Generator
 from app.core.config import settings
+from app.core.tracing import instrument_sqlalchemy, start_span
+from app.db.pool import build_engine_kwargs, install_pool_listeners
+from app.db.routing import SessionRouter
 
-# Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    echo=settings.DEBUG
-)
 
-# Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _create_engine(url: str):
+    """Create an engine with the configured pool settings"""
+    new_engine = create_engine(url, **build_engine_kwargs(settings, url))
+    if settings.TRACING_ENABLED:
+        instrument_sqlalchemy()  # Queries inside a traced request become db.query spans
+    install_pool_listeners(
+        new_engine,
+        strategy=settings.DB_POOL_PRE_PING,
+        idle_seconds=settings.DB_POOL_PRE_PING_IDLE_SECONDS
+    )
+    return new_engine
+
+
+@lru_cache()
+def get_session_router() -> SessionRouter:
+    """
+    Create engines (primary + optional read replicas) on first use
+    Routes reads to replicas and writes to the primary
+    """
+    return SessionRouter(
+        _create_engine(settings.DATABASE_URL),
+        [_create_engine(url) for url in settings.DATABASE_REPLICA_URLS],
+        sticky_seconds=settings.REPLICA_STICKY_SECONDS
+    )
+
+
+def get_engine():
+    """Primary database engine"""
+    return get_session_router().primary_engine
+
 
 # Create Base class for models
 Base = declarative_base()
@@ -26,8 +52,34 @@ def get_db() -> Generator[Session, None, None]:
     Database session dependency
     Yields a database session and ensures it's closed after use
     """
-    db = SessionLocal()
+    held = start_span("db.session")  # How long the request keeps the session
+    db = get_session_router().primary_factory()
     try:
         yield db
     finally:
         db.close()
+        held.end()
+
+
+def get_session_factory() -> sessionmaker:
+    """
+    Session factory dependency, for long-lived handlers (the chat WebSocket)
+    that open a short session per step instead of holding one from get_db
+    """
+    return get_session_router().primary_factory
+
+
+# Engines are created lazily; these names stay importable for existing callers
+_LAZY_ATTRIBUTES = {
+    "engine": lambda: get_session_router().primary_engine,
+    "replica_engines": lambda: get_session_router().replica_engines,
+    "session_router": get_session_router,
+    "SessionLocal": lambda: get_session_router().primary_factory,  # Always bound to the primary
+}
+
+
+def __getattr__(name):
+    factory = _LAZY_ATTRIBUTES.get(name)
+    if factory is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return factory()
@@ -2,12 +2,32 @@
 Main FastAPI Application
 Entry point for the AIVA Backend API
 """
-from fastapi import FastAPI
+from app.core import startup  # First: its import time is the process start the cold-start budget measures
+
+import asyncio
+import ipaddress
+
+from fastapi import Depends, FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from contextlib import asynccontextmanager
 from app.core.config import settings
-from app.db.init_db import init_db
+from app.core.compression import CompressionMiddleware
+from app.core.ratelimit import RateLimitMiddleware, get_rate_limiter
+from app.core.tracing import TracingMiddleware, get_tracer
+
+# Route modules are imported lazily after startup (see app.core.startup)
+ROUTERS = [
+    ("app.api.routes.auth", "/api/auth", ["Authentication"]),
+    ("app.api.routes.upload", "/api/upload", ["Upload"]),
+    ("app.api.routes.portfolios", "/api/portfolios", ["Portfolios"]),
+    ("app.api.routes.chat", "/api/chat", ["Chat"]),
+    # NOTE: Additional routers will be added as we build them
+    # ("app.api.routes.users", "/api/users", ["Users"]),
+    # ("app.api.routes.projects", "/api/projects", ["Projects"]),
+    # ("app.api.routes.shares", "/api/shares", ["Shares"]),
+]
+lazy_routers = startup.LazyRouters(ROUTERS)
 
 
 @asynccontextmanager
@@ -20,17 +40,75 @@ async def lifespan(app: FastAPI):
     print(f"📊 Environment: {settings.ENVIRONMENT}")
     print(f"🔧 Debug Mode: {settings.DEBUG}")
     
-    # Initialize database
+    # Check the schema version (and migrate if allowed)
+    try:
+        with startup.phase("database"):
+            from app.db.migrations import ensure_schema
+            from app.db.session import get_engine
+            schema_status = ensure_schema(get_engine(), migrate=settings.DB_MIGRATE_ON_STARTUP)
+        if schema_status == "migrated":
+            print("✅ Database migrated to the latest schema")
+        else:
+            print("✅ Database schema is up to date")
+    except Exception as e:
+        print(f"❌ Database schema check failed: {e}")
+    
+    # Load revoked token ids so auth checks never query the database
+    from app.core.revocation import run_revocation_sync, sync_revocations
+    from app.db.session import get_engine
     try:
-        init_db()
-        print("✅ Database initialized successfully")
+        with startup.phase("revocations"):
+            sync_revocations(get_engine())
     except Exception as e:
-        print(f"❌ Database initialization failed: {e}")
+        print(f"❌ Loading token revocations failed: {e}")
+    revocation_sync = asyncio.create_task(
+        run_revocation_sync(get_engine(), settings.REVOCATION_SYNC_SECONDS)
+    )
+    
+    # Delete resumable upload sessions nobody came back to
+    from app.services.resumable_uploads import get_resumable_uploads, run_upload_gc
+    if settings.STORAGE_BACKEND != "local" and not settings.UPLOAD_PARTIAL_DIR:
+        print("⚠️  Resumable uploads keep partial files on this node; set UPLOAD_PARTIAL_DIR "
+              "to a shared volume or route each upload to one node")
+    upload_gc = asyncio.create_task(
+        run_upload_gc(get_resumable_uploads(), settings.UPLOAD_SESSION_GC_SECONDS)
+    )
+    
+    # Load API routes in the background so health checks answer immediately
+    if settings.LAZY_ROUTERS:
+        lazy_routers.start(app)
+    else:
+        lazy_routers.load(app)
+    
+    total_ms = startup.mark_ready()
+    budget = "✅" if total_ms <= settings.COLD_START_BUDGET_MS else "⚠️ over budget"
+    print(f"⏱️  Ready in {total_ms}ms (budget {settings.COLD_START_BUDGET_MS}ms) {budget}")
     
     yield
     
     # Shutdown
     print("👋 Shutting down AIVA Backend...")
+    revocation_sync.cancel()
+    upload_gc.cancel()
+    
+    # Write queued chat messages before the worker exits
+    from app.services.message_writer import get_message_writer
+    writer = get_message_writer()
+    pending = writer.pending
+    await asyncio.to_thread(writer.stop)
+    if pending:
+        print(f"✅ Wrote {pending} queued chat messages")
+    
+    # Let thumbnails already being rendered finish
+    from app.services.thumbnails import get_thumbnail_pipeline
+    await asyncio.to_thread(get_thumbnail_pipeline().shutdown)
+    
+    # Finish multipart uploads in flight and close pooled storage connections
+    from app.services.storage import get_storage
+    await asyncio.to_thread(get_storage().close)
+    
+    # Flush spans buffered by the file exporter
+    get_tracer().close()
 
 
 # Create FastAPI app
@@ -43,6 +121,38 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Compress JSON, NDJSON and event streams (innermost, so it sees the app's responses as sent)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        zstd_level=settings.COMPRESSION_ZSTD_LEVEL,
+        cache_bytes=settings.COMPRESSION_CACHE_BYTES
+    )
+
+# Read-your-writes across workers: a write pins the client's reads to the primary by cookie
+if settings.DATABASE_REPLICA_URLS:
+    from app.db.routing import ReadYourWritesMiddleware
+    app.add_middleware(
+        ReadYourWritesMiddleware,
+        sticky_seconds=settings.REPLICA_STICKY_SECONDS
+    )
+
+# Hold API requests until lazily loaded routers are in place
+app.add_middleware(
+    startup.RouterGateMiddleware,
+    routers=lazy_routers,
+    fastapi_app=app
+)
+
+# Rate limits (inside CORS so browsers can read 429 responses)
+app.add_middleware(
+    RateLimitMiddleware,
+    limiter=get_rate_limiter()
+)
+
 # CORS Middleware
 app.add_middleware(
     CORSMiddleware,
@@ -59,6 +169,10 @@ if not settings.DEBUG:
         allowed_hosts=settings.ALLOWED_HOSTS
     )
 
+# Request spans (outermost, so the trace covers every other middleware)
+if settings.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware)
+
 
 # Health check endpoint
 @app.get("/", tags=["Health"])
@@ -82,18 +196,40 @@ async def health_check():
     }
 
 
-# Import and include routers
-from app.api.routes import auth, upload
+def internal_network_only(request: Request) -> None:
+    """Refuse diagnostics to clients outside DIAGNOSTICS_NETWORKS"""
+    try:
+        address = ipaddress.ip_address(request.client.host if request.client else "")
+    except ValueError:
+        address = None
+    if address is None or not any(
+        address in ipaddress.ip_network(network, strict=False) for network in settings.DIAGNOSTICS_NETWORKS
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Diagnostics are only available from internal networks"
+        )
+
+
+@app.get("/health/db", tags=["Health"], dependencies=[Depends(internal_network_only)])
+async def database_health():
+    """Connection pool occupancy and checkout wait times"""
+    from app.db.pool import pool_status
+    from app.db.session import engine, replica_engines
+
+    return {
+        "status": "healthy",
+        "pool": pool_status(engine),
+        "replicas": [pool_status(replica) for replica in replica_engines]
+    }
 
-app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
-app.include_router(upload.router, prefix="/api/upload", tags=["Upload"])
 
-# NOTE: Additional routers will be added as we build them
-# app.include_router(users.router, prefix="/api/users", tags=["Users"])
-# app.include_router(portfolios.router, prefix="/api/portfolios", tags=["Portfolios"])
-# app.include_router(projects.router, prefix="/api/projects", tags=["Projects"])
-# app.include_router(chat.router, prefix="/api/chat", tags=["Chat"])
-# app.include_router(shares.router, prefix="/api/shares", tags=["Shares"])
+@app.get("/health/startup", tags=["Health"], dependencies=[Depends(internal_network_only)])
+async def startup_health():
+    """Startup phase timings against the cold-start budget"""
+    report = startup.startup_report(settings.COLD_START_BUDGET_MS)
+    report["routers_loaded"] = lazy_routers.loaded
+    return report
 
 
 if __name__ == "__main__":
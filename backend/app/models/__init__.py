@@ -6,6 +6,8 @@ from app.models.user import User, UserRole
 from app.models.portfolio import Portfolio, Project, Skill, Experience, PortfolioVisibility
 from app.models.share import Share
 from app.models.message import Message, Conversation, MessageType
+from app.models.token import RefreshToken, RevokedToken
+from app.models.storage import StorageUsage
 
 __all__ = [
     "User",
@@ -19,4 +21,7 @@ __all__ = [
     "Message",
     "Conversation",
     "MessageType",
+    "RefreshToken",
+    "RevokedToken",
+    "StorageUsage",
 ]
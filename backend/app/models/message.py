@@ -2,9 +2,9 @@
 Message and Conversation Models
 For chat functionality and recruiter-candidate communication
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import expression, func
 from app.db.session import Base
 import enum
 
@@ -20,7 +20,7 @@ class Conversation(Base):
     __tablename__ = "conversations"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     portfolio_id = Column(Integer, ForeignKey("portfolios.id", ondelete="CASCADE"), nullable=True)
     
     # Conversation metadata
@@ -41,6 +41,9 @@ class Conversation(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_conversation_created", "conversation_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=True)
@@ -60,6 +63,7 @@ class Message(Base):
     # Voice/AI metadata (optional)
     triggered_by_voice = Column(Boolean, default=False)
     ai_model = Column(String, nullable=True)  # e.g., "gpt-4"
+    is_truncated = Column(Boolean, default=False, server_default=expression.false())  # Reply cut short: visitor left or deadline passed
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
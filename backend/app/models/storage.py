@@ -0,0 +1,27 @@
+"""
+Storage Models
+Per-user totals of stored upload bytes and files
+"""
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+
+class StorageUsage(Base):
+    """
+    Running totals of one user's uploads
+
+    Updated in the same transaction that admits or removes a file
+    (app.services.storage_usage), so quota checks and the usage display read
+    one row instead of walking the user's files. ``python -m
+    app.services.upload_migration`` recounts them from storage.
+    """
+    __tablename__ = "storage_usage"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    bytes_used = Column(BigInteger, nullable=False, default=0, server_default="0")
+    file_count = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<StorageUsage user={self.user_id} bytes={self.bytes_used} files={self.file_count}>"
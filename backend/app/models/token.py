@@ -0,0 +1,52 @@
+"""
+Token Models
+Server-side refresh token families and revoked token ids
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+
+class RefreshToken(Base):
+    """
+    One issued refresh token
+
+    Tokens from the same login share a ``family_id``. Each refresh marks the
+    presented token used and issues the next one in the family; presenting a
+    used token again means it was stolen, and the whole family is revoked.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    jti = Column(String(32), unique=True, index=True, nullable=False)
+    family_id = Column(String(32), index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    # Lifecycle
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    used_at = Column(DateTime(timezone=True), nullable=True)  # Set when rotated
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<RefreshToken {self.jti} family={self.family_id}>"
+
+
+class RevokedToken(Base):
+    """
+    Revoked access token ids (``jti``) and session families (``fid``)
+
+    Every worker mirrors this table into an in-memory set
+    (app.core.revocation), so request authentication never queries it.
+    Rows can be deleted once ``expires_at`` passes - no access token
+    carrying the id can still be valid.
+    """
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True)
+    token_id = Column(String(32), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<RevokedToken {self.token_id}>"
@@ -30,7 +30,9 @@ from app.schemas.portfolio import (
     SkillResponse,
     ExperienceCreate,
     ExperienceUpdate,
-    ExperienceResponse
+    ExperienceResponse,
+    PortfolioImport,
+    PortfolioImportResult
 )
 from app.schemas.message import (
     MessageCreate,
@@ -75,6 +77,8 @@ __all__ = [
     "ExperienceCreate",
     "ExperienceUpdate",
     "ExperienceResponse",
+    "PortfolioImport",
+    "PortfolioImportResult",
     # Message
     "MessageCreate",
     "MessageResponse",
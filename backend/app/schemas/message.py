@@ -25,6 +25,7 @@ class MessageResponse(MessageBase):
     recipient_id: Optional[int] = None
     is_read: bool
     ai_model: Optional[str] = None
+    is_truncated: Optional[bool] = False
     triggered_by_voice: bool
     created_at: datetime
     
@@ -198,3 +198,19 @@ class PortfolioListResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+# Bulk Import Schemas
+class PortfolioImport(BaseModel):
+    """Items to add to a portfolio in one request"""
+    projects: List[ProjectCreate] = []
+    skills: List[SkillCreate] = []
+    experiences: List[ExperienceCreate] = []
+    replace: bool = False  # Delete existing items first
+
+
+class PortfolioImportResult(BaseModel):
+    """Number of rows created per item type"""
+    projects: int
+    skills: int
+    experiences: int
@@ -2,8 +2,9 @@
 Upload Schemas
 Pydantic models for file upload endpoints
 """
+from datetime import datetime
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, Literal, Optional
 
 class UploadResponse(BaseModel):
     """Response for file upload"""
@@ -14,6 +15,35 @@ class UploadResponse(BaseModel):
     file_type: str
     file_size: int
     category: str
+    content_hash: Optional[str] = None  # SHA-256, images only
+    thumbnails: Optional[Dict[str, str]] = None  # Width -> WebP derivative URL, images only
+
+
+class ResumableUploadCreate(BaseModel):
+    """Request to start a resumable upload"""
+    file_name: str = Field(..., min_length=1, max_length=255)
+    content_type: str
+    size: int = Field(..., gt=0, description="Total file size in bytes")
+    category: Literal["resumes", "documents"] = "documents"  # Images always go to "images"
+    checksum: Optional[str] = Field(None, pattern=r"^[0-9a-fA-F]{64}$", description="SHA-256 of the whole file")
+
+
+class ResumableUploadSession(BaseModel):
+    """State of a resumable upload"""
+    upload_id: str
+    upload_url: str
+    file_name: str
+    size: int
+    offset: int  # Bytes received so far; the next chunk starts here
+    chunk_size: int  # Suggested bytes per PATCH
+    expires_at: datetime
+
+
+class StorageUsageResponse(BaseModel):
+    """A user's upload storage usage"""
+    bytes_used: int
+    file_count: int
+    quota_bytes: int  # 0 when unlimited
 
 
 class LinkedInUploadRequest(BaseModel):
@@ -29,3 +59,14 @@ class LinkedInUploadResponse(BaseModel):
     profile_url: Optional[str] = None
     data_source: str  # "url" or "raw_data"
     stored_path: Optional[str] = None
+
+
+class LinkedInImportResponse(BaseModel):
+    """Response for a LinkedIn export import"""
+    success: bool
+    message: str
+    portfolio_id: int
+    experiences: int
+    skills: int
+    projects: int
+    skipped: int  # Rows missing required fields
@@ -0,0 +1,427 @@
+"""
+Process Manager
+Production entry point: pre-forking multi-worker server with rolling restarts
+
+Usage:
+    python -m app.server                 # one worker per available CPU core
+    python -m app.server --workers 4
+
+The master binds the listening socket, preloads the app (PRELOAD_APP=True)
+and forks workers that share the socket; the kernel spreads connections
+across them. Each worker warms its caches before reporting ready.
+
+Signals (sent to the master):
+    SIGTERM / SIGINT   graceful shutdown, in-flight requests finish first
+    SIGHUP             rolling restart, one worker at a time
+    SIGTTIN / SIGTTOU  add / remove one worker
+
+Workers that die are replaced. With WORKER_MAX_REQUESTS set, each worker
+exits cleanly after that many requests and is replaced the same way.
+
+With PRELOAD_APP=False workers are started as fresh interpreters, so a
+rolling restart picks up new code without dropping the listening socket.
+"""
+import argparse
+import os
+import random
+import select
+import signal
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.core.config import get_settings
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def available_cpus() -> int:
+    """CPU cores this process may use, honouring affinity and cgroup quotas"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - not available on macOS
+        cpus = os.cpu_count() or 1
+
+    # cgroup v2 CPU quota, e.g. "200000 100000" for 2 cores in a container
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Create the listening socket shared by all workers"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _exit_gracefully(signum, frame):
+    raise SystemExit(0)
+
+
+def max_requests(limit: int, jitter: int) -> Optional[int]:
+    """This worker's request limit, or None to serve forever"""
+    if limit <= 0:
+        return None
+    return limit + random.randint(0, max(0, jitter))
+
+
+def run_worker(sock: socket.socket, ready_fd: int, app=None) -> None:
+    """Warm connections, then serve on ``sock``; writes to ``ready_fd`` once serving"""
+    import asyncio
+
+    import uvicorn
+    from app.core import startup
+    from app.core.warmup import preload_app, warm_connections
+
+    settings = get_settings()
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGTERM, _exit_gracefully)
+    signal.signal(signal.SIGINT, _exit_gracefully)
+    for sig in (signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU, signal.SIGCHLD):
+        signal.signal(sig, signal.SIG_DFL)
+    startup.mark_process_start(time.perf_counter())  # /health/startup reports this worker's boot
+
+    if app is None:
+        app = preload_app(migrate=False)
+    timings = warm_connections()
+    for name, elapsed_ms in timings.items():
+        startup.record_phase(f"warm_{name}", elapsed_ms)
+    print(f"🔥 Worker {os.getpid()} warmed: {timings}", flush=True)
+
+    class WorkerServer(uvicorn.Server):
+        async def startup(self, sockets=None):
+            await super().startup(sockets=sockets)
+            if self.started:
+                os.write(ready_fd, b"R")
+                os.close(ready_fd)
+
+        async def shutdown(self, sockets=None):
+            # uvicorn drops connections that haven't sent a request yet; give
+            # those accepted just before we stopped accepting time to send one
+            for server in self.servers:
+                server.close()
+            await asyncio.sleep(0.1)
+            await super().shutdown(sockets=sockets)
+
+    config = uvicorn.Config(
+        app,
+        lifespan="on",
+        log_level="debug" if settings.DEBUG else "info",
+        timeout_graceful_shutdown=settings.WORKER_GRACEFUL_TIMEOUT,
+        limit_max_requests=max_requests(settings.WORKER_MAX_REQUESTS, settings.WORKER_MAX_REQUESTS_JITTER),
+    )
+    WorkerServer(config).run(sockets=[sock])
+
+
+@dataclass
+class Worker:
+    pid: int
+    ready_fd: int
+    started_at: float = field(default_factory=time.monotonic)
+    ready: bool = False
+    process: Optional[subprocess.Popen] = None
+
+
+class Arbiter:
+    """
+    Master process: spawns, supervises and restarts workers
+
+    Signal handlers only queue the signal; all work happens in the main
+    loop, which waits on the workers' readiness pipes.
+    """
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        workers: int,
+        preload: bool = True,
+        boot_timeout: float = 60,
+        graceful_timeout: float = 30,
+    ):
+        self.sock = sock
+        self.num_workers = workers
+        self.preload = preload
+        self.boot_timeout = boot_timeout
+        self.graceful_timeout = graceful_timeout
+        self.app = None
+        self.workers: Dict[int, Worker] = {}
+        self.retiring: Dict[int, float] = {}  # pid -> time SIGTERM was sent
+        self.restart_queue: List[int] = []
+        self.replacement: Optional[int] = None
+        self._signals: List[int] = []
+        self._stopping = False
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self._wakeup_w, False)
+
+    # Signals
+
+    def _queue_signal(self, signum, frame):
+        self._signals.append(signum)
+
+    def install_signals(self) -> None:
+        signal.set_wakeup_fd(self._wakeup_w)  # Wakes the main loop's select()
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU, signal.SIGCHLD):
+            signal.signal(sig, self._queue_signal)
+
+    def _handle_signals(self) -> None:
+        while self._signals:
+            sig = self._signals.pop(0)
+            if sig in (signal.SIGTERM, signal.SIGINT):
+                self._stopping = True
+            elif sig == signal.SIGHUP:
+                self.start_rolling_restart()
+            elif sig == signal.SIGTTIN:
+                self.num_workers += 1
+            elif sig == signal.SIGTTOU and self.num_workers > 1:
+                self.num_workers -= 1
+
+    # Workers
+
+    def spawn_worker(self) -> Worker:
+        read_fd, write_fd = os.pipe()
+        if self.preload:
+            pid = os.fork()
+            if pid == 0:
+                os.close(read_fd)
+                os.close(self._wakeup_r)
+                os.close(self._wakeup_w)
+                code = 0
+                try:
+                    run_worker(self.sock, write_fd, app=self.app)
+                except SystemExit as e:
+                    code = e.code if isinstance(e.code, int) else 0
+                except BaseException:
+                    import traceback
+                    traceback.print_exc()
+                    code = 1
+                finally:
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                    os._exit(code)
+            process = None
+        else:
+            process = subprocess.Popen(
+                [
+                    sys.executable, "-m", "app.server", "--worker",
+                    "--fd", str(self.sock.fileno()), "--ready-fd", str(write_fd),
+                ],
+                cwd=BACKEND_DIR,
+                pass_fds=(self.sock.fileno(), write_fd),
+            )
+            pid = process.pid
+        os.close(write_fd)
+        worker = Worker(pid=pid, ready_fd=read_fd, process=process)
+        self.workers[pid] = worker
+        return worker
+
+    def retire_worker(self, pid: int) -> None:
+        """Ask a worker to finish in-flight requests and exit"""
+        worker = self.workers.pop(pid, None)
+        if worker is None:
+            return
+        os.close(worker.ready_fd)
+        self.retiring[pid] = time.monotonic()
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            self.retiring.pop(pid, None)
+
+    def reap_workers(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self.retiring:
+                self.retiring.pop(pid)
+                continue
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            os.close(worker.ready_fd)
+            if worker.ready and os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0:
+                # Reached WORKER_MAX_REQUESTS; manage_workers() starts its successor
+                print(f"♻️ Worker {pid} recycled", flush=True)
+            else:
+                print(f"❌ Worker {pid} exited unexpectedly (status {status})", flush=True)
+            if pid == self.replacement:
+                self._abort_restart("replacement worker exited")
+
+    def murder_stragglers(self) -> None:
+        """SIGKILL retiring workers that outlived the graceful timeout"""
+        now = time.monotonic()
+        for pid, since in list(self.retiring.items()):
+            if now - since > self.graceful_timeout + 5:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    self.retiring.pop(pid, None)
+
+    def _mark_ready(self, worker: Worker) -> None:
+        worker.ready = True
+        boot_ms = (time.monotonic() - worker.started_at) * 1000
+        print(f"✅ Worker {worker.pid} ready in {boot_ms:.0f}ms", flush=True)
+
+    def wait_for_events(self, timeout: float = 1.0) -> None:
+        """Block until a worker reports ready, a signal arrives, or timeout"""
+        pending = {w.ready_fd: w for w in self.workers.values() if not w.ready}
+        readable, _, _ = select.select([self._wakeup_r, *pending], [], [], timeout)
+        for fd in readable:
+            if fd == self._wakeup_r:
+                try:
+                    os.read(fd, 512)
+                except BlockingIOError:
+                    pass
+            elif os.read(fd, 1) == b"R":
+                self._mark_ready(pending[fd])
+
+    def check_boot_timeouts(self) -> None:
+        now = time.monotonic()
+        for worker in list(self.workers.values()):
+            if not worker.ready and now - worker.started_at > self.boot_timeout:
+                print(f"❌ Worker {worker.pid} did not become ready in {self.boot_timeout}s", flush=True)
+                if worker.pid == self.replacement:
+                    self._abort_restart("replacement worker timed out")
+                self.retire_worker(worker.pid)
+
+    def manage_workers(self) -> None:
+        """Keep the pool at ``num_workers`` (not counting a restart's replacement)"""
+        target = self.num_workers + (1 if self.replacement in self.workers else 0)
+        while len(self.workers) < target:
+            self.spawn_worker()
+        if len(self.workers) > target:
+            # Retire the oldest workers first
+            oldest = sorted(self.workers.values(), key=lambda w: w.started_at)
+            for worker in oldest[: len(self.workers) - target]:
+                if worker.pid != self.replacement:
+                    self.retire_worker(worker.pid)
+
+    # Rolling restarts
+
+    def start_rolling_restart(self) -> None:
+        if self.restart_queue:
+            return
+        self.restart_queue = sorted(self.workers, key=lambda pid: self.workers[pid].started_at)
+        print(f"🔄 Rolling restart of {len(self.restart_queue)} workers", flush=True)
+
+    def _abort_restart(self, reason: str) -> None:
+        print(f"❌ Rolling restart aborted: {reason}", flush=True)
+        self.restart_queue = []
+        self.replacement = None
+
+    def step_rolling_restart(self) -> None:
+        """Replace one old worker at a time, only retiring it once its successor serves"""
+        # Skip workers that already exited (and were replaced) since the restart began
+        while self.restart_queue and self.restart_queue[0] not in self.workers:
+            self.restart_queue.pop(0)
+        if not self.restart_queue:
+            if self.replacement is None:
+                return
+            self.replacement = None
+            print("✅ Rolling restart complete", flush=True)
+            return
+        if self.replacement is None:
+            self.replacement = self.spawn_worker().pid
+            return
+
+        replacement = self.workers.get(self.replacement)
+        if replacement is None or not replacement.ready:
+            return
+
+        self.replacement = None
+        self.retire_worker(self.restart_queue.pop(0))
+        if not self.restart_queue:
+            print("✅ Rolling restart complete", flush=True)
+
+    # Main loop
+
+    def run(self) -> None:
+        settings = get_settings()
+        print(f"🚀 Starting {settings.APP_NAME} with {self.num_workers} workers (preload={self.preload})", flush=True)
+
+        if self.preload:
+            from app.core.warmup import preload_app
+            self.app = preload_app()
+        else:
+            # Still migrate exactly once, before any worker starts
+            from app.db.migrations import ensure_schema
+            from app.db.session import get_engine
+            ensure_schema(get_engine(), migrate=settings.DB_MIGRATE_ON_STARTUP)
+            get_engine().dispose()
+
+        self.install_signals()
+        try:
+            while not self._stopping:
+                self._handle_signals()
+                self.reap_workers()
+                self.check_boot_timeouts()
+                self.step_rolling_restart()
+                self.manage_workers()
+                self.murder_stragglers()
+                self.wait_for_events()
+                self._handle_signals()
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        """Gracefully stop every worker, killing any that overrun the timeout"""
+        print("👋 Stopping workers...", flush=True)
+        for pid in list(self.workers):
+            self.retire_worker(pid)
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while self.retiring and time.monotonic() < deadline:
+            self.reap_workers()
+            time.sleep(0.05)
+        for pid in list(self.retiring):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self.sock.close()
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Run the AIVA API with multiple worker processes")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, default=settings.WEB_CONCURRENCY or available_cpus())
+    parser.add_argument("--no-preload", action="store_true", help="Start workers as fresh interpreters")
+    # Internal: used by the master to start a non-preloaded worker
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--fd", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--ready-fd", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(socket.socket(fileno=args.fd), args.ready_fd)
+        return
+
+    arbiter = Arbiter(
+        bind_socket(args.host, args.port),
+        workers=args.workers,
+        preload=settings.PRELOAD_APP and not args.no_preload,
+        boot_timeout=settings.WORKER_BOOT_TIMEOUT,
+        graceful_timeout=settings.WORKER_GRACEFUL_TIMEOUT,
+    )
+    arbiter.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""
+Services Package
+Business logic shared across routes
+"""
@@ -0,0 +1,210 @@
+"""
+Chat Service
+Conversation state and portfolio-grounded prompts for the AI assistant
+
+A ChatSession lives as long as one client connection. The conversation,
+recent history and the portfolio system prompt are loaded once when the
+chat opens and then kept in memory, so each new message costs one insert
+instead of re-reading the conversation and portfolio. Messages are written
+behind by the MessageWriter, so replies never wait on a commit. Each step
+that does touch the database opens its own short session, so an idle chat
+holds no connection.
+"""
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.tracing import span
+from app.models.message import Conversation, Message, MessageType
+from app.models.portfolio import Portfolio, PortfolioVisibility
+from app.services.llm import ChatMessages
+from app.services.message_writer import MessageWriter, get_message_writer
+from app.services.portfolio_serializer import load_portfolio_payload
+
+SYSTEM_PROMPT = (
+    "You are AIVA, an AI assistant that answers questions about a candidate's "
+    "portfolio for recruiters and visitors. Answer only from the portfolio below; "
+    "if something isn't covered, say so. Be concise and specific."
+)
+PORTFOLIO_CONTEXT_CHARS = 12_000  # Keeps the prompt well inside the context window
+ITEM_DESCRIPTION_CHARS = 300
+HISTORY_FLUSH_TIMEOUT = 5.0  # Seconds to wait for queued messages before loading history without them
+
+ROLES = {MessageType.USER: "user", MessageType.AI: "assistant", MessageType.SYSTEM: "system"}
+
+
+class ChatAccessError(Exception):
+    """The conversation or portfolio doesn't exist or isn't visible to this user"""
+
+
+def _clip(text: Optional[str], limit: int = ITEM_DESCRIPTION_CHARS) -> str:
+    text = (text or "").strip()
+    return text if len(text) <= limit else text[: limit - 1].rstrip() + "…"
+
+
+def portfolio_context(portfolio: Optional[dict]) -> List[str]:
+    """Compact text rendering of the portfolio, one fact per line"""
+    if portfolio is None:
+        return []
+
+    lines = [f"Portfolio: {portfolio['title']}"]
+    for label, key in (("Tagline", "tagline"), ("Location", "location"), ("About", "bio")):
+        if portfolio.get(key):
+            lines.append(f"{label}: {_clip(portfolio[key], 1000)}")
+
+    if portfolio["skills"]:
+        lines.append("Skills: " + ", ".join(skill["name"] for skill in portfolio["skills"]))
+
+    if portfolio["experiences"]:
+        lines.append("Experience:")
+        for item in portfolio["experiences"]:
+            lines.append(f"- {item['title']} at {item['company']}: {_clip(item.get('description'))}")
+
+    if portfolio["projects"]:
+        lines.append("Projects:")
+        for item in portfolio["projects"]:
+            tech = f" ({', '.join(item['tech_stack'])})" if item.get("tech_stack") else ""
+            lines.append(f"- {item['title']}{tech}: {_clip(item.get('description'))}")
+    return lines
+
+
+def build_system_prompt(portfolio: Optional[dict]) -> str:
+    """System prompt with a compact text rendering of the portfolio"""
+    if portfolio is None:
+        return SYSTEM_PROMPT
+
+    context = "\n".join(portfolio_context(portfolio))[:PORTFOLIO_CONTEXT_CHARS]
+    return f"{SYSTEM_PROMPT}\n\n{context}"
+
+
+class ChatSession:
+    """
+    Per-connection chat state
+
+    Methods touching the database are synchronous; the WebSocket handler runs
+    them in a worker thread one at a time. Each opens and closes its own
+    session from ``session_factory``.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        user_id: int,
+        history_limit: int = 20,
+        writer: Optional[MessageWriter] = None,
+    ):
+        self.session_factory = session_factory
+        self.writer = writer or get_message_writer()
+        self.user_id = user_id
+        self.conversation_id: Optional[int] = None
+        self.portfolio_id: Optional[int] = None
+        self.candidate_id: Optional[int] = None  # Portfolio owner; LLM calls are queued fairly per candidate
+        self.system_prompt = SYSTEM_PROMPT
+        self.context_lines: List[str] = []  # Quoted from when the model is unavailable
+        self.history: Deque[Dict[str, str]] = deque(maxlen=history_limit)
+
+    def _load_portfolio(
+        self, db: Session, portfolio_id: Optional[int] = None, slug: Optional[str] = None
+    ) -> Optional[dict]:
+        if slug is None and portfolio_id is not None:
+            slug = db.execute(select(Portfolio.slug).where(Portfolio.id == portfolio_id)).scalar()
+        if slug is None:
+            if portfolio_id is not None:
+                raise ChatAccessError("Portfolio not found")
+            return None
+
+        payload = load_portfolio_payload(db, slug)
+        is_owner = payload is not None and payload["user_id"] == self.user_id
+        if payload is None or (payload["visibility"] == PortfolioVisibility.PRIVATE and not is_owner):
+            raise ChatAccessError("Portfolio not found")
+        return payload
+
+    def open(
+        self,
+        conversation_id: Optional[int] = None,
+        portfolio_id: Optional[int] = None,
+        slug: Optional[str] = None,
+    ) -> dict:
+        """Resume a conversation or prepare a new one about a portfolio"""
+        self.history.clear()
+
+        with self.session_factory() as db:
+            if conversation_id is not None:
+                with span("chat.history_load", conversation_id=conversation_id) as stage:
+                    conversation = db.query(Conversation).filter(
+                        Conversation.id == conversation_id,
+                        Conversation.user_id == self.user_id,
+                    ).first()
+                    if conversation is None:
+                        raise ChatAccessError("Conversation not found")
+                    portfolio_id, slug = conversation.portfolio_id, None
+
+                    # Read our own queued messages back, unless the database is too slow to wait for
+                    if not self.writer.flush(timeout=HISTORY_FLUSH_TIMEOUT):
+                        print(f"⚠️  Loading conversation {conversation_id} without {self.writer.pending} queued messages")
+                    recent = db.execute(
+                        select(Message.message_type, Message.content)
+                        .where(Message.conversation_id == conversation_id)
+                        .order_by(Message.created_at.desc(), Message.id.desc())
+                        .limit(self.history.maxlen)
+                    ).all()
+                    for message_type, content in reversed(recent):
+                        self.history.append({"role": ROLES[message_type], "content": content})
+                    stage.set("messages", len(recent))
+
+            with span("chat.retrieval"):
+                portfolio = self._load_portfolio(db, portfolio_id, slug)
+
+        self.conversation_id = conversation_id
+        self.portfolio_id = portfolio["id"] if portfolio else None
+        self.candidate_id = portfolio["user_id"] if portfolio else None
+        with span("chat.prompt_assembly"):
+            self.system_prompt = build_system_prompt(portfolio)
+            self.context_lines = portfolio_context(portfolio)
+
+        return {
+            "conversation_id": self.conversation_id,
+            "portfolio_id": self.portfolio_id,
+            "history": list(self.history),
+        }
+
+    def prompt(self) -> ChatMessages:
+        """Messages to send to the model for the next reply"""
+        return [{"role": "system", "content": self.system_prompt}, *self.history]
+
+    def add_user_message(self, content: str, triggered_by_voice: bool = False) -> None:
+        """Queue the user's message (creating the conversation on first use)"""
+        if self.conversation_id is None:
+            # The one synchronous write: later messages need the conversation id
+            with self.session_factory() as db:
+                conversation = Conversation(
+                    user_id=self.user_id,
+                    portfolio_id=self.portfolio_id,
+                    title=_clip(content, 60),
+                )
+                db.add(conversation)
+                db.flush()
+                self.conversation_id = conversation.id
+                db.commit()
+
+        self.writer.submit(
+            self.conversation_id,
+            content,
+            MessageType.USER,
+            sender_id=self.user_id,
+            triggered_by_voice=triggered_by_voice,
+        )
+        self.history.append({"role": "user", "content": content})
+
+    def add_ai_message(self, content: str, model: Optional[str], truncated: bool = False, block: bool = True) -> None:
+        """
+        Queue the assistant's reply; the writer also bumps the conversation's updated_at
+
+        ``block=False`` is for the event loop: a full queue drops the message
+        rather than stalling every other connection.
+        """
+        submit = self.writer.submit if block else self.writer.submit_nowait
+        submit(self.conversation_id, content, MessageType.AI, ai_model=model, is_truncated=truncated)
+        self.history.append({"role": "assistant", "content": content})
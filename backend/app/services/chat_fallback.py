@@ -0,0 +1,109 @@
+"""
+Chat Fallback
+Degraded answers for when the LLM is unavailable
+
+While the LLM circuit breaker is open (or a completion fails before any
+text arrived) the chat still answers, from two sources:
+
+1. Recent answers: a per-worker LRU of complete model replies keyed by
+   portfolio and normalised question, so the questions every visitor asks
+   ("what is her experience with Python?") keep getting a real answer.
+2. Portfolio snippets: otherwise, the lines of the portfolio context that
+   share the most words with the question, quoted as-is.
+
+Both are clearly labelled as a fallback, and the "done" frame carries
+``"degraded": true`` so clients can show it differently.
+"""
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+FALLBACK_MODEL = "fallback"  # Stored as ai_model on degraded replies
+SNIPPET_LIMIT = 3
+UNAVAILABLE = "The assistant is temporarily unavailable."
+
+_WORD = re.compile(r"[a-z0-9+#]+")
+STOPWORDS = frozenset(
+    "a an and are at be by can did do does for from has have her his how i in is it its me "
+    "of on or she so tell that the their them they this to was what when where which who why "
+    "with you your about any".split()
+)
+
+
+def normalize_question(text: str) -> str:
+    """Lowercased words only, so punctuation and spacing don't split cache entries"""
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def _keywords(text: str) -> set:
+    return {word for word in _WORD.findall(text.lower()) if word not in STOPWORDS and len(word) > 1}
+
+
+class AnswerCache:
+    """LRU of complete replies keyed by (portfolio id, normalised question)"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Optional[int], str], str]" = OrderedDict()
+
+    def get(self, portfolio_id: Optional[int], question: str) -> Optional[str]:
+        key = (portfolio_id, normalize_question(question))
+        answer = self._entries.get(key)
+        if answer is not None:
+            self._entries.move_to_end(key)
+        return answer
+
+    def put(self, portfolio_id: Optional[int], question: str, answer: str) -> None:
+        if self.max_entries <= 0:
+            return
+        key = (portfolio_id, normalize_question(question))
+        self._entries[key] = answer
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def relevant_snippets(lines: Sequence[str], question: str, limit: int = SNIPPET_LIMIT) -> List[str]:
+    """Context lines sharing the most keywords with the question, in portfolio order"""
+    wanted = _keywords(question)
+    scored = []
+    for position, line in enumerate(lines):
+        if line.endswith(":"):
+            continue  # Section headings ("Projects:") say nothing on their own
+        score = len(wanted & _keywords(line))
+        if score:
+            scored.append((score, position))
+    best = sorted(scored, key=lambda item: (-item[0], item[1]))[:limit]
+    return [lines[position] for _, position in sorted(best, key=lambda item: item[1])]
+
+
+def fallback_answer(
+    cache: AnswerCache,
+    portfolio_id: Optional[int],
+    question: str,
+    context_lines: Sequence[str],
+) -> str:
+    """Best answer available without the model"""
+    cached = cache.get(portfolio_id, question)
+    if cached is not None:
+        return f"{UNAVAILABLE} Here is an earlier answer to this question:\n\n{cached}"
+
+    snippets = relevant_snippets(context_lines, question)
+    if not snippets and context_lines:
+        snippets = list(context_lines[:1])  # At least say whose portfolio this is
+    if not snippets:
+        return f"{UNAVAILABLE} Please try again in a moment."
+    quoted = "\n".join(snippets)
+    return f"{UNAVAILABLE} Here is what the portfolio says that may help:\n\n{quoted}"
+
+
+@lru_cache()
+def get_answer_cache() -> AnswerCache:
+    """Per-worker answer cache (also a FastAPI dependency, so tests can override it)"""
+    return AnswerCache(settings.CHAT_ANSWER_CACHE_SIZE)
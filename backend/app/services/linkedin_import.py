@@ -0,0 +1,178 @@
+"""
+LinkedIn Import
+Streaming parser for LinkedIn "Download your data" exports
+
+LinkedIn exports are a ZIP of CSV files (Positions.csv, Skills.csv,
+Projects.csv, ...). Each CSV member is decompressed and parsed row by row
+straight out of the archive, mapped onto the ``*Create`` schemas and handed
+to the bulk importer as a generator, so memory holds one insert batch at a
+time no matter how large the export is. A single CSV file can be uploaded
+on its own too.
+"""
+import csv
+import io
+import zipfile
+from contextlib import nullcontext
+from datetime import datetime
+from functools import lru_cache
+from pathlib import PurePosixPath
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.orm import Session
+
+from app.schemas.portfolio import ExperienceCreate, ProjectCreate, SkillCreate
+from app.services.portfolio_bulk import import_sections
+
+DATE_FORMATS = ("%b %Y", "%B %Y", "%Y", "%d %b %Y", "%Y-%m-%d", "%m/%d/%y", "%m/%d/%Y")
+
+
+class LinkedInImportError(ValueError):
+    """The upload isn't a LinkedIn export we can read"""
+
+
+def parse_date(value: Optional[str]) -> Optional[datetime]:
+    """LinkedIn dates look like "Jan 2020", "2020" or "03/14/21"; None if unparseable"""
+    value = (value or "").strip()
+    return _parse_date(value) if value else None
+
+
+@lru_cache(maxsize=1024)
+def _parse_date(value: str) -> Optional[datetime]:
+    # Exports repeat a few hundred distinct dates; failed strptime attempts are slow
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    return None
+
+
+def _text(row: Dict[str, str], *columns: str) -> Optional[str]:
+    for column in columns:
+        value = (row.get(column) or "").strip()
+        if value:
+            return value
+    return None
+
+
+def map_position(row: Dict[str, str], index: int) -> ExperienceCreate:
+    return ExperienceCreate(
+        title=_text(row, "Title"),
+        company=_text(row, "Company Name", "Company"),
+        location=_text(row, "Location"),
+        description=_text(row, "Description"),
+        start_date=parse_date(row.get("Started On")),
+        end_date=parse_date(row.get("Finished On")),
+        order_index=index,
+    )
+
+
+def map_skill(row: Dict[str, str], index: int) -> SkillCreate:
+    return SkillCreate(name=_text(row, "Name", "Skill"), order_index=index)
+
+
+def map_project(row: Dict[str, str], index: int) -> ProjectCreate:
+    return ProjectCreate(
+        title=_text(row, "Title"),
+        description=_text(row, "Description"),
+        demo_url=_text(row, "Url", "URL"),
+        start_date=parse_date(row.get("Started On")),
+        end_date=parse_date(row.get("Finished On")),
+        order_index=index,
+    )
+
+
+# CSV file name (lowercased, no extension) -> (import section, row mapper)
+CSV_SECTIONS: Dict[str, tuple] = {
+    "positions": ("experiences", map_position),
+    "skills": ("skills", map_skill),
+    "projects": ("projects", map_project),
+}
+
+
+class LinkedInExport:
+    """
+    One uploaded export, read lazily
+
+    ``sections()`` returns a generator per import section; rows that don't
+    validate (e.g. a position without a company) are skipped and counted.
+    """
+
+    def __init__(self, fileobj: BinaryIO, filename: str, max_uncompressed: int):
+        self.fileobj = fileobj
+        self.filename = filename or ""
+        self.max_uncompressed = max_uncompressed
+        self.skipped = 0
+        self._archive: Optional[zipfile.ZipFile] = None
+        self._members: Dict[str, str] = {}
+        self._open()
+
+    def _open(self) -> None:
+        if zipfile.is_zipfile(self.fileobj):
+            self.fileobj.seek(0)
+            self._archive = zipfile.ZipFile(self.fileobj)
+            members = [info for info in self._archive.infolist() if not info.is_dir()]
+            # Sizes come from the central directory, so a zip bomb is refused before inflating anything
+            if sum(info.file_size for info in members) > self.max_uncompressed:
+                raise LinkedInImportError("Archive is too large when uncompressed")
+            for info in members:
+                stem = PurePosixPath(info.filename).stem.lower()
+                if stem in CSV_SECTIONS and info.filename.lower().endswith(".csv"):
+                    self._members[stem] = info.filename
+        else:
+            self.fileobj.seek(0)
+            stem = PurePosixPath(self.filename).stem.lower()
+            if stem not in CSV_SECTIONS:
+                expected = ", ".join(f"{name.title()}.csv" for name in CSV_SECTIONS)
+                raise LinkedInImportError(f"Upload a LinkedIn export ZIP or one of {expected}")
+            self._members[stem] = ""
+
+        if not self._members:
+            raise LinkedInImportError("No positions, skills or projects found in the archive")
+
+    def _stream(self, member: str):
+        # A bare CSV is the caller's upload file; leave closing it to them
+        return self._archive.open(member) if self._archive is not None else nullcontext(self.fileobj)
+
+    def _rows(self, stem: str, mapper: Callable[[Dict[str, str], int], BaseModel]) -> Iterator[BaseModel]:
+        with self._stream(self._members[stem]) as raw:
+            text = io.TextIOWrapper(raw, encoding="utf-8-sig", errors="replace", newline="")
+            index = 0
+            for row in csv.DictReader(text):
+                try:
+                    item = mapper(row, index)
+                except ValidationError:
+                    self.skipped += 1
+                    continue
+                index += 1
+                yield item
+            text.detach()
+
+    def sections(self) -> Dict[str, Iterator[BaseModel]]:
+        return {
+            CSV_SECTIONS[stem][0]: self._rows(stem, CSV_SECTIONS[stem][1])
+            for stem in self._members
+        }
+
+    @property
+    def found(self) -> List[str]:
+        return sorted(CSV_SECTIONS[stem][0] for stem in self._members)
+
+
+def import_linkedin_export(
+    db: Session,
+    portfolio_id: int,
+    fileobj: BinaryIO,
+    filename: str,
+    replace: bool = False,
+    batch_size: int = 500,
+    max_uncompressed: int = 100 * 1024 * 1024,
+) -> dict:
+    """Parse an export and insert its rows in batches, in one transaction"""
+    export = LinkedInExport(fileobj, filename, max_uncompressed)
+    try:
+        counts = import_sections(db, portfolio_id, export.sections(), replace=replace, batch_size=batch_size)
+    except (csv.Error, UnicodeError, zipfile.BadZipFile) as e:
+        raise LinkedInImportError(f"Could not read the export: {e}") from e
+    return {**counts, "skipped": export.skipped, "sections": export.found}
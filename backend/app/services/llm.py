@@ -0,0 +1,229 @@
+"""
+LLM Service
+Streaming chat completions from OpenAI
+
+Identical prompts in flight at the same time (many visitors asking the
+same first question about the same portfolio) share one completion: later
+callers get the tokens produced so far, then follow the stream live.
+
+Every upstream call goes through a circuit breaker. A call fails when no
+token arrives within LLM_TIMEOUT_SECONDS, and counts as slow when its first
+token took longer than LLM_SLOW_CALL_SECONDS; enough of either opens the
+breaker, and ``stream()`` then raises CircuitOpenError straight away instead
+of queueing more chats behind a struggling backend.
+
+Calls then wait for a slot from the LLM scheduler (app.services.llm_scheduler):
+chat runs at interactive priority, background jobs use ``complete(...,
+priority=BACKGROUND)`` and only get the slots chat isn't using.
+
+Closing a stream early (the visitor left, the deadline passed) closes the
+upstream HTTP stream, which stops generation, and frees the slot.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from contextlib import aclosing
+from functools import lru_cache, partial
+from typing import AsyncIterator, Dict, Hashable, List, Optional
+
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import settings
+from app.core.metrics import get_counter, get_histogram
+from app.core.singleflight import SingleFlight
+from app.core.tracing import span, start_span, trace_headers
+from app.services.llm_scheduler import INTERACTIVE, DeadlineExceeded, LLMScheduler, get_llm_scheduler
+
+ChatMessages = List[Dict[str, str]]
+
+first_token_seconds = get_histogram("llm.first_token_seconds")
+cancelled_calls = get_counter("llm.cancelled")
+
+
+class LLMClient:
+    """
+    Thin wrapper around the OpenAI async client
+
+    The SDK is imported on first use so the app starts without paying for it,
+    and one HTTP connection pool is shared by every chat in the process.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        coalesce: bool = True,
+        breaker: Optional[CircuitBreaker] = None,
+        timeout: Optional[float] = None,
+        scheduler: Optional[LLMScheduler] = None,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.coalesce = coalesce
+        self.breaker = breaker
+        self.timeout = timeout
+        self.scheduler = scheduler
+        self._client = None
+        self._completions = SingleFlight("llm")
+
+    def _get_client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(api_key=self.api_key)
+        return self._client
+
+    def prompt_key(self, messages: ChatMessages) -> str:
+        """Identifies a completion request: same key, same answer"""
+        request = [self.model, self.temperature, self.max_tokens, messages]
+        return hashlib.sha256(json.dumps(request, sort_keys=True).encode()).hexdigest()
+
+    async def stream(
+        self,
+        messages: ChatMessages,
+        priority: str = INTERACTIVE,
+        flow: Hashable = None,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Yield response text as the model produces it
+
+        ``flow`` is the candidate the work is for (fair queuing between
+        candidates), ``deadline`` an absolute ``time.monotonic()`` after which
+        a still-queued call is dropped with DeadlineExceeded. A caller sharing
+        a completion gets DeadlineExceeded if no token arrived by then.
+        """
+        # aclosing throughout: closing this stream closes the upstream call before returning
+        if not self.coalesce:
+            async with aclosing(self._guarded(messages, priority, flow, deadline)) as tokens:
+                async for token in tokens:
+                    yield token
+            return
+        # Per priority, so chat never waits behind a background job's queue slot. The
+        # shared call queues under the class deadline only; each caller's own deadline
+        # is enforced on its side, so joining never inherits another caller's
+        call = partial(self._guarded, messages, priority, flow, None)
+        async with aclosing(self._completions.stream((priority, flow, self.prompt_key(messages)), call)) as tokens:
+            if deadline is not None:
+                try:
+                    first = await asyncio.wait_for(tokens.__anext__(), max(0.0, deadline - time.monotonic()))
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    raise DeadlineExceeded(f"LLM call waited past its deadline ({priority})") from None
+                yield first
+            async for token in tokens:
+                yield token
+
+    async def complete(self, messages: ChatMessages, **options) -> str:
+        """Whole response text; for jobs that don't stream (pass priority=BACKGROUND)"""
+        return "".join([token async for token in self.stream(messages, **options)])
+
+    async def _guarded(
+        self,
+        messages: ChatMessages,
+        priority: str,
+        flow: Hashable,
+        deadline: Optional[float],
+    ) -> AsyncIterator[str]:
+        """One upstream call: breaker, scheduler slot, then the timed-out stream"""
+        if self.breaker is not None:
+            self.breaker.acquire()
+        if self.scheduler is not None:
+            try:
+                with span("llm.queue_wait", priority=priority):
+                    await self.scheduler.acquire(priority, flow, deadline=deadline)
+            except BaseException:
+                if self.breaker is not None:
+                    self.breaker.release()  # Never reached the backend
+                raise
+        try:
+            async with aclosing(self._timed(messages)) as tokens:
+                async for token in tokens:
+                    yield token
+        finally:
+            if self.scheduler is not None:
+                self.scheduler.release(priority)
+
+    async def _timed(self, messages: ChatMessages) -> AsyncIterator[str]:
+        """The upstream stream with per-token timeouts, reported to the breaker"""
+        started = time.monotonic()
+        first_token: Optional[float] = None
+        # Not made current: this generator is resumed from its consumer's context
+        completion = start_span("llm.completion", model=self.model)
+        waiting = start_span("llm.first_token", parent=completion)
+        count = 0
+        error: Optional[BaseException] = None
+        tokens = self._complete(messages).__aiter__()
+        try:
+            while True:
+                try:
+                    token = await asyncio.wait_for(tokens.__anext__(), self.timeout)
+                except StopAsyncIteration:
+                    break
+                if first_token is None:
+                    first_token = time.monotonic() - started
+                    first_token_seconds.observe(first_token)
+                    waiting.end()
+                count += 1
+                yield token
+        except Exception as e:
+            error = e
+            if self.breaker is not None:
+                self.breaker.record(False, time.monotonic() - started)
+            raise
+        except BaseException:
+            # Cancelled or abandoned by the caller: says nothing about the backend
+            cancelled_calls.inc()
+            if self.breaker is not None:
+                self.breaker.release()
+            completion.set("cancelled", True)
+            raise
+        finally:
+            await tokens.aclose()
+            waiting.end(error)  # No-op once the first token arrived
+            completion.set("tokens", count)
+            completion.end(error)
+        if self.breaker is not None:
+            self.breaker.record(True, first_token if first_token is not None else time.monotonic() - started)
+
+    async def _complete(self, messages: ChatMessages) -> AsyncIterator[str]:
+        stream = await self._get_client().chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stream=True,
+            extra_headers=trace_headers(),
+        )
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()  # Stops generation when the caller stops reading
+
+
+@lru_cache()
+def get_llm() -> LLMClient:
+    """Shared LLM client (also a FastAPI dependency, so tests can override it)"""
+    return LLMClient(
+        api_key=settings.OPENAI_API_KEY,
+        model=settings.OPENAI_MODEL,
+        temperature=settings.OPENAI_TEMPERATURE,
+        max_tokens=settings.OPENAI_MAX_TOKENS,
+        coalesce=settings.CHAT_COALESCE_COMPLETIONS,
+        breaker=CircuitBreaker(
+            "llm",
+            window=settings.LLM_BREAKER_WINDOW,
+            failure_ratio=settings.LLM_BREAKER_FAILURE_RATIO,
+            min_calls=settings.LLM_BREAKER_MIN_CALLS,
+            slow_seconds=settings.LLM_SLOW_CALL_SECONDS,
+            cooldown_seconds=settings.LLM_BREAKER_COOLDOWN_SECONDS,
+        ),
+        timeout=settings.LLM_TIMEOUT_SECONDS,
+        scheduler=get_llm_scheduler(),
+    )
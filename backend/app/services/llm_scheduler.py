@@ -0,0 +1,188 @@
+"""
+LLM Scheduler
+Shares the worker's model concurrency between chat and background jobs
+
+Every upstream model call waits here for one of LLM_MAX_CONCURRENCY slots.
+
+Priority classes:
+    interactive   visitor chat; always served first and may use every slot
+    background    summaries, extraction, titles; at most
+                  LLM_BACKGROUND_CONCURRENCY slots at a time, so long batch
+                  calls never occupy the slots chat needs
+
+Within a class, waiting calls are ordered by weighted fair queuing per
+flow (the candidate whose portfolio the work is about): each flow's calls
+get virtual start tags spaced by 1/weight, so one candidate with a hundred
+queued jobs is interleaved with others instead of going first.
+
+Every call has a deadline: LLM_INTERACTIVE_DEADLINE_SECONDS /
+LLM_BACKGROUND_DEADLINE_SECONDS, or the caller's own if that is sooner. A call still
+queued when it passes is dropped with DeadlineExceeded rather than started
+for a client that has given up.
+
+Metrics, per class: ``llm.queue_depth.<class>`` (gauge),
+``llm.queue_wait_seconds.<class>`` and ``llm.deadline_dropped.<class>``.
+The scheduler lives on the event loop; it isn't thread-safe.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import get_counter, get_gauge, get_histogram
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+PRIORITIES = (INTERACTIVE, BACKGROUND)  # Highest first
+
+FLOW_STATE_LIMIT = 4096  # Flow tags kept before idle ones are pruned
+
+
+class DeadlineExceeded(Exception):
+    """The call waited in the queue past its deadline and was never started"""
+
+
+class _Waiter:
+    __slots__ = ("priority", "deadline", "future", "enqueued", "start", "pending")
+
+    def __init__(self, priority: str, deadline: float, future: asyncio.Future, enqueued: float, start: float):
+        self.priority = priority
+        self.deadline = deadline
+        self.future = future
+        self.enqueued = enqueued
+        self.start = start
+        self.pending = True  # Still counted in the queue depth
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        max_concurrency: int,
+        limits: Optional[Dict[str, int]] = None,
+        deadlines: Optional[Dict[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_concurrency = max_concurrency
+        self.limits = {priority: max_concurrency for priority in PRIORITIES}
+        self.limits.update(limits or {})
+        self.deadlines = deadlines or {}
+        self.clock = clock
+        self.active = 0
+        self.running = {priority: 0 for priority in PRIORITIES}
+        self._queues: Dict[str, List[Tuple[float, int, _Waiter]]] = {priority: [] for priority in PRIORITIES}
+        self._virtual_time = {priority: 0.0 for priority in PRIORITIES}
+        self._flow_tags: Dict[Tuple[str, Hashable], float] = {}
+        self._order = itertools.count()
+        self.depth = {priority: get_gauge(f"llm.queue_depth.{priority}") for priority in PRIORITIES}
+        self.wait_seconds = {priority: get_histogram(f"llm.queue_wait_seconds.{priority}") for priority in PRIORITIES}
+        self.dropped = {priority: get_counter(f"llm.deadline_dropped.{priority}") for priority in PRIORITIES}
+
+    async def acquire(
+        self,
+        priority: str = INTERACTIVE,
+        flow: Hashable = None,
+        weight: float = 1.0,
+        deadline: Optional[float] = None,
+    ) -> None:
+        """
+        Wait for a slot; pair every successful call with ``release(priority)``
+
+        ``deadline`` is an absolute time on the scheduler's clock; it can only
+        bring the class's own deadline forward.
+        """
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority {priority!r}")
+        now = self.clock()
+        if self.deadlines.get(priority):
+            limit = now + self.deadlines[priority]
+            deadline = limit if deadline is None else min(deadline, limit)
+
+        # Start-time fair queuing: a flow's next call starts after its previous one
+        start = max(self._virtual_time[priority], self._flow_tags.get((priority, flow), 0.0))
+        self._flow_tags[(priority, flow)] = start + 1.0 / max(weight, 1e-6)
+        if len(self._flow_tags) > FLOW_STATE_LIMIT:
+            self._prune_flows()
+
+        waiter = _Waiter(priority, deadline or float("inf"), asyncio.get_running_loop().create_future(), now, start)
+        heapq.heappush(self._queues[priority], (start, next(self._order), waiter))
+        self.depth[priority].inc()
+        self._dispatch()
+
+        timeout = None if deadline is None else max(0.0, deadline - now)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except asyncio.TimeoutError:
+            if self._granted(waiter):
+                self.release(priority)  # Granted just as the deadline passed; too late anyway
+            else:
+                if waiter.pending:  # Not already dropped by the dispatcher
+                    self.dropped[priority].inc()
+                self._abandon(waiter)
+            raise DeadlineExceeded(f"LLM call waited past its deadline ({priority})") from None
+        except asyncio.CancelledError:
+            if self._granted(waiter):
+                self.release(priority)
+            else:
+                self._abandon(waiter)
+            raise
+        # A waiter the dispatcher dropped gets DeadlineExceeded from the future itself
+
+    def release(self, priority: str) -> None:
+        self.active -= 1
+        self.running[priority] -= 1
+        self._dispatch()
+
+    @staticmethod
+    def _granted(waiter: _Waiter) -> bool:
+        future = waiter.future
+        return future.done() and not future.cancelled() and future.exception() is None
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        if waiter.pending:
+            waiter.pending = False
+            self.depth[waiter.priority].dec()
+        waiter.future.cancel()
+
+    def _dispatch(self) -> None:
+        now = self.clock()
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue and self.active < self.max_concurrency and self.running[priority] < self.limits[priority]:
+                _, _, waiter = heapq.heappop(queue)
+                if not waiter.pending:
+                    continue  # Its caller gave up
+                waiter.pending = False
+                self.depth[priority].dec()
+                if waiter.deadline <= now:
+                    self.dropped[priority].inc()
+                    waiter.future.set_exception(DeadlineExceeded(f"LLM call waited past its deadline ({priority})"))
+                    continue
+                self.active += 1
+                self.running[priority] += 1
+                self._virtual_time[priority] = waiter.start
+                self.wait_seconds[priority].observe(now - waiter.enqueued)
+                waiter.future.set_result(None)
+            if self.active >= self.max_concurrency:
+                return
+
+    def _prune_flows(self) -> None:
+        # Tags at or behind the virtual time no longer delay their flow
+        self._flow_tags = {
+            key: tag for key, tag in self._flow_tags.items() if tag > self._virtual_time[key[0]]
+        }
+
+
+@lru_cache()
+def get_llm_scheduler() -> LLMScheduler:
+    """Per-worker scheduler shared by every LLM client"""
+    return LLMScheduler(
+        settings.LLM_MAX_CONCURRENCY,
+        limits={BACKGROUND: settings.LLM_BACKGROUND_CONCURRENCY},
+        deadlines={
+            INTERACTIVE: settings.LLM_INTERACTIVE_DEADLINE_SECONDS,
+            BACKGROUND: settings.LLM_BACKGROUND_DEADLINE_SECONDS,
+        },
+    )
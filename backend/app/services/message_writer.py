@@ -0,0 +1,278 @@
+"""
+Message Writer
+Write-behind persistence for chat messages
+
+Chat replies don't wait for database commits. Messages are queued and a
+single background thread writes them in batches: one multi-row INSERT for
+the messages plus one UPDATE of ``updated_at`` for the conversations they
+belong to, in one transaction.
+
+Ordering: there is one queue and one writer, so rows are inserted in the
+order they were submitted, and ``created_at`` is stamped at submit time
+rather than at commit time. Durability: ``flush()`` waits for everything
+submitted so far (used before reading history back) and ``stop()`` drains
+the queue on graceful shutdown. Batches that fail because the database is
+unreachable are retried; rows the database rejects outright (their
+conversation was deleted, a bad value, a schema mismatch) are dropped one by
+one so they can't block the rows behind them.
+"""
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import List, Optional
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from app.core.metrics import get_counter, get_histogram
+from app.models.message import Conversation, Message, MessageType
+
+messages_written = get_counter("chat.messages_written")
+messages_dropped = get_counter("chat.messages_dropped")
+batch_seconds = get_histogram("chat.write_batch_seconds")
+
+RETRY_BACKOFF = (0.1, 0.5, 1.0, 2.0, 5.0)  # Seconds between attempts at a failing batch
+
+_STOP = object()
+
+
+class MessageWriter:
+    """Queue of pending Message rows and the thread that writes them"""
+
+    def __init__(
+        self,
+        engine: Optional[Engine] = None,
+        batch_size: int = 100,
+        flush_interval: float = 0.05,
+        max_pending: int = 10_000,
+    ):
+        self._engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._submitted = 0
+        self._processed = 0
+        self._progress = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            from app.db.session import get_engine
+            self._engine = get_engine()
+        return self._engine
+
+    @property
+    def pending(self) -> int:
+        return self._submitted - self._processed
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                atexit.register(self.stop)
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="message-writer", daemon=True)
+                self._thread.start()
+
+    def submit(
+        self,
+        conversation_id: int,
+        content: str,
+        message_type: MessageType,
+        sender_id: Optional[int] = None,
+        triggered_by_voice: bool = False,
+        ai_model: Optional[str] = None,
+        is_truncated: bool = False,
+    ) -> None:
+        """
+        Queue a message for insertion
+
+        Returns immediately unless max_pending messages are already waiting,
+        in which case the caller blocks until the writer catches up.
+        """
+        self.start()
+        row = _row(conversation_id, content, message_type, sender_id, triggered_by_voice, ai_model, is_truncated)
+        with self._progress:
+            self._submitted += 1
+        self._queue.put(row)
+
+    def submit_nowait(
+        self,
+        conversation_id: int,
+        content: str,
+        message_type: MessageType,
+        sender_id: Optional[int] = None,
+        triggered_by_voice: bool = False,
+        ai_model: Optional[str] = None,
+        is_truncated: bool = False,
+    ) -> bool:
+        """
+        Queue a message without ever blocking; for callers on the event loop
+
+        When max_pending messages are already waiting the message is dropped
+        (counted in chat.messages_dropped) and False is returned.
+        """
+        self.start()
+        row = _row(conversation_id, content, message_type, sender_id, triggered_by_voice, ai_model, is_truncated)
+        with self._progress:
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                messages_dropped.inc()
+                return False
+            self._submitted += 1
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every message submitted so far is written; False on timeout"""
+        with self._progress:
+            target = self._submitted
+            return self._progress.wait_for(lambda: self._processed >= target, timeout)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        Write whatever is queued, then stop the thread; waits at most ``timeout``
+
+        Batches still failing once stop is requested get one more attempt
+        rather than being retried until the database is back.
+        """
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        deadline = time.monotonic() + timeout
+        self._stopping.set()
+        try:
+            self._queue.put(_STOP, timeout=timeout)  # Wakes an idle writer; full means it's busy anyway
+        except queue.Full:
+            pass
+        thread.join(max(0.0, deadline - time.monotonic()))
+        if thread.is_alive():
+            print(f"⚠️  Message writer still busy after {timeout}s, {self.pending} messages pending")
+
+    def _run(self) -> None:
+        stopping = False
+        while True:
+            stopping = stopping or self._stopping.is_set()
+            batch: List[dict] = []
+            if not stopping:
+                item = self._queue.get()  # Sleep until there's work
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+
+            # Collect more rows for up to flush_interval (no waiting once stopping)
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    if stopping:
+                        item = self._queue.get_nowait()
+                    else:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+
+            if batch:
+                self._write_with_retry(batch, final=stopping)
+            if stopping and self._queue.empty():
+                return
+
+    def _write_with_retry(self, batch: List[dict], final: bool = False) -> None:
+        attempt = 0
+        while True:
+            try:
+                self._write(batch)
+            except DBAPIError as e:
+                if not _transient(e):
+                    # Retrying won't help; keep whichever rows the database accepts
+                    self._write_individually(batch)
+                elif not final and not self._stopping.is_set():
+                    # Keep the batch (and everything behind it) until the database is back
+                    delay = RETRY_BACKOFF[min(attempt, len(RETRY_BACKOFF) - 1)]
+                    print(f"⚠️  Message write failed, retrying in {delay}s: {e}")
+                    self._stopping.wait(delay)  # stop() cuts the backoff short
+                    attempt += 1
+                    continue
+                print(f"❌ Message writer giving up on {len(batch)} messages at shutdown: {e}")
+                messages_dropped.inc(len(batch))
+            except Exception as e:
+                print(f"❌ Message writer dropped {len(batch)} messages: {e}")
+                messages_dropped.inc(len(batch))
+            break
+        self._done(len(batch))
+
+    def _write_individually(self, batch: List[dict]) -> None:
+        for row in batch:
+            try:
+                self._write([row])
+            except DBAPIError as e:
+                print(f"❌ Dropping message for conversation {row['conversation_id']}: {e}")
+                messages_dropped.inc()
+
+    def _write(self, rows: List[dict]) -> None:
+        started = time.perf_counter()
+        conversation_ids = sorted({row["conversation_id"] for row in rows})
+        with self.engine.begin() as connection:
+            connection.execute(insert(Message.__table__).values(rows))
+            connection.execute(
+                update(Conversation.__table__)
+                .where(Conversation.__table__.c.id.in_(conversation_ids))
+                .values(updated_at=func.now())
+            )
+        batch_seconds.observe(time.perf_counter() - started)
+        messages_written.inc(len(rows))
+
+    def _done(self, count: int) -> None:
+        with self._progress:
+            self._processed += count
+            self._progress.notify_all()
+
+
+def _row(
+    conversation_id: int,
+    content: str,
+    message_type: MessageType,
+    sender_id: Optional[int],
+    triggered_by_voice: bool,
+    ai_model: Optional[str],
+    is_truncated: bool,
+) -> dict:
+    return {
+        "conversation_id": conversation_id,
+        "sender_id": sender_id,
+        "content": content,
+        "message_type": message_type,
+        "is_read": False,
+        "triggered_by_voice": triggered_by_voice,
+        "ai_model": ai_model,
+        "is_truncated": is_truncated,
+        "created_at": datetime.now(timezone.utc),  # Submit time keeps rows in chat order
+    }
+
+
+def _transient(error: DBAPIError) -> bool:
+    """Connection-level failures that a retry can get past"""
+    return error.connection_invalidated or isinstance(error, (OperationalError, InterfaceError))
+
+
+@lru_cache()
+def get_message_writer() -> MessageWriter:
+    """Process-wide writer (also a FastAPI dependency, so tests can override it)"""
+    from app.core.config import settings
+
+    return MessageWriter(
+        batch_size=settings.CHAT_WRITE_BATCH_SIZE,
+        flush_interval=settings.CHAT_WRITE_FLUSH_MS / 1000,
+        max_pending=settings.CHAT_WRITE_MAX_PENDING,
+    )
@@ -0,0 +1,89 @@
+"""
+Portfolio Serializer
+Fast-path JSON serialization for full portfolio payloads
+
+Validating a nested ORM graph through ``from_attributes`` Pydantic models
+costs tens of milliseconds for portfolios with hundreds of items. Rows read
+from our own database are already trusted, so this path selects plain column
+tuples, zips them into dicts and encodes them directly - no ORM identity map,
+no relationship loading and no re-validation. The JSON shape matches
+``PortfolioResponse`` exactly.
+"""
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.portfolio import Portfolio, Project, Skill, Experience
+from app.schemas.portfolio import (
+    PortfolioResponse,
+    ProjectResponse,
+    SkillResponse,
+    ExperienceResponse,
+)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+NESTED_FIELDS = ("projects", "skills", "experiences")
+
+# Response field names double as ORM column names
+PORTFOLIO_FIELDS = tuple(f for f in PortfolioResponse.model_fields if f not in NESTED_FIELDS)
+PROJECT_FIELDS = tuple(ProjectResponse.model_fields)
+SKILL_FIELDS = tuple(SkillResponse.model_fields)
+EXPERIENCE_FIELDS = tuple(ExperienceResponse.model_fields)
+
+
+def _json_default(value: Any) -> Any:
+    """Fallback encoder for the stdlib json module"""
+    if isinstance(value, datetime):
+        if value.utcoffset() is not None and value.utcoffset().total_seconds() == 0:
+            return value.replace(tzinfo=None).isoformat() + "Z"
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload: Any) -> bytes:
+    """Encode a payload to JSON bytes (orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_UTC_Z)
+    return json.dumps(payload, default=_json_default, separators=(",", ":")).encode()
+
+
+def _rows(db: Session, model, fields: Sequence[str], portfolio_id: int) -> list:
+    statement = (
+        select(*(getattr(model, field) for field in fields))
+        .where(model.portfolio_id == portfolio_id)
+        .order_by(model.order_index, model.id)
+    )
+    return [dict(zip(fields, row)) for row in db.execute(statement)]
+
+
+def load_portfolio_payload(db: Session, slug: str) -> Optional[dict]:
+    """
+    Load a full portfolio as plain dicts shaped like PortfolioResponse
+
+    Returns None if no portfolio has this slug.
+    """
+    statement = select(*(getattr(Portfolio, field) for field in PORTFOLIO_FIELDS)).where(
+        Portfolio.slug == slug
+    )
+    row = db.execute(statement).first()
+    if row is None:
+        return None
+
+    payload = dict(zip(PORTFOLIO_FIELDS, row))
+    portfolio_id = payload["id"]
+    payload["projects"] = _rows(db, Project, PROJECT_FIELDS, portfolio_id)
+    payload["skills"] = _rows(db, Skill, SKILL_FIELDS, portfolio_id)
+    payload["experiences"] = _rows(db, Experience, EXPERIENCE_FIELDS, portfolio_id)
+    return payload
@@ -0,0 +1,338 @@
+"""
+Resumable Uploads
+Chunked uploads that survive dropped connections
+
+A client creates a session with the file's name, type and size, then sends
+the bytes in any number of PATCH requests, each saying at which offset it
+starts. Every chunk is appended to a partial file as it streams in, so a
+dropped connection only loses the chunk in flight: the client asks for the
+current offset and continues from there. Finalizing moves the partial file
+into the user's upload directory.
+
+    {UPLOAD_PARTIAL_DIR}/{upload_id}.part   bytes received so far
+    {UPLOAD_PARTIAL_DIR}/{upload_id}.json   owner, size, offset, expiry
+
+UPLOAD_PARTIAL_DIR defaults to ``UPLOAD_DIR/.partial``. Sessions live on a
+filesystem whatever the storage backend, so with several nodes (e.g.
+STORAGE_BACKEND=s3) every chunk must reach a node that sees the same
+directory: point it at a shared volume with working file locks (NFSv4, EFS),
+or route each upload to one node. Otherwise a chunk landing elsewhere gets
+"Upload not found".
+
+Integrity: a running SHA-256 of the whole file is kept as chunks arrive and
+compared against the checksum declared at creation (if any) when the upload
+is finalized. A chunk may carry its own SHA-256 too; such chunks are
+all-or-nothing, chunks without one keep whatever bytes arrived. The running
+hash lives in the worker's memory; if another worker received the previous
+chunk, it is rebuilt from the partial file once.
+
+Sessions that see no chunk for UPLOAD_SESSION_TTL_HOURS are deleted by
+``purge_expired()``, which the app runs periodically.
+"""
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import re
+import secrets
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from app.core.metrics import get_counter
+
+bytes_received = get_counter("uploads.resumable_bytes")
+sessions_expired = get_counter("uploads.resumable_expired")
+
+WRITE_BUFFER = 1024 * 1024  # Request body pieces are gathered into 1MB writes
+UPLOAD_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{32}$")
+
+
+class UploadSessionError(Exception):
+    """Base class for resumable upload failures"""
+
+
+class UploadNotFound(UploadSessionError):
+    """No such session for this user (or it expired)"""
+
+
+class OffsetConflict(UploadSessionError):
+    """The chunk doesn't start where the upload left off, or another chunk is being written"""
+
+    def __init__(self, message: str, offset: int):
+        super().__init__(message)
+        self.offset = offset
+
+
+class UploadTooLarge(UploadSessionError):
+    """More bytes than the size declared at creation"""
+
+
+class ChecksumMismatch(UploadSessionError):
+    """A chunk or the finished file doesn't match its declared SHA-256"""
+
+
+class IncompleteUpload(UploadSessionError):
+    """Finalize called before every byte arrived"""
+
+
+def _hash_file(fd: int, length: int):
+    hasher = hashlib.sha256()
+    position = 0
+    while position < length:
+        block = os.pread(fd, min(WRITE_BUFFER, length - position), position)
+        if not block:
+            break
+        hasher.update(block)
+        position += len(block)
+    return hasher
+
+
+def _write_block(fd: int, data: bytes, position: int, hashers: tuple) -> None:
+    # hashlib releases the GIL on large buffers, so this runs well in a thread
+    os.pwrite(fd, data, position)
+    for hasher in hashers:
+        hasher.update(data)
+
+
+class ResumableUploads:
+    """Session store for chunked uploads, backed by files under ``root``"""
+
+    def __init__(self, root: Path, ttl_seconds: int, max_size: int):
+        self.root = Path(root)
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._hashers: Dict[str, Tuple[int, "hashlib._Hash"]] = {}  # upload_id -> (offset, running hash)
+
+    def _paths(self, upload_id: str) -> Tuple[Path, Path]:
+        if not UPLOAD_ID_PATTERN.match(upload_id):
+            raise UploadNotFound("Upload not found")
+        return self.root / f"{upload_id}.part", self.root / f"{upload_id}.json"
+
+    def _save(self, session: dict) -> None:
+        _, meta = self._paths(session["upload_id"])
+        scratch = meta.with_suffix(".tmp")
+        scratch.write_text(json.dumps(session))
+        os.replace(scratch, meta)  # Readers never see a half-written file
+
+    def _load(self, upload_id: str) -> dict:
+        _, meta = self._paths(upload_id)
+        try:
+            return json.loads(meta.read_text())
+        except (FileNotFoundError, ValueError):
+            raise UploadNotFound("Upload not found")
+
+    def create(
+        self,
+        user_id: int,
+        file_name: str,
+        content_type: str,
+        size: int,
+        category: str,
+        checksum: Optional[str] = None,
+        max_size: Optional[int] = None,
+    ) -> dict:
+        """Open a session; ``max_size`` can only tighten the configured limit"""
+        max_size = min(max_size or self.max_size, self.max_size)
+        if size > max_size:
+            raise UploadTooLarge(f"File too large. Maximum size: {max_size / (1024 * 1024)}MB")
+        self.root.mkdir(parents=True, exist_ok=True)
+        upload_id = secrets.token_urlsafe(24)
+        part, _ = self._paths(upload_id)
+        part.touch()
+        session = {
+            "upload_id": upload_id,
+            "user_id": user_id,
+            "file_name": file_name,
+            "content_type": content_type,
+            "category": category,
+            "size": size,
+            "checksum": checksum.lower() if checksum else None,
+            "offset": 0,
+            "expires_at": time.time() + self.ttl_seconds,
+        }
+        self._save(session)
+        return session
+
+    def get(self, upload_id: str, user_id: int) -> dict:
+        session = self._load(upload_id)
+        if session["user_id"] != user_id or session["expires_at"] < time.time():
+            raise UploadNotFound("Upload not found")
+        return session
+
+    def _lock(self, upload_id: str, session: dict) -> int:
+        """Open the partial file and take its lock; one writer per session across workers"""
+        part, _ = self._paths(upload_id)
+        try:
+            fd = os.open(part, os.O_RDWR)
+        except FileNotFoundError:
+            raise UploadNotFound("Upload not found")
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            raise OffsetConflict("Another chunk of this upload is still being received", session["offset"])
+        return fd
+
+    async def _running_hash(self, upload_id: str, fd: int, offset: int):
+        cached = self._hashers.get(upload_id)
+        if cached is not None and cached[0] == offset:
+            return cached[1]
+        # The previous chunk went to another worker (or this one restarted)
+        return await asyncio.to_thread(_hash_file, fd, offset)
+
+    async def append(
+        self,
+        upload_id: str,
+        user_id: int,
+        offset: int,
+        body: AsyncIterator[bytes],
+        chunk_checksum: Optional[str] = None,
+    ) -> dict:
+        """
+        Write one chunk starting at ``offset``; returns the updated session
+
+        Without ``chunk_checksum``, bytes received before the body broke off
+        are kept and the exception is re-raised; the client resumes from the
+        new offset.
+        """
+        session = self.get(upload_id, user_id)
+        fd = self._lock(upload_id, session)
+        try:
+            session = self.get(upload_id, user_id)  # Re-read under the lock
+            if offset != session["offset"]:
+                raise OffsetConflict(f"Upload is at offset {session['offset']}", session["offset"])
+            os.ftruncate(fd, offset)  # Bytes past the recorded offset are from a write that never finished
+
+            running = (await self._running_hash(upload_id, fd, offset)).copy()
+            chunk_hash = hashlib.sha256() if chunk_checksum else None
+            hashers = (running, chunk_hash) if chunk_hash else (running,)
+            position, buffer = offset, bytearray()
+
+            async def write_buffer():
+                nonlocal position
+                await asyncio.to_thread(_write_block, fd, bytes(buffer), position, hashers)
+                position += len(buffer)
+                buffer.clear()
+
+            try:
+                async for piece in body:
+                    if position + len(buffer) + len(piece) > session["size"]:
+                        raise UploadTooLarge(f"Upload is {session['size']} bytes; chunk runs past the end")
+                    buffer += piece
+                    if len(buffer) >= WRITE_BUFFER:
+                        await write_buffer()
+                if buffer:
+                    await write_buffer()
+                if chunk_hash is not None and chunk_hash.hexdigest() != chunk_checksum.lower():
+                    raise ChecksumMismatch("Chunk checksum does not match its contents")
+            except BaseException as e:
+                if chunk_hash is not None or isinstance(e, UploadSessionError):
+                    os.ftruncate(fd, offset)
+                    raise
+                # Connection dropped mid-chunk: keep what was written (and hashed) before it did
+                os.ftruncate(fd, position)
+                self._hashers[upload_id] = (position, running)
+                self._commit(session, position)
+                raise
+
+            self._hashers[upload_id] = (position, running)
+            bytes_received.inc(position - offset)
+            return self._commit(session, position)
+        finally:
+            os.close(fd)  # Also releases the lock
+
+    def _commit(self, session: dict, offset: int) -> dict:
+        session["offset"] = offset
+        session["expires_at"] = time.time() + self.ttl_seconds  # Active uploads don't expire
+        self._save(session)
+        return session
+
+    def complete(self, upload_id: str, user_id: int, destination: Path) -> Tuple[dict, str]:
+        """
+        Move a fully received upload to ``destination``; returns the session and the file's SHA-256
+        """
+        session = self.get(upload_id, user_id)
+        fd = self._lock(upload_id, session)
+        try:
+            session = self.get(upload_id, user_id)
+            if session["offset"] != session["size"]:
+                raise IncompleteUpload(f"Received {session['offset']} of {session['size']} bytes")
+
+            cached = self._hashers.get(upload_id)
+            running = cached[1] if cached and cached[0] == session["offset"] else _hash_file(fd, session["offset"])
+            digest = running.hexdigest()
+            if session["checksum"] and digest != session["checksum"]:
+                self.abort(upload_id, user_id)
+                raise ChecksumMismatch("File checksum does not match; the upload was discarded")
+
+            part, meta = self._paths(upload_id)
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(part, destination)
+            meta.unlink(missing_ok=True)
+            self._hashers.pop(upload_id, None)
+            return session, digest
+        finally:
+            os.close(fd)
+
+    def abort(self, upload_id: str, user_id: int) -> None:
+        self.get(upload_id, user_id)
+        self._remove(upload_id)
+
+    def _remove(self, upload_id: str) -> None:
+        part, meta = self._paths(upload_id)
+        meta.unlink(missing_ok=True)
+        part.unlink(missing_ok=True)
+        self._hashers.pop(upload_id, None)
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        """Delete expired sessions and partial files with no session; returns how many"""
+        now = now or time.time()
+        if not self.root.is_dir():
+            return 0
+        purged = 0
+        upload_ids = {path.name.split(".", 1)[0] for path in self.root.iterdir()}
+        for upload_id in filter(UPLOAD_ID_PATTERN.match, upload_ids):
+            part, meta = self._paths(upload_id)
+            try:
+                expired = json.loads(meta.read_text())["expires_at"] < now
+            except FileNotFoundError:
+                # Orphaned by a crash between creating the file and writing its session
+                expired = not part.exists() or part.stat().st_mtime + self.ttl_seconds < now
+            except (ValueError, KeyError):
+                expired = True
+            if expired:
+                self._remove(upload_id)
+                purged += 1
+        sessions_expired.inc(purged)
+        return purged
+
+
+async def run_upload_gc(uploads: ResumableUploads, interval: float) -> None:
+    """Background task: delete abandoned upload sessions"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            purged = await asyncio.to_thread(uploads.purge_expired)
+            if purged:
+                print(f"🧹 Removed {purged} expired upload sessions")
+        except Exception as e:
+            print(f"❌ Upload session cleanup failed: {e}")
+
+
+def partial_dir(settings) -> Path:
+    return Path(settings.UPLOAD_PARTIAL_DIR or Path(settings.UPLOAD_DIR) / ".partial")
+
+
+@lru_cache()
+def get_resumable_uploads() -> ResumableUploads:
+    """Process-wide session store (also a FastAPI dependency, so tests can override it)"""
+    from app.core.config import settings
+
+    return ResumableUploads(
+        partial_dir(settings),
+        ttl_seconds=settings.UPLOAD_SESSION_TTL_HOURS * 3600,
+        max_size=settings.UPLOAD_RESUMABLE_MAX_SIZE,
+    )
@@ -0,0 +1,119 @@
+"""
+Storage Usage
+Per-user upload byte and file counters, kept transactionally
+
+Every stored file is counted before its bytes are written: ``reserve()``
+adds its size to the user's row with a single conditional UPDATE that also
+enforces the quota, and commits. The database applies concurrent uploads
+one after another, so two uploads can't both squeeze under the limit. If
+writing the file then fails, ``release()`` takes the reservation back; a
+delete releases it too. Reading usage is one primary-key lookup.
+
+A crash between reserving and writing leaves the counters slightly high;
+``python -m app.services.upload_migration`` recounts them from storage.
+"""
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+
+from sqlalchemy import case, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.storage import StorageUsage
+
+usage_table = StorageUsage.__table__
+
+
+class QuotaExceeded(Exception):
+    """The upload would take the user over their storage quota"""
+
+    def __init__(self, bytes_used: int, size: int, quota: int):
+        super().__init__(
+            f"Storage quota exceeded: {bytes_used / (1024 * 1024):.1f}MB of "
+            f"{quota / (1024 * 1024):.0f}MB used, upload is {size / (1024 * 1024):.1f}MB"
+        )
+        self.bytes_used = bytes_used
+        self.size = size
+        self.quota = quota
+
+
+def _ensure_row(db: Session, user_id: int) -> None:
+    if db.execute(select(usage_table.c.user_id).where(usage_table.c.user_id == user_id)).first():
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(usage_table).values(user_id=user_id, bytes_used=0, file_count=0))
+    except IntegrityError:
+        pass  # Created by a concurrent request
+
+
+def get_usage(db: Session, user_id: int) -> Tuple[int, int]:
+    """(bytes_used, file_count) for a user"""
+    row = db.execute(
+        select(usage_table.c.bytes_used, usage_table.c.file_count).where(usage_table.c.user_id == user_id)
+    ).first()
+    return (row.bytes_used, row.file_count) if row else (0, 0)
+
+
+def reserve(db: Session, user_id: int, size: int, quota: int = 0) -> None:
+    """
+    Count a file against the user's usage and commit; raises QuotaExceeded
+
+    ``quota`` is the byte limit (0 for none). The check and the increment are
+    one statement, so they can't interleave with another upload's.
+    """
+    _ensure_row(db, user_id)
+    statement = update(usage_table).where(usage_table.c.user_id == user_id)
+    if quota:
+        statement = statement.where(usage_table.c.bytes_used + size <= quota)
+    result = db.execute(statement.values(
+        bytes_used=usage_table.c.bytes_used + size,
+        file_count=usage_table.c.file_count + 1,
+    ))
+    if result.rowcount == 0:
+        db.rollback()
+        raise QuotaExceeded(get_usage(db, user_id)[0], size, quota)
+    db.commit()
+
+
+def release(db: Session, user_id: int, size: int) -> None:
+    """Take a file off the user's usage (deleted, or its write failed) and commit"""
+    # Never below zero: a file stored before it was counted mustn't turn into extra quota
+    db.execute(
+        update(usage_table)
+        .where(usage_table.c.user_id == user_id)
+        .values(
+            bytes_used=case((usage_table.c.bytes_used > size, usage_table.c.bytes_used - size), else_=0),
+            file_count=case((usage_table.c.file_count > 1, usage_table.c.file_count - 1), else_=0),
+        )
+    )
+    db.commit()
+
+
+@contextmanager
+def reserved(db: Session, user_id: int, size: int, quota: int = 0) -> Iterator[None]:
+    """Reserve around writing a file; the reservation is released if the block raises"""
+    reserve(db, user_id, size, quota)
+    try:
+        yield
+    except BaseException:
+        db.rollback()
+        release(db, user_id, size)
+        raise
+
+
+def replace_usage(connection: Connection, totals: Dict[int, Tuple[int, int]]) -> None:
+    """Overwrite every user's counters with recounted (bytes, files) totals"""
+    connection.execute(update(usage_table).values(bytes_used=0, file_count=0))
+    existing = set(connection.execute(select(usage_table.c.user_id)).scalars())
+    for user_id, (bytes_used, file_count) in totals.items():
+        if user_id in existing:
+            connection.execute(
+                update(usage_table).where(usage_table.c.user_id == user_id)
+                .values(bytes_used=bytes_used, file_count=file_count)
+            )
+        else:
+            connection.execute(insert(usage_table).values(
+                user_id=user_id, bytes_used=bytes_used, file_count=file_count
+            ))
@@ -0,0 +1,255 @@
+"""
+Thumbnail Pipeline
+Resized WebP derivatives of uploaded images, rendered in a process pool
+
+Uploaded photos are up to 5MB, but project grids show them a few hundred
+pixels wide. After an image upload, a worker process decodes it once and
+writes WebP copies at each configured width, with EXIF/XMP/ICC metadata
+stripped (orientation is applied to the pixels first). Derivatives are
+stored under the SHA-256 of the original file:
+
+    {UPLOAD_DIR}/derivatives/ab/abcdef.../480.webp
+
+so identical uploads share one set, a repeat upload costs nothing, and the
+URLs can be cached by browsers forever. Decoding and encoding happen in
+separate processes so they never hold the event loop or the GIL. If a
+worker process dies (a decoder crash, the OOM killer), the broken pool is
+replaced on the next upload.
+
+With remote storage (S3) the rendered set is also copied to the bucket
+under ``derivatives/ab/abcdef.../``, so nodes that didn't render it can
+still serve it.
+"""
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import shutil
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def content_hash(path: str) -> str:
+    """SHA-256 of a file, read in 1MB chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def derivative_dir(root: Path, digest: str) -> Path:
+    return root / digest[:2] / digest
+
+
+def derivative_key(digest: str, width: int) -> str:
+    """Storage key of a derivative copied to remote storage"""
+    return f"derivatives/{digest[:2]}/{digest}/{width}.webp"
+
+
+def render_derivatives(source: str, target_dir: str, widths: Sequence[int], quality: int) -> List[int]:
+    """
+    Write ``{width}.webp`` for each width into ``target_dir``; returns the widths written
+
+    Runs in a pool process. Images are never upscaled: widths wider than the
+    original collapse into one derivative at the original width. The set is
+    written to a scratch directory and renamed into place, so readers see
+    all derivatives or none.
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        from pillow_heif import register_heif_opener  # Optional: HEIC/HEIF support
+        register_heif_opener()
+    except ImportError:
+        pass
+
+    target = Path(target_dir)
+    scratch = target.parent / f".{target.name}.{os.getpid()}"
+    scratch.mkdir(parents=True, exist_ok=True)
+    written = []
+
+    try:
+        with Image.open(source) as original:
+            # JPEGs can decode at 1/2, 1/4 or 1/8 scale - far cheaper than a full decode
+            original.draft("RGB", (max(widths), max(widths)))
+            image = ImageOps.exif_transpose(original)
+            image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+            # Largest first, each step resampling the previous (smaller) result
+            for width in sorted(set(widths), reverse=True):
+                width = min(width, image.width)
+                if width in written:
+                    continue
+                if width < image.width:
+                    image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+
+                # New image objects carry no metadata; nothing from the original is copied
+                image.save(scratch / f"{width}.webp", "WEBP", quality=quality, method=4)
+                written.append(width)
+    except Exception:
+        shutil.rmtree(scratch, ignore_errors=True)
+        raise
+
+    try:
+        scratch.rename(target)
+    except OSError:
+        shutil.rmtree(scratch, ignore_errors=True)  # Another process got there first
+    return sorted(written)
+
+
+class ThumbnailPipeline:
+    """
+    Schedules derivative rendering and tracks work in flight
+
+    The same content hash is only rendered once at a time; callers asking
+    for it while it renders share the same future. Uploads schedule from
+    request threads and renders finish on the pool's thread, so the pool and
+    ``_pending`` are only touched under ``_lock``.
+    """
+
+    def __init__(self, root: Path, widths: Sequence[int], quality: int = 80, workers: int = 2, storage=None):
+        self.root = Path(root)
+        self.widths = tuple(sorted(set(widths)))
+        self.quality = quality
+        self.workers = workers
+        self.storage = storage  # Remote StorageBackend to copy derivatives to, if any
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._publisher: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # forkserver: workers start from a clean process, not a fork of a threaded server
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(method))
+        return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        """Drop a broken pool so the next render starts a new one"""
+        if self._executor is executor:
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, source: str, digest: str):
+        """Start a render, replacing the pool if it broke since the last one; returns (pool, future)"""
+        args = (render_derivatives, source, str(derivative_dir(self.root, digest)), self.widths, self.quality)
+        executor = self._pool()
+        try:
+            return executor, executor.submit(*args)
+        except BrokenProcessPool:
+            print("⚠️  Thumbnail pool broken, starting a new one")
+            self._discard(executor)
+            executor = self._pool()
+            return executor, executor.submit(*args)
+
+    def path(self, digest: str, width: int) -> Path:
+        return derivative_dir(self.root, digest) / f"{width}.webp"
+
+    def available(self, digest: str) -> List[int]:
+        """Widths already rendered for a content hash"""
+        directory = derivative_dir(self.root, digest)
+        if not directory.is_dir():
+            return []
+        return sorted(int(p.stem) for p in directory.glob("*.webp") if p.stem.isdigit())
+
+    def published(self, digest: str) -> List[int]:
+        """Widths copied to remote storage for a content hash"""
+        if self.storage is None:
+            return []
+        prefix = derivative_key(digest, 0).rsplit("/", 1)[0] + "/"
+        names = (item.key.rsplit("/", 1)[1] for item in self.storage.list(prefix))
+        return sorted(int(name[:-5]) for name in names if name.endswith(".webp") and name[:-5].isdigit())
+
+    def schedule(self, source: str, digest: str, remove_source: bool = False) -> Optional[Future]:
+        """
+        Render derivatives in the background; None if they already exist
+
+        ``remove_source`` deletes the source file once rendering is done
+        (a scratch copy of an upload that lives in remote storage).
+        """
+        with self._lock:
+            if digest in self._pending or self.available(digest):
+                executor, future = None, self._pending.get(digest)
+            else:
+                executor, future = self._submit(source, digest)
+                self._pending[digest] = future
+
+        if executor is None:
+            if remove_source:
+                os.unlink(source)
+            return future
+        # Outside the lock: the callback takes it, and runs right here if the render already finished
+        future.add_done_callback(lambda done: self._finished(digest, source, done, remove_source, executor))
+        return future
+
+    def _finished(
+        self, digest: str, source: str, future: Future, remove_source: bool, executor: ProcessPoolExecutor
+    ) -> None:
+        with self._lock:
+            self._pending.pop(digest, None)
+            if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+                self._discard(executor)
+        if remove_source:
+            try:
+                os.unlink(source)
+            except FileNotFoundError:
+                pass
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            print(f"❌ Thumbnail generation failed for {source}: {future.exception()}")
+        elif self.storage is not None:
+            # Uploading runs off the pool's result thread so other renders aren't held up
+            if self._publisher is None:
+                self._publisher = ThreadPoolExecutor(1, thread_name_prefix="thumbnail-publish")
+            self._publisher.submit(self._publish, digest, future.result())
+
+    def _publish(self, digest: str, widths: List[int]) -> None:
+        try:
+            for width in widths:
+                self.storage.save_file(derivative_key(digest, width), self.path(digest, width), "image/webp")
+        except Exception as e:
+            print(f"❌ Copying thumbnails for {digest} to storage failed: {e}")
+
+    async def wait(self, digest: str) -> None:
+        """Wait for a render in flight in this process, if there is one"""
+        with self._lock:
+            future = self._pending.get(digest)
+        if future is not None:
+            try:
+                await asyncio.wrap_future(future)
+            except Exception:
+                pass
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+        if self._publisher is not None:
+            self._publisher.shutdown(wait=wait)
+            self._publisher = None
+
+
+@lru_cache()
+def get_thumbnail_pipeline() -> ThumbnailPipeline:
+    """Process-wide pipeline; the pool starts on the first image upload"""
+    from app.core.config import settings
+    from app.services.storage import get_storage
+
+    storage = get_storage()
+    return ThumbnailPipeline(
+        Path(settings.UPLOAD_DIR) / "derivatives",
+        settings.THUMBNAIL_WIDTHS,
+        quality=settings.THUMBNAIL_QUALITY,
+        workers=settings.THUMBNAIL_WORKERS,
+        storage=storage if storage.local_path("derivatives") is None else None,
+    )
@@ -0,0 +1,124 @@
+"""
+Token Service
+Refresh token rotation with reuse detection, and token revocation
+
+Every login starts a token family. A refresh atomically marks the presented
+refresh token used and issues the next one in the same family; if a used
+token is ever presented again, someone kept a copy, so the whole family -
+refresh tokens and the access tokens issued with them - is revoked.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Tuple
+from uuid import uuid4
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.revocation import revoke_local
+from app.core.security import create_access_token, create_refresh_token, decode_token
+from app.models.token import RefreshToken, RevokedToken
+from app.models.user import User
+
+
+class RefreshTokenError(Exception):
+    """Refresh token is invalid, expired, revoked or belongs to an inactive user"""
+
+
+class RefreshTokenReuseError(RefreshTokenError):
+    """An already-rotated refresh token was presented; its family is now revoked"""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def issue_tokens(db: Session, user: User, family_id: str = None) -> dict:
+    """
+    Create an access/refresh token pair and record the refresh token
+
+    Starts a new family unless ``family_id`` is given. The caller commits.
+    """
+    family_id = family_id or uuid4().hex
+    jti = uuid4().hex
+
+    access_token = create_access_token(
+        data={"sub": str(user.id), "role": user.role.value, "fid": family_id}
+    )
+    refresh_token = create_refresh_token(data={"sub": str(user.id), "fid": family_id, "jti": jti})
+    db.add(RefreshToken(
+        jti=jti,
+        family_id=family_id,
+        user_id=user.id,
+        expires_at=_now() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
+
+
+def rotate_refresh_token(db: Session, token: str) -> Tuple[User, dict]:
+    """Exchange a refresh token for a new pair in the same family"""
+    payload = decode_token(token)
+    if not payload or payload.get("type") != "refresh" or not payload.get("jti"):
+        raise RefreshTokenError("Invalid or expired refresh token")
+
+    # Claim the token atomically so two concurrent refreshes can't both win
+    claimed = db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.jti == payload["jti"],
+            RefreshToken.used_at.is_(None),
+            RefreshToken.revoked_at.is_(None),
+        )
+        .values(used_at=_now())
+    ).rowcount
+
+    if claimed != 1:
+        db.rollback()
+        stored = db.query(RefreshToken).filter(RefreshToken.jti == payload["jti"]).first()
+        if stored is not None and stored.revoked_at is None:
+            revoke_family(db, stored.family_id)
+            raise RefreshTokenReuseError("Refresh token reuse detected")
+        raise RefreshTokenError("Refresh token has been revoked")
+
+    user = db.query(User).filter(User.id == int(payload["sub"])).first()
+    if not user or not user.is_active:
+        db.rollback()
+        raise RefreshTokenError("User not found or inactive")
+
+    tokens = issue_tokens(db, user, family_id=payload.get("fid"))
+    db.commit()
+    return user, tokens
+
+
+def _record_revocations(db: Session, token_ids: Iterable[str], expires_at: datetime) -> None:
+    """Persist revocations for other workers, commit, then apply them locally"""
+    token_ids = [token_id for token_id in token_ids if token_id]
+    db.add_all([RevokedToken(token_id=token_id, expires_at=expires_at) for token_id in token_ids])
+    db.commit()
+    revoke_local(token_ids, expires_at)
+
+
+def revoke_family(db: Session, family_id: str) -> None:
+    """Revoke every refresh token in a family and every access token issued with them"""
+    now = _now()
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+    )
+    # No access token from this family can outlive its normal lifetime from now
+    _record_revocations(db, [family_id], now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+
+
+def revoke_access_token(db: Session, payload: dict) -> None:
+    """Logout: revoke the presented access token and its whole session family"""
+    if payload.get("fid"):
+        revoke_family(db, payload["fid"])
+    elif payload.get("jti"):
+        expires_at = datetime.fromtimestamp(payload["exp"], tz=timezone.utc)
+        _record_revocations(db, [payload["jti"]], expires_at)
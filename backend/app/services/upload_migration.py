@@ -0,0 +1,108 @@
+"""
+Upload Migration
+Moves stored uploads into the bucketed layout and recounts storage usage
+
+Usage:
+    python -m app.services.upload_migration             # move files, rewrite counters
+    python -m app.services.upload_migration --dry-run   # only report what would change
+
+Files stored before bucketing sit directly in their category directory
+(``{user_id}/{category}/{file_name}``); they are moved to
+``{user_id}/{category}/{bucket}/{file_name}`` in the configured storage
+backend (a rename on local disk, a server-side copy on S3). Downloads find
+files in either place, so the app can keep serving while this runs.
+
+Afterwards every user's storage_usage row is rewritten from what is
+actually stored, in one transaction. Run it again whenever the counters
+may have drifted (e.g. after a crash between counting and writing a file).
+
+The recount must run with uploads paused (maintenance mode, or the app
+stopped): an upload or delete between listing storage and writing the
+counters is overwritten by the recount and its usage lost. ``--dry-run``
+changes nothing and is safe at any time.
+"""
+import argparse
+from collections import defaultdict
+from typing import Dict, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.engine import Connection
+
+from app.models.user import User
+from app.services.storage import StorageBackend, file_key, get_storage, parse_file_key
+from app.services.storage_usage import replace_usage
+
+
+def migrate_layout(storage: StorageBackend, dry_run: bool = False) -> Tuple[int, Dict[int, Tuple[int, int]]]:
+    """
+    Move flat-layout uploads into buckets
+
+    Returns how many files were (or would be) moved, and the recounted
+    (bytes, files) per user.
+    """
+    moved = 0
+    totals = defaultdict(lambda: [0, 0])
+    for item in list(storage.list("")):
+        parsed = parse_file_key(item.key)
+        if parsed is None:
+            continue  # Thumbnails, partial uploads, scratch copies
+        user_id, category, file_name = parsed
+        target = file_key(user_id, category, file_name)
+        if item.key != target:
+            if not dry_run:
+                storage.move(item.key, target)
+            moved += 1
+        totals[user_id][0] += item.size
+        totals[user_id][1] += 1
+    return moved, {user_id: (size, count) for user_id, (size, count) in totals.items()}
+
+
+def write_usage(connection: Connection, totals: Dict[int, Tuple[int, int]]) -> Tuple[Dict[int, Tuple[int, int]], int]:
+    """
+    Replace the usage counters with recounted totals
+
+    Only correct while no uploads or deletes run: usage they reserve or
+    release after ``totals`` were listed is overwritten.
+
+    Returns the totals written and how many users with files no longer exist.
+    """
+    known = set(connection.execute(select(User.id)).scalars())
+    written = {user_id: total for user_id, total in totals.items() if user_id in known}
+    replace_usage(connection, written)
+    return written, len(totals) - len(written)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Move uploads into the bucketed layout and recount storage usage "
+        "(pause uploads first: the recount overwrites usage changed while it runs)"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without changing it")
+    args = parser.parse_args()
+
+    from app.db.session import get_engine
+
+    storage = get_storage()
+    try:
+        moved, totals = migrate_layout(storage, dry_run=args.dry_run)
+    finally:
+        storage.close()
+    verb = "Would move" if args.dry_run else "Moved"
+    print(f"📦 {verb} {moved} files into buckets")
+
+    with get_engine().begin() as connection:
+        if args.dry_run:
+            known = set(connection.execute(select(User.id)).scalars())
+            orphaned = len(set(totals) - known)
+            totals = {user_id: total for user_id, total in totals.items() if user_id in known}
+        else:
+            totals, orphaned = write_usage(connection, totals)
+        if orphaned:
+            print(f"⚠️ Files of {orphaned} deleted users were not counted")
+    for user_id, (size, count) in sorted(totals.items()):
+        print(f"   user {user_id}: {count} files, {size / (1024 * 1024):.1f}MB")
+    print("✅ Storage usage recounted" if not args.dry_run else "✅ Dry run, nothing changed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""
+Benchmarks Package
+Load tests and benchmarks for the AIVA Backend
+"""
@@ -0,0 +1,204 @@
+"""
+Microbenchmarks
+Hot serialization and security primitives, measured with pytest-benchmark
+
+Usage:
+    # Run and compare against the stored baseline, failing on a >15% median regression
+    pytest benchmarks/bench_primitives.py --benchmark-storage=benchmarks/baselines \\
+        --benchmark-compare --benchmark-compare-fail=median:15%
+
+    # Refresh the stored baseline (on the reference machine; baselines are per
+    # interpreter, and comparing without one for the current interpreter fails)
+    pytest benchmarks/bench_primitives.py --benchmark-storage=benchmarks/baselines \\
+        --benchmark-save=baseline
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from passlib.context import CryptContext
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.pool import StaticPool
+
+from app.core.security import create_access_token, decode_token
+from app.db.session import Base
+from app.models import Portfolio, Project, Skill, Experience, PortfolioVisibility, User
+from app.schemas.portfolio import PortfolioResponse
+from app.schemas.upload import UploadResponse
+from app.services.portfolio_serializer import dumps, load_portfolio_payload
+
+BCRYPT_ROUNDS = (10, 11, 12)
+GRAPH_SIZES = (10, 100, 500)
+
+
+def build_portfolio_graph(items: int) -> Portfolio:
+    """Build a transient ORM portfolio with ``items`` projects, skills and experiences"""
+    now = datetime(2024, 1, 1)
+    portfolio = Portfolio(
+        id=1,
+        user_id=1,
+        title="Benchmark Portfolio",
+        tagline="Full-stack engineer",
+        bio="Builds things. " * 20,
+        visibility=PortfolioVisibility.PUBLIC,
+        slug="benchmark",
+        is_default=True,
+        created_at=now,
+    )
+    portfolio.projects = [
+        Project(
+            id=i,
+            portfolio_id=1,
+            title=f"Project {i}",
+            description="A project description. " * 10,
+            role="Engineer",
+            company="Acme",
+            start_date=now - timedelta(days=i),
+            tech_stack=["Python", "FastAPI", "PostgreSQL", "React"],
+            features=["Feature one", "Feature two", "Feature three"],
+            images=[f"/uploads/{i}.webp"],
+            demo_url="https://demo.example.com",
+            repo_url="https://github.com/example/repo",
+            is_featured=False,
+            order_index=i,
+            created_at=now,
+        )
+        for i in range(items)
+    ]
+    portfolio.skills = [
+        Skill(
+            id=i,
+            portfolio_id=1,
+            name=f"Skill {i}",
+            category="Backend",
+            proficiency=80,
+            years_experience=5,
+            is_highlighted=False,
+            order_index=i,
+            created_at=now,
+        )
+        for i in range(items)
+    ]
+    portfolio.experiences = [
+        Experience(
+            id=i,
+            portfolio_id=1,
+            title="Software Engineer",
+            company="Acme",
+            location="Remote",
+            employment_type="Full-time",
+            start_date=now - timedelta(days=365),
+            description="Worked on things. " * 10,
+            achievements=["Shipped it", "Scaled it"],
+            technologies=["Python", "Go"],
+            order_index=i,
+            created_at=now,
+        )
+        for i in range(items)
+    ]
+    return portfolio
+
+
+# JWT
+
+def test_create_access_token(benchmark):
+    token = benchmark(create_access_token, {"sub": "42", "role": "candidate"})
+    assert token
+
+
+def test_decode_token(benchmark):
+    token = create_access_token({"sub": "42", "role": "candidate"})
+    payload = benchmark(decode_token, token)
+    assert payload["sub"] == "42"
+
+
+# Password hashing
+
+@pytest.mark.parametrize("rounds", BCRYPT_ROUNDS)
+def test_bcrypt_hash(benchmark, rounds):
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+    hashed = benchmark.pedantic(context.hash, args=("benchmark-password",), rounds=5, iterations=1)
+    assert hashed.startswith("$2b$")
+
+
+@pytest.mark.parametrize("rounds", BCRYPT_ROUNDS)
+def test_bcrypt_verify(benchmark, rounds):
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+    hashed = context.hash("benchmark-password")
+    ok = benchmark.pedantic(
+        context.verify, args=("benchmark-password", hashed), rounds=5, iterations=1
+    )
+    assert ok
+
+
+# Serialization
+
+@pytest.mark.parametrize("items", GRAPH_SIZES)
+def test_portfolio_response_model_validate(benchmark, items):
+    portfolio = build_portfolio_graph(items)
+    response = benchmark(PortfolioResponse.model_validate, portfolio)
+    assert len(response.projects) == items
+
+
+@pytest.mark.parametrize("items", GRAPH_SIZES)
+def test_portfolio_response_dump_json(benchmark, items):
+    response = PortfolioResponse.model_validate(build_portfolio_graph(items))
+    body = benchmark(response.model_dump_json)
+    assert body.startswith("{")
+
+
+@pytest.fixture(scope="module")
+def portfolio_db():
+    """In-memory database holding one 500-item portfolio"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(User(id=1, email="bench@example.com", username="bench", hashed_password="x"))
+        db.add(build_portfolio_graph(500))
+        db.commit()
+    yield engine
+    engine.dispose()
+
+
+def test_portfolio_orm_read(benchmark, portfolio_db):
+    """Reference path: ORM graph + PortfolioResponse validation"""
+    def read():
+        with Session(portfolio_db) as db:
+            portfolio = (
+                db.query(Portfolio)
+                .options(
+                    selectinload(Portfolio.projects),
+                    selectinload(Portfolio.skills),
+                    selectinload(Portfolio.experiences),
+                )
+                .filter(Portfolio.slug == "benchmark")
+                .one()
+            )
+            return PortfolioResponse.model_validate(portfolio).model_dump_json()
+
+    assert benchmark(read)
+
+
+def test_portfolio_fast_path_read(benchmark, portfolio_db):
+    """Column tuples encoded directly, as served by /api/portfolios/slug/{slug}"""
+    def read():
+        with Session(portfolio_db) as db:
+            return dumps(load_portfolio_payload(db, "benchmark"))
+
+    assert benchmark(read)
+
+
+def test_upload_response_construction(benchmark):
+    def construct():
+        return UploadResponse(
+            success=True,
+            message="Resume uploaded successfully",
+            file_path="uploads/1/resumes/20240101_000000_resume.pdf",
+            file_name="resume.pdf",
+            file_type="application/pdf",
+            file_size=123456,
+            category="resume",
+        )
+
+    response = benchmark(construct)
+    assert response.success
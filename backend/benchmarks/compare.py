@@ -0,0 +1,79 @@
+"""
+Benchmark Comparison
+Compares two load test result files and flags regressions
+
+Usage:
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.10
+
+Exits with status 1 when any scenario's p95 latency or throughput regressed
+by more than the threshold.
+"""
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+
+def _change(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    if not old or new is None:
+        return None
+    return new / old - 1
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> List[dict]:
+    """Return one row per scenario present in both result files"""
+    rows = []
+    for name, old in baseline.get("scenarios", {}).items():
+        new = candidate.get("scenarios", {}).get(name)
+        if new is None:
+            continue
+
+        p95_change = _change(old["latency_ms"]["p95"], new["latency_ms"]["p95"])
+        rps_change = _change(old["throughput_rps"], new["throughput_rps"])
+        regressed = (p95_change is not None and p95_change > threshold) or (
+            rps_change is not None and rps_change < -threshold
+        )
+        rows.append({
+            "scenario": name,
+            "p95_ms": (old["latency_ms"]["p95"], new["latency_ms"]["p95"]),
+            "p95_change": p95_change,
+            "throughput_rps": (old["throughput_rps"], new["throughput_rps"]),
+            "throughput_change": rps_change,
+            "regressed": regressed,
+        })
+    return rows
+
+
+def _fmt(change: Optional[float]) -> str:
+    return "n/a" if change is None else f"{change:+.1%}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows = compare(baseline, candidate, args.threshold)
+    for row in rows:
+        marker = "❌" if row["regressed"] else "✅"
+        print(
+            f"{marker} {row['scenario']:<10} "
+            f"p95 {row['p95_ms'][0]} → {row['p95_ms'][1]} ms ({_fmt(row['p95_change'])})  "
+            f"rps {row['throughput_rps'][0]} → {row['throughput_rps'][1]} ({_fmt(row['throughput_change'])})"
+        )
+
+    if any(row["regressed"] for row in rows):
+        print(f"\n❌ Regression beyond {args.threshold:.0%} detected")
+        sys.exit(1)
+    print("\n✅ No regressions detected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Benchmark fixtures
+Lets the microbenchmarks run without a .env file or a database server
+"""
+import os
+
+import pytest
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("POSTGRES_PASSWORD", "benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("DEBUG", "False")
+
+
+def pytest_sessionstart(session):
+    """
+    Refuse to compare without a baseline for this machine
+
+    pytest-benchmark stores baselines per machine id (platform, interpreter
+    and version) and only warns when none match, so a run on another
+    interpreter would otherwise pass without checking anything.
+    """
+    benchmarks = getattr(session.config, "_benchmarksession", None)
+    if benchmarks is None or not benchmarks.compare:
+        return
+    pattern = "[0-9][0-9][0-9][0-9]_" if benchmarks.compare is True else benchmarks.compare
+    if not benchmarks.storage.query(pattern):
+        raise pytest.UsageError(
+            f"No benchmark baseline for {benchmarks.storage.default_machine_id} in {benchmarks.storage}; "
+            "record one on this interpreter with --benchmark-save=baseline"
+        )
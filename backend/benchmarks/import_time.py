@@ -0,0 +1,156 @@
+"""
+Cold Start Report
+Measures time-to-/health in fresh interpreters and breaks down import cost
+
+Usage:
+    python -m benchmarks.import_time --runs 5 --budget-ms 1000 --top 25
+
+Exits with status 1 when the median cold start exceeds the budget. The
+import breakdown comes from ``python -X importtime`` and is grouped by
+top-level package so heavy dependencies stand out.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Runs in the child: import the app, run startup, answer one /health request
+COLD_START_SNIPPET = """
+import asyncio
+from app.main import app
+import httpx
+
+async def main():
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as client:
+            response = await client.get("/health")
+            print("READY", response.status_code, flush=True)
+            startup = (await client.get("/health/startup")).json()
+            print("STARTUP", __import__("json").dumps(startup), flush=True)
+
+asyncio.run(main())
+"""
+
+
+def measure_cold_start(env: Dict[str, str]) -> Tuple[float, dict]:
+    """Return (ms until /health answered, the app's own startup report)"""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", COLD_START_SNIPPET],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    ready_ms = None
+    report: dict = {}
+    for line in process.stdout:
+        if line.startswith("READY") and ready_ms is None:
+            ready_ms = (time.perf_counter() - start) * 1000
+        elif line.startswith("STARTUP"):
+            report = json.loads(line.split(" ", 1)[1])
+    process.wait()
+    if ready_ms is None:
+        raise RuntimeError("Child process never answered /health")
+    return ready_ms, report
+
+
+def import_breakdown(env: Dict[str, str], module: str = "app.main") -> List[Tuple[str, int, int]]:
+    """Parse ``-X importtime`` output into (module, self_us, cumulative_us)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|").split("|")]
+        rows.append((name, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start and import-time report")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=None, help="Defaults to COLD_START_BUDGET_MS")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--module", type=str, default="app.main")
+    parser.add_argument("--output", type=str, default=None, help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("DEBUG", "False")
+
+    budget_ms = args.budget_ms
+    if budget_ms is None:
+        from app.core.config import settings
+        budget_ms = settings.COLD_START_BUDGET_MS
+
+    print(f"🚀 Measuring cold start ({args.runs} runs)...")
+    samples = []
+    app_reports = []
+    for _ in range(args.runs):
+        ready_ms, report = measure_cold_start(env)
+        samples.append(ready_ms)
+        app_reports.append(report)
+        print(f"  /health answered after {ready_ms:.1f}ms")
+
+    rows = import_breakdown(env, args.module)
+    by_package: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in rows:
+        by_package[name.strip().split(".")[0]] += self_us
+
+    median_ms = statistics.median(samples)
+    report = {
+        "cold_start_ms": {
+            "median": round(median_ms, 1),
+            "min": round(min(samples), 1),
+            "max": round(max(samples), 1),
+            "samples": [round(s, 1) for s in samples],
+        },
+        "budget_ms": budget_ms,
+        "within_budget": median_ms <= budget_ms,
+        "app_startup": app_reports[-1] if app_reports else {},
+        "import_total_ms": round(sum(self_us for _, self_us, _ in rows) / 1000, 1),
+        "top_packages_ms": {
+            name: round(us / 1000, 1)
+            for name, us in sorted(by_package.items(), key=lambda item: -item[1])[: args.top]
+        },
+        "top_modules_cumulative_ms": [
+            {"module": name.strip(), "cumulative_ms": round(cum / 1000, 1), "self_ms": round(own / 1000, 1)}
+            for name, own, cum in sorted(rows, key=lambda row: -row[2])[: args.top]
+        ],
+    }
+
+    print("\n📦 Heaviest packages at import (self time):")
+    for name, ms in report["top_packages_ms"].items():
+        print(f"  {name:<24} {ms:>8.1f}ms")
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+        print(f"\n✅ Results written to {args.output}")
+
+    if report["within_budget"]:
+        print(f"\n✅ Median cold start {median_ms:.1f}ms within {budget_ms}ms budget")
+    else:
+        print(f"\n❌ Median cold start {median_ms:.1f}ms exceeds {budget_ms}ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+API Load Test
+Drives the main API flows at configurable concurrency and reports latency percentiles
+
+Usage:
+    # In-process against a fresh, seeded SQLite database (reproducible default)
+    python -m benchmarks.load --concurrency 16 --requests 500 --output results.json
+
+    # Against a running server whose database was seeded with benchmarks.seed
+    python -m benchmarks.load --base-url http://127.0.0.1:8000 --users 10
+
+Compare two runs with ``python -m benchmarks.compare old.json new.json``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+from benchmarks.stats import summarize_latencies
+
+SCENARIOS = ("login", "me", "upload", "list", "portfolio", "portfolio_orm")
+
+# Smallest well-formed PDF, enough for the upload endpoint's type/size checks
+SAMPLE_PDF = (
+    b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+    b"2 0 obj<</Type/Pages/Kids[]/Count 0>>endobj\ntrailer<</Root 1 0 R>>\n%%EOF\n"
+)
+
+
+async def run_scenario(
+    name: str,
+    call: Callable[[int], Awaitable[int]],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> dict:
+    """
+    Run ``requests`` calls with ``concurrency`` workers
+
+    ``call`` receives the request number and returns an HTTP status code;
+    anything outside 2xx counts as an error.
+    """
+    for i in range(warmup):
+        await call(i)
+
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                status_code = await call(i)
+            except Exception:
+                status_code = 0
+            elapsed = time.perf_counter() - start
+            if 200 <= status_code < 300:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    return {
+        "scenario": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "duration_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+        "cpu_ms_per_request": round(cpu * 1000 / requests, 3) if requests else None,
+        "latency_ms": summarize_latencies(latencies),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def _prepare_in_process(args) -> dict:
+    """
+    Point the app at a throwaway workspace and seed it
+
+    Must run before anything imports ``app`` so Settings pick up the
+    benchmark DATABASE_URL and uploads land in the temp directory.
+    """
+    workdir = Path(tempfile.mkdtemp(prefix="aiva-bench-"))
+    os.chdir(workdir)
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{workdir / 'bench.db'}")
+    os.environ["DEBUG"] = "False"  # SQL echo would dominate the measurements
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "False")  # Login scenarios would otherwise get 429s
+
+    from app.db.init_db import init_db
+    from app.db.session import SessionLocal
+    from benchmarks.seed import seed_database
+
+    init_db()
+    with SessionLocal() as db:
+        summary = seed_database(
+            db,
+            users=args.users,
+            projects=args.projects,
+            conversations=args.conversations,
+            messages=args.messages,
+            seed=args.seed,
+        )
+    summary["workdir"] = str(workdir)
+    return summary
+
+
+async def run_benchmarks(args, seed_summary: dict) -> Dict[str, dict]:
+    """Log every benchmark user in, then run each selected scenario"""
+    import httpx
+    from benchmarks.seed import BENCH_PASSWORD, bench_email
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        from app.main import app
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://localhost",
+            timeout=60,
+        )
+
+    async with client:
+        tokens: List[str] = []
+        for index in range(args.users):
+            response = await client.post(
+                "/api/auth/login",
+                json={"email": bench_email(index), "password": BENCH_PASSWORD},
+            )
+            response.raise_for_status()
+            tokens.append(response.json()["access_token"])
+
+        def headers(i: int) -> dict:
+            return {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+
+        async def login(i: int) -> int:
+            response = await client.post(
+                "/api/auth/login",
+                json={"email": bench_email(i % args.users), "password": BENCH_PASSWORD},
+            )
+            return response.status_code
+
+        async def me(i: int) -> int:
+            return (await client.get("/api/auth/me", headers=headers(i))).status_code
+
+        async def upload(i: int) -> int:
+            files = {"file": (f"resume_{i}.pdf", SAMPLE_PDF, "application/pdf")}
+            response = await client.post("/api/upload/resume", files=files, headers=headers(i))
+            return response.status_code
+
+        async def list_uploads(i: int) -> int:
+            return (await client.get("/api/upload/list", headers=headers(i))).status_code
+
+        async def portfolio(i: int) -> int:
+            return (await client.get(f"/api/portfolios/slug/bench-portfolio-{i % args.users}")).status_code
+
+        async def portfolio_orm(i: int) -> int:
+            return await asyncio.to_thread(_read_portfolio_orm, f"bench-portfolio-{i % args.users}")
+
+        calls = {
+            "login": login,
+            "me": me,
+            "upload": upload,
+            "list": list_uploads,
+            "portfolio": portfolio,
+            "portfolio_orm": portfolio_orm,
+        }
+
+        results = {}
+        for name in args.scenarios:
+            if name == "portfolio_orm" and args.base_url:
+                print("  ⏭️  portfolio_orm: skipped (in-process only)")
+                continue
+            # bcrypt makes login orders of magnitude slower than other calls
+            requests = max(1, args.requests // 10) if name == "login" else args.requests
+            result = await run_scenario(name, calls[name], requests, args.concurrency, args.warmup)
+            results[name] = result
+            latency = result["latency_ms"]
+            print(
+                f"  {name:<10} rps={result['throughput_rps']:<9} p50={latency['p50']}ms "
+                f"p95={latency['p95']}ms p99={latency['p99']}ms errors={result['errors']}"
+            )
+        return results
+
+
+def _read_portfolio_orm(slug: str) -> int:
+    """
+    Reference path: load the ORM graph and validate it through PortfolioResponse
+
+    Kept to compare CPU per request against the /api/portfolios/slug fast path.
+    """
+    from sqlalchemy.orm import selectinload
+    from app.db.session import SessionLocal
+    from app.models import Portfolio
+    from app.schemas.portfolio import PortfolioResponse
+
+    with SessionLocal() as db:
+        portfolio = (
+            db.query(Portfolio)
+            .options(
+                selectinload(Portfolio.projects),
+                selectinload(Portfolio.skills),
+                selectinload(Portfolio.experiences),
+            )
+            .filter(Portfolio.slug == slug)
+            .first()
+        )
+        if portfolio is None:
+            return 404
+        PortfolioResponse.model_validate(portfolio).model_dump_json()
+    return 200
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AIVA API load test")
+    parser.add_argument("--base-url", type=str, default=None, help="Target a running server instead of in-process")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--conversations", type=int, default=3)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", type=str, default=None, help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    output_path = Path(args.output).resolve() if args.output else None
+
+    print("🚀 Preparing benchmark...")
+    if args.base_url:
+        seed_summary = {"users": args.users, "note": "Remote target - seeded separately"}
+    else:
+        seed_summary = _prepare_in_process(args)
+
+    print(f"📊 Running scenarios (concurrency={args.concurrency}, requests={args.requests})")
+    results = asyncio.run(run_benchmarks(args, seed_summary))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "mode": "remote" if args.base_url else "in-process",
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+        },
+        "seed": seed_summary,
+        "scenarios": results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if output_path:
+        output_path.write_text(output)
+        print(f"✅ Results written to {output_path}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
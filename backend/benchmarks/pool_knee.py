@@ -0,0 +1,138 @@
+"""
+Connection Pool Load Test
+Ramps concurrency against the configured database and reports the throughput knee
+
+Usage:
+    python -m benchmarks.pool_knee --max-concurrency 64 --duration 5 --hold-ms 5
+
+Pool settings come from the normal DB_POOL_* environment variables, so the
+same script can be re-run with different sizing to compare results.
+"""
+import argparse
+import json
+import threading
+import time
+from typing import List
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.pool import checkout_wait, pool_status
+from app.db.session import SessionLocal, engine
+from benchmarks.stats import summarize_latencies
+
+
+def run_level(concurrency: int, duration: float, hold_ms: float) -> dict:
+    """Run one concurrency level and return its latency/throughput summary"""
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    checkout_wait.reset()
+
+    def worker():
+        nonlocal errors
+        local: List[float] = []
+        local_errors = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            db = SessionLocal()
+            try:
+                db.execute(text("SELECT 1"))
+                if hold_ms:
+                    # Simulates request work done while the connection is held
+                    time.sleep(hold_ms / 1000.0)
+                local.append(time.perf_counter() - start)
+            except Exception:
+                local_errors += 1
+            finally:
+                db.close()
+        with lock:
+            latencies.extend(local)
+            errors += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": summarize_latencies(latencies),
+        "checkout_wait": checkout_wait.snapshot(),
+    }
+
+
+def find_knee(levels: List[dict], min_gain: float) -> dict:
+    """
+    Find the last concurrency level that still improved throughput
+
+    The knee is where doubling concurrency stops buying at least ``min_gain``
+    more throughput - past it extra clients only add queueing latency.
+    """
+    knee = levels[0]
+    for previous, current in zip(levels, levels[1:]):
+        if previous["throughput_rps"] == 0:
+            break
+        gain = current["throughput_rps"] / previous["throughput_rps"] - 1
+        if gain < min_gain or current["errors"]:
+            break
+        knee = current
+    return {
+        "concurrency": knee["concurrency"],
+        "throughput_rps": knee["throughput_rps"],
+        "p95_ms": knee["latency_ms"]["p95"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the connection pool throughput knee")
+    parser.add_argument("--max-concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per level")
+    parser.add_argument("--hold-ms", type=float, default=5.0, help="Simulated work per checkout")
+    parser.add_argument("--min-gain", type=float, default=0.10, help="Minimum throughput gain per doubling")
+    parser.add_argument("--output", type=str, default=None, help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    levels = []
+    concurrency = 1
+    while concurrency <= args.max_concurrency:
+        result = run_level(concurrency, args.duration, args.hold_ms)
+        levels.append(result)
+        print(
+            f"  concurrency={concurrency:<4} rps={result['throughput_rps']:<10} "
+            f"p95={result['latency_ms']['p95']}ms errors={result['errors']}"
+        )
+        concurrency *= 2
+
+    report = {
+        "pool_settings": {
+            "size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "timeout": settings.DB_POOL_TIMEOUT,
+            "recycle": settings.DB_POOL_RECYCLE,
+            "pre_ping": settings.DB_POOL_PRE_PING,
+        },
+        "hold_ms": args.hold_ms,
+        "levels": levels,
+        "knee": find_knee(levels, args.min_gain),
+        "final_pool_status": pool_status(engine),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"✅ Results written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Benchmark Data Seeder
+Creates deterministic, realistically sized users, portfolios and conversations
+
+Usage:
+    python -m benchmarks.seed --users 10 --projects 200 --messages 200
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy.orm import Session
+
+BENCH_PASSWORD = "benchmark-password"
+BENCH_EMAIL = "bench_user_{index}@example.com"
+
+TECHNOLOGIES = [
+    "Python", "FastAPI", "PostgreSQL", "React", "TypeScript", "Docker", "Kubernetes",
+    "AWS", "Redis", "GraphQL", "Node.js", "Go", "Rust", "Terraform", "Kafka", "Django",
+]
+SKILL_CATEGORIES = ["Frontend", "Backend", "Tools", "Cloud", "Data", "Soft Skills"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries"]
+WORDS = (
+    "built designed shipped scalable service pipeline dashboard reduced latency improved "
+    "throughput migrated legacy platform real-time analytics mentoring team customers "
+    "automated deployment observability reliability api portfolio assistant chat"
+).split()
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _paragraph(rng: random.Random, sentences: int) -> str:
+    return " ".join(_sentence(rng, rng.randint(8, 18)) for _ in range(sentences))
+
+
+def bench_email(index: int) -> str:
+    """Email address of the Nth benchmark user"""
+    return BENCH_EMAIL.format(index=index)
+
+
+def seed_database(
+    db: Session,
+    users: int = 10,
+    projects: int = 200,
+    skills: int = 50,
+    experiences: int = 20,
+    conversations: int = 5,
+    messages: int = 200,
+    seed: int = 1234,
+) -> dict:
+    """
+    Seed benchmark data and return a summary
+
+    Every user gets one public portfolio with ``projects`` projects,
+    ``skills`` skills and ``experiences`` experiences, plus
+    ``conversations`` chat conversations of ``messages`` messages each.
+    """
+    from app.core.security import get_password_hash
+    from app.models import (
+        User, UserRole, Portfolio, PortfolioVisibility, Project, Skill,
+        Experience, Conversation, Message, MessageType,
+    )
+
+    rng = random.Random(seed)
+    hashed_password = get_password_hash(BENCH_PASSWORD)  # Hash once, bcrypt is slow
+    base_date = datetime(2020, 1, 1)
+    slugs: List[str] = []
+
+    for index in range(users):
+        user = User(
+            email=bench_email(index),
+            username=f"bench_user_{index}",
+            hashed_password=hashed_password,
+            full_name=f"Benchmark User {index}",
+            bio=_paragraph(rng, 2),
+            role=UserRole.CANDIDATE,
+            is_active=True,
+        )
+        db.add(user)
+        db.flush()
+
+        slug = f"bench-portfolio-{index}"
+        slugs.append(slug)
+        portfolio = Portfolio(
+            user_id=user.id,
+            title=f"{user.full_name}'s Portfolio",
+            tagline=_sentence(rng, 8),
+            bio=_paragraph(rng, 5),
+            visibility=PortfolioVisibility.PUBLIC,
+            slug=slug,
+            is_default=True,
+            contact_email=user.email,
+            location="Remote",
+            github=f"https://github.com/bench{index}",
+        )
+        db.add(portfolio)
+        db.flush()
+
+        db.add_all(
+            Project(
+                portfolio_id=portfolio.id,
+                title=f"Project {p}: {_sentence(rng, 3)}",
+                description=_paragraph(rng, 4),
+                role=rng.choice(["Lead", "Engineer", "Contributor"]),
+                company=rng.choice(COMPANIES),
+                start_date=base_date + timedelta(days=rng.randint(0, 1500)),
+                tech_stack=rng.sample(TECHNOLOGIES, 5),
+                features=[_sentence(rng, 10) for _ in range(4)],
+                images=[f"/uploads/bench/{index}/{p}_{i}.webp" for i in range(3)],
+                demo_url=f"https://demo.example.com/{index}/{p}",
+                repo_url=f"https://github.com/bench{index}/project-{p}",
+                is_featured=p < 5,
+                order_index=p,
+            )
+            for p in range(projects)
+        )
+        db.add_all(
+            Skill(
+                portfolio_id=portfolio.id,
+                name=f"{rng.choice(TECHNOLOGIES)} {s}",
+                category=rng.choice(SKILL_CATEGORIES),
+                proficiency=rng.randint(1, 100),
+                years_experience=rng.randint(1, 15),
+                order_index=s,
+                is_highlighted=s < 10,
+            )
+            for s in range(skills)
+        )
+        db.add_all(
+            Experience(
+                portfolio_id=portfolio.id,
+                title=rng.choice(["Software Engineer", "Senior Engineer", "Tech Lead"]),
+                company=rng.choice(COMPANIES),
+                location="Remote",
+                employment_type="Full-time",
+                start_date=base_date + timedelta(days=rng.randint(0, 1500)),
+                description=_paragraph(rng, 3),
+                achievements=[_sentence(rng, 12) for _ in range(5)],
+                technologies=rng.sample(TECHNOLOGIES, 6),
+                order_index=e,
+            )
+            for e in range(experiences)
+        )
+
+        for c in range(conversations):
+            conversation = Conversation(
+                user_id=user.id,
+                portfolio_id=portfolio.id,
+                title=f"Conversation {c}",
+            )
+            db.add(conversation)
+            db.flush()
+            db.add_all(
+                Message(
+                    conversation_id=conversation.id,
+                    sender_id=user.id if m % 2 == 0 else None,
+                    content=_paragraph(rng, rng.randint(1, 6)),
+                    message_type=MessageType.USER if m % 2 == 0 else MessageType.AI,
+                    ai_model=None if m % 2 == 0 else "gpt-4",
+                )
+                for m in range(messages)
+            )
+
+        db.commit()
+
+    return {
+        "users": users,
+        "projects_per_portfolio": projects,
+        "skills_per_portfolio": skills,
+        "experiences_per_portfolio": experiences,
+        "conversations_per_user": conversations,
+        "messages_per_conversation": messages,
+        "seed": seed,
+        "slugs": slugs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed benchmark data into DATABASE_URL")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--skills", type=int, default=50)
+    parser.add_argument("--experiences", type=int, default=20)
+    parser.add_argument("--conversations", type=int, default=5)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    from app.db.init_db import init_db
+    from app.db.session import SessionLocal
+
+    init_db()
+    with SessionLocal() as db:
+        summary = seed_database(
+            db,
+            users=args.users,
+            projects=args.projects,
+            skills=args.skills,
+            experiences=args.experiences,
+            conversations=args.conversations,
+            messages=args.messages,
+            seed=args.seed,
+        )
+    print(f"✅ Seeded {summary['users']} benchmark users (password: {BENCH_PASSWORD})")
+
+
+if __name__ == "__main__":
+    main()
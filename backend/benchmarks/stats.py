@@ -0,0 +1,31 @@
+"""
+Benchmark Statistics
+Shared helpers for summarizing latency samples
+"""
+import statistics
+from typing import List, Sequence
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0-100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize_latencies(latencies: List[float]) -> dict:
+    """Summarize latency samples (seconds) in milliseconds"""
+    if not latencies:
+        return {"min": None, "mean": None, "p50": None, "p95": None, "p99": None, "max": None}
+
+    ordered = sorted(latencies)
+    return {
+        "min": round(ordered[0] * 1000, 3),
+        "mean": round(statistics.fmean(ordered) * 1000, 3),
+        "p50": round(percentile(ordered, 50) * 1000, 3),
+        "p95": round(percentile(ordered, 95) * 1000, 3),
+        "p99": round(percentile(ordered, 99) * 1000, 3),
+        "max": round(ordered[-1] * 1000, 3),
+    }
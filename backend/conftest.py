@@ -0,0 +1,132 @@
+"""
+Test fixtures
+Settings defaults, the SQLite database and app scaffolding shared by the backend tests
+
+The environment defaults are set before anything in ``app`` reads the
+settings; pytest imports this file ahead of the test modules.
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("POSTGRES_PASSWORD", "test")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("DEBUG", "False")
+
+import time  # noqa: E402
+from types import SimpleNamespace  # noqa: E402
+from typing import Callable, Iterator, Optional  # noqa: E402
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+from sqlalchemy.orm import Session, sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+
+def _sqlite_engine(path: Optional[str] = None) -> Engine:
+    """
+    SQLite with every table created
+
+    In memory by default, one connection shared by all threads; pass a file
+    path when sessions need separate connections (real concurrency).
+    """
+    from app.db.init_db import _register_models
+    from app.db.session import Base
+
+    if path:
+        engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 30})
+    else:
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    _register_models()
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def _db_override(factory: sessionmaker) -> Callable[[], Iterator[Session]]:
+    """A get_db replacement handing out sessions from ``factory``"""
+
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    return override_get_db
+
+
+@pytest.fixture
+def engine() -> Iterator[Engine]:
+    """In-memory SQLite with every table"""
+    engine = _sqlite_engine()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def file_engine(tmp_path) -> Iterator[Engine]:
+    """SQLite file with every table, for sessions that must really run concurrently"""
+    engine = _sqlite_engine(str(tmp_path / "test.db"))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine) -> sessionmaker:
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def make_app(session_factory):
+    """
+    Build a FastAPI app around routers on the test database
+
+    ``make_app((upload.router, "/api/upload"), user_id=1, overrides={...})``;
+    ``user_id`` stands in for the authenticated user, ``factory`` swaps the
+    database and ``overrides`` replaces any other dependency.
+    """
+    from app.core.deps import get_current_user, get_read_db
+    from app.db.session import get_db, get_session_factory
+
+    def make(*routers, user_id: Optional[int] = None, factory: Optional[sessionmaker] = None, overrides=None) -> FastAPI:
+        app = FastAPI()
+        for router, prefix in routers:
+            app.include_router(router, prefix=prefix)
+        app.dependency_overrides[get_db] = _db_override(factory or session_factory)
+        app.dependency_overrides[get_read_db] = app.dependency_overrides[get_db]  # No replicas in tests
+        app.dependency_overrides[get_session_factory] = lambda: factory or session_factory
+        if user_id is not None:
+            app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=user_id)
+        app.dependency_overrides.update(overrides or {})
+        return app
+
+    return make
+
+
+@pytest.fixture
+def asgi_client():
+    """``async with asgi_client(app) as client``: httpx calling the app in-process"""
+
+    def connect(app, ip: str = "127.0.0.1") -> httpx.AsyncClient:
+        transport = httpx.ASGITransport(app=app, client=(ip, 12345))
+        return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+    return connect
+
+
+@pytest.fixture
+def wait_until():
+    """Poll ``condition`` until it holds; False after ``timeout`` seconds"""
+
+    def wait(condition: Callable[[], bool], timeout: float = 5.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    return wait
@@ -0,0 +1,303 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.websockets import WebSocketDisconnect
+
+from app.api.routes import chat
+from app.core.ratelimit import get_rate_limiter
+from app.core.revocation import revocations, revoke_local
+from app.core.security import create_access_token, decode_token
+from app.models.message import Message
+from app.models.portfolio import Portfolio, PortfolioVisibility
+from app.models.user import User
+from app.services.llm import LLMClient, get_llm
+from app.services.llm_scheduler import LLMScheduler
+from app.services.message_writer import MessageWriter, get_message_writer
+
+WS = "/api/chat/ws"
+
+
+class FakeLLM:
+    """Streams a canned answer word by word"""
+    model = "fake-model"
+
+    def __init__(self, answer: str = "She has five years of Python.", delay: float = 0.0):
+        self.answer = answer
+        self.delay = delay
+        self.prompts = []
+
+    async def stream(self, messages, **options):
+        self.prompts.append(messages)
+        for word in self.answer.split(" "):
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield word + " "
+
+
+@pytest.fixture
+def chat_app(engine, session_factory, make_app):
+    """``app, token, writer = chat_app(llm)``: the chat router with one public portfolio"""
+    writers = []
+
+    def build(llm, factory=None):
+        factory = factory or session_factory
+        with factory() as db:
+            user = User(email="chat@example.com", username="chat", hashed_password="x")
+            db.add(user)
+            db.flush()
+            db.add(Portfolio(
+                user_id=user.id, title="Jane Doe", bio="Backend engineer", slug="jane",
+                visibility=PortfolioVisibility.PUBLIC,
+            ))
+            db.commit()
+            token = create_access_token({"sub": str(user.id)})
+
+        writer = MessageWriter(engine, flush_interval=0.01)
+        writers.append(writer)
+        app = make_app(
+            (chat.router, "/api/chat"),
+            factory=factory,
+            overrides={get_llm: lambda: llm, get_message_writer: lambda: writer},
+        )
+        get_rate_limiter.cache_clear()
+        return app, token, writer
+
+    yield build
+
+    for writer in writers:  # Before the engine fixture drops the database
+        writer.stop()
+
+
+def _until(ws, frame_type: str) -> list:
+    """Read frames up to and including the first of ``frame_type``"""
+    frames = []
+    while True:
+        frames.append(ws.receive_json())
+        if frames[-1]["type"] == frame_type:
+            return frames
+
+
+def test_rejects_bad_auth(chat_app):
+    app, _, _ = chat_app(FakeLLM())
+    with TestClient(app) as client:
+        for first_frame in ({"type": "auth", "token": "not-a-jwt"}, {"type": "message", "content": "hi"}):
+            with client.websocket_connect(WS) as ws:
+                ws.send_json(first_frame)
+                with pytest.raises(WebSocketDisconnect) as closed:
+                    ws.receive_json()
+                assert closed.value.code == chat.CLOSE_UNAUTHORIZED
+
+
+def test_streams_reply_and_keeps_state(chat_app, session_factory):
+    llm = FakeLLM()
+    app, token, writer = chat_app(llm)
+    with TestClient(app) as client:
+        with client.websocket_connect(WS) as ws:
+            ws.send_json({"type": "auth", "token": token})
+            assert ws.receive_json()["type"] == "ready"
+
+            ws.send_json({"type": "start", "slug": "jane"})
+            opened = ws.receive_json()
+            assert opened["type"] == "conversation" and opened["conversation_id"] is None
+
+            ws.send_json({"type": "message", "content": "What languages does she know?"})
+            frames = _until(ws, "done")
+            assert frames[0] == {"type": "typing", "is_typing": True}
+            text = "".join(f["content"] for f in frames if f["type"] == "token")
+            assert text.strip() == llm.answer
+            conversation_id = frames[-1]["conversation_id"]
+            assert conversation_id
+
+            # The second message reuses the cached prompt and history
+            ws.send_json({"type": "message", "content": "And databases?"})
+            _until(ws, "done")
+            system, *history = llm.prompts[-1]
+            assert "Jane Doe" in system["content"]
+            assert [m["role"] for m in history] == ["user", "assistant", "user"]
+
+        assert writer.flush(timeout=5)
+        with session_factory() as db:
+            count = db.execute(select(func.count()).select_from(Message)).scalar()
+            assert count == 4
+
+        # Reconnecting resumes the conversation with its history
+        with client.websocket_connect(WS) as ws:
+            ws.send_json({"type": "auth", "token": token})
+            ws.receive_json()
+            ws.send_json({"type": "start", "conversation_id": conversation_id})
+            resumed = ws.receive_json()
+            assert resumed["conversation_id"] == conversation_id
+            assert len(resumed["history"]) == 4
+
+
+def test_idle_socket_holds_no_session(chat_app, engine):
+    """Each database step opens and closes its own session"""
+    live = set()
+
+    class TrackedSession(Session):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            live.add(self)
+
+        def close(self):
+            live.discard(self)
+            super().close()
+
+    app, token, writer = chat_app(FakeLLM(), factory=sessionmaker(bind=engine, class_=TrackedSession))
+    with TestClient(app) as client:
+        with client.websocket_connect(WS) as ws:
+            ws.send_json({"type": "auth", "token": token})
+            assert ws.receive_json()["type"] == "ready"
+            assert not live
+
+            ws.send_json({"type": "start", "slug": "jane"})
+            ws.receive_json()
+            ws.send_json({"type": "message", "content": "What languages does she know?"})
+            conversation_id = _until(ws, "done")[-1]["conversation_id"]
+            assert not live
+
+            ws.send_json({"type": "start", "conversation_id": conversation_id})
+            assert len(ws.receive_json()["history"]) == 2
+            assert not live
+
+
+def _closed_on_next_message(ws) -> int:
+    """Send a message and return the close code it provokes"""
+    ws.send_json({"type": "message", "content": "Still there?"})
+    with pytest.raises(WebSocketDisconnect) as closed:
+        ws.receive_json()
+    return closed.value.code
+
+
+def test_revoked_token_closes_socket(chat_app):
+    app, token, _ = chat_app(FakeLLM())
+    claims = decode_token(token)
+    try:
+        with TestClient(app) as client:
+            with client.websocket_connect(WS) as ws:
+                ws.send_json({"type": "auth", "token": token})
+                ws.receive_json()
+                ws.send_json({"type": "message", "content": "Hello"})
+                _until(ws, "done")
+
+                # Logging out elsewhere revokes the token; the open socket notices on the next frame
+                revoke_local([claims["jti"]], datetime.utcfromtimestamp(claims["exp"]))
+                assert _closed_on_next_message(ws) == chat.CLOSE_UNAUTHORIZED
+    finally:
+        revocations.clear()
+
+
+def test_expired_token_closes_socket(chat_app):
+    app, _, _ = chat_app(FakeLLM())
+    token = create_access_token({"sub": "1"}, expires_delta=timedelta(seconds=1))
+    with TestClient(app) as client:
+        with client.websocket_connect(WS) as ws:
+            ws.send_json({"type": "auth", "token": token})
+            assert ws.receive_json()["type"] == "ready"
+            time.sleep(2.1)  # JWT expiry has one-second resolution
+            assert _closed_on_next_message(ws) == chat.CLOSE_UNAUTHORIZED
+
+
+def test_busy_when_inbox_full(chat_app):
+    app, token, _ = chat_app(FakeLLM(delay=0.05))
+    with TestClient(app) as client:
+        with client.websocket_connect(WS) as ws:
+            ws.send_json({"type": "auth", "token": token})
+            ws.receive_json()
+            for i in range(8):
+                ws.send_json({"type": "message", "content": f"question {i}"})
+
+            errors, done = [], 0
+            while done + len(errors) < 8:
+                frame = ws.receive_json()
+                if frame["type"] == "error":
+                    errors.append(frame)
+                elif frame["type"] == "done":
+                    done += 1
+            assert errors and all("earlier messages" in e["detail"] for e in errors)
+            assert done >= 4
+
+
+class LongAnswerLLM(LLMClient):
+    """A real client whose upstream call produces a long answer slowly"""
+
+    def __init__(self, words: int = 200, delay: float = 0.01):
+        super().__init__("sk-test", "gpt-test", 0.7, 1000, scheduler=LLMScheduler(2))
+        self.words = words
+        self.delay = delay
+        self.produced = 0
+        self.closed = 0
+
+    async def _complete(self, messages):
+        try:
+            for i in range(self.words):
+                await asyncio.sleep(self.delay)
+                self.produced += 1
+                yield f"word{i} "
+        finally:
+            self.closed += 1
+
+
+def _ai_messages(factory):
+    with factory() as db:
+        return db.execute(
+            select(Message.content, Message.is_truncated)
+            .where(Message.ai_model.is_not(None))
+            .order_by(Message.id)
+        ).all()
+
+
+def test_disconnect_stops_generation(chat_app, session_factory, wait_until):
+    llm = LongAnswerLLM()
+    app, token, writer = chat_app(llm)
+    with TestClient(app) as client:
+        with client.websocket_connect(WS) as ws:
+            ws.send_json({"type": "auth", "token": token})
+            ws.receive_json()
+            ws.send_json({"type": "start", "slug": "jane"})
+            ws.receive_json()
+            ws.send_json({"type": "message", "content": "Tell me everything"})
+            ws.receive_json()  # typing
+            assert ws.receive_json()["type"] == "token"
+        # Visitor closed the widget
+
+        assert wait_until(lambda: llm.closed == 1)
+        assert llm.produced < llm.words
+        assert llm.scheduler.active == 0
+        # Saved as the handler unwinds
+        assert wait_until(lambda: writer.flush(timeout=5) and _ai_messages(session_factory))
+        [(content, truncated)] = _ai_messages(session_factory)
+        assert truncated and content.startswith("word0 ")
+
+
+def test_deadline_from_headers(chat_app, session_factory):
+    llm = LongAnswerLLM(words=40, delay=0.02)
+    app, token, writer = chat_app(llm)
+    with TestClient(app) as client:
+        with client.websocket_connect(WS, headers={"X-Request-Timeout": "0.3"}) as ws:
+            ws.send_json({"type": "auth", "token": token})
+            ws.receive_json()
+            ws.send_json({"type": "start", "slug": "jane"})
+            ws.receive_json()
+
+            ws.send_json({"type": "message", "content": "Summarise her career", "timeout": "soon"})
+            assert ws.receive_json()["type"] == "error"
+
+            ws.send_json({"type": "message", "content": "Summarise her career"})
+            frames = _until(ws, "done")
+            assert frames[-1]["truncated"] is True
+            assert 0 < sum(f["type"] == "token" for f in frames)
+            assert llm.closed == 1 and llm.produced < llm.words
+
+            # A per-message timeout overrides the header
+            ws.send_json({"type": "message", "content": "And in short?", "timeout": 5})
+            frames = _until(ws, "done")
+            assert "truncated" not in frames[-1]
+
+        assert writer.flush(timeout=5)
+        assert [truncated for _, truncated in _ai_messages(session_factory)] == [True, False]
@@ -0,0 +1,187 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.api.routes import chat
+from app.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from app.core.ratelimit import get_rate_limiter
+from app.core.security import create_access_token
+from app.models import Portfolio, Project, Skill, User
+from app.models.message import Message
+from app.models.portfolio import PortfolioVisibility
+from app.services.chat_fallback import AnswerCache, fallback_answer, get_answer_cache, relevant_snippets
+from app.services.llm import LLMClient, get_llm
+from app.services.message_writer import MessageWriter, get_message_writer
+
+WS = "/api/chat/ws"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class ScriptedLLM(LLMClient):
+    """Answers after ``delay`` seconds, or fails when ``error`` is set"""
+
+    def __init__(self, breaker: CircuitBreaker, delay: float = 0.0, timeout: float = None):
+        super().__init__("sk-test", "gpt-test", 0.7, 100, coalesce=False, breaker=breaker, timeout=timeout)
+        self.delay = delay
+        self.error = None
+        self.calls = 0
+
+    async def _complete(self, messages):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        for word in ("She", " knows", " Python"):
+            yield word
+
+
+def _collect(llm: LLMClient, question: str = "Skills?"):
+    async def run():
+        return "".join([token async for token in llm.stream([{"role": "user", "content": question}])])
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def writer(engine):
+    writer = MessageWriter(engine, flush_interval=0.01)
+    yield writer
+    writer.stop()  # Before the engine fixture drops the database
+
+
+def test_breaker_states():
+    clock = Clock()
+    breaker = CircuitBreaker("test.states", window=10, failure_ratio=0.5, min_calls=4, slow_seconds=1, cooldown_seconds=30, clock=clock)
+
+    for ok in (True, False, True):
+        breaker.acquire()
+        breaker.record(ok, 0.1)
+    assert breaker.state == CLOSED  # Too few calls to judge
+    breaker.acquire()
+    breaker.record(True, 5.0)  # Slow counts as bad: 2 of 4
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError) as opened:
+        breaker.acquire()
+    assert opened.value.retry_after == 30
+
+    clock.now = 30
+    assert breaker.state == HALF_OPEN
+    breaker.acquire()  # The trial call
+    with pytest.raises(CircuitOpenError):  # Second call during the trial
+        breaker.acquire()
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN  # Trial failed: another cooldown
+
+    clock.now = 60
+    breaker.acquire()
+    breaker.release()  # Abandoned trial; the next caller gets to try
+    breaker.acquire()
+    breaker.record(True, 0.2)
+    assert breaker.state == CLOSED
+
+
+def test_slow_and_failing_calls_trip_the_breaker():
+    breaker = CircuitBreaker("test.llm", window=4, failure_ratio=0.5, min_calls=2, slow_seconds=0.02, cooldown_seconds=60)
+    llm = ScriptedLLM(breaker, delay=0.05)
+    trips = breaker.trips.value
+
+    assert _collect(llm) == "She knows Python"  # Slow but answered
+    assert breaker.state == CLOSED
+    _collect(llm)
+    assert breaker.state == OPEN and breaker.trips.value == trips + 1
+
+    with pytest.raises(CircuitOpenError):
+        _collect(llm)
+    assert llm.calls == 2
+
+    # A call that never produces a token times out and counts as a failure
+    stalled = ScriptedLLM(CircuitBreaker("test.stall", min_calls=1, failure_ratio=1.0), delay=1.0, timeout=0.05)
+    with pytest.raises(asyncio.TimeoutError):
+        _collect(stalled)
+    assert stalled.breaker.state == OPEN
+
+
+def test_fallback_answers():
+    lines = [
+        "Portfolio: Jane Doe",
+        "About: Backend engineer",
+        "Skills: Python, PostgreSQL, Kubernetes",
+        "Projects:",
+        "- AIVA (FastAPI, React): AI portfolio assistant",
+    ]
+    assert relevant_snippets(lines, "Does she know Kubernetes?") == ["Skills: Python, PostgreSQL, Kubernetes"]
+    assert relevant_snippets(lines, "Any FastAPI projects?") == ["- AIVA (FastAPI, React): AI portfolio assistant"]
+
+    cache = AnswerCache(max_entries=2)
+    answer = fallback_answer(cache, 1, "Does she know Kubernetes?", lines)
+    assert "Kubernetes" in answer and "unavailable" in answer
+
+    cache.put(1, "Does she know Kubernetes?", "Yes, three years of it.")
+    assert "three years" in fallback_answer(cache, 1, "does she know  kubernetes", lines)
+    assert cache.get(2, "Does she know Kubernetes?") is None  # Per portfolio
+    cache.put(1, "a", "1")
+    cache.put(1, "b", "2")
+    assert len(cache) == 2 and cache.get(1, "Does she know Kubernetes?") is None
+
+
+def test_chat_degrades_while_open(session_factory, make_app, writer):
+    with session_factory() as db:
+        db.add_all([
+            User(id=1, email="jane@example.com", username="jane", hashed_password="x"),
+            Portfolio(id=1, user_id=1, title="Jane Doe", slug="jane", visibility=PortfolioVisibility.PUBLIC),
+            Skill(portfolio_id=1, name="Kubernetes"),
+            Project(portfolio_id=1, title="AIVA", description="AI portfolio assistant"),
+        ])
+        db.commit()
+    token = create_access_token({"sub": "1"})
+
+    breaker = CircuitBreaker("test.chat", min_calls=2, failure_ratio=0.5, cooldown_seconds=60)
+    llm = ScriptedLLM(breaker)
+    answers = AnswerCache(10)
+    app = make_app((chat.router, "/api/chat"), overrides={
+        get_llm: lambda: llm,
+        get_message_writer: lambda: writer,
+        get_answer_cache: lambda: answers,
+    })
+    get_rate_limiter.cache_clear()
+
+    def ask(ws, question):
+        ws.send_json({"type": "message", "content": question})
+        frames = []
+        while not frames or frames[-1]["type"] != "done":
+            frames.append(ws.receive_json())
+        return "".join(f["content"] for f in frames if f["type"] == "token"), frames
+
+    with TestClient(app) as client:
+        with client.websocket_connect(WS) as ws:
+            ws.send_json({"type": "auth", "token": token})
+            ws.receive_json()
+            ws.send_json({"type": "start", "slug": "jane"})
+            ws.receive_json()
+
+            text, frames = ask(ws, "Which skills?")
+            assert text == "She knows Python" and "degraded" not in frames[-1]
+
+            llm.error = RuntimeError("upstream 503")
+            text, frames = ask(ws, "Does she know Kubernetes?")  # Fails and opens the breaker
+            assert frames[-1]["degraded"] and "Skills: Kubernetes" in text
+            assert not any(f["type"] == "error" for f in frames)
+            calls = llm.calls
+
+            text, frames = ask(ws, "which skills")
+            assert frames[-1]["degraded"] and "She knows Python" in text  # Earlier answer
+            assert llm.calls == calls  # Failed fast without calling the backend
+
+    assert writer.flush(timeout=5)
+    with session_factory() as db:
+        models = db.execute(select(Message.ai_model).where(Message.ai_model.is_not(None)).order_by(Message.id)).scalars().all()
+    assert models == ["gpt-test", "fallback", "fallback"]
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import zlib
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+
+from app.core.compression import CompressionMiddleware, content_etag, etag_matches, negotiate
+
+PAYLOAD = json.dumps({"projects": [{"title": f"Project {i}", "description": "Built things " * 20} for i in range(50)]}).encode()
+
+
+def _routes() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/portfolio")
+    async def portfolio(request: Request):
+        etag = content_etag(PAYLOAD)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(PAYLOAD, media_type="application/json", headers={"ETag": etag})
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/image")
+    async def image():
+        return Response(b"\x89PNG" + b"\0" * 5000, media_type="image/png")
+
+    @app.get("/ranged")
+    async def ranged():
+        return Response(PAYLOAD, media_type="application/json", headers={"Accept-Ranges": "bytes"})
+
+    @app.get("/events")
+    async def events():
+        async def stream():
+            for i in range(3):
+                yield f"data: token {i}\n\n"
+                await asyncio.sleep(0)
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def _app(**options) -> FastAPI:
+    app = _routes()
+    app.add_middleware(CompressionMiddleware, encodings=["gzip"], **options)
+    return app
+
+
+@pytest.fixture
+def get(asgi_client):
+    """``await get(app, url, **headers)``"""
+
+    async def request(app, url: str, **headers) -> httpx.Response:
+        async with asgi_client(app) as client:
+            return await client.get(url, headers=headers)
+
+    return request
+
+
+def test_negotiation():
+    assert negotiate("gzip, deflate, br, zstd", ["zstd", "br", "gzip"]) == "zstd"
+    assert negotiate("gzip, deflate, br", ["zstd", "br", "gzip"]) == "br"
+    assert negotiate("br;q=0.5, gzip", ["zstd", "br", "gzip"]) == "gzip"
+    assert negotiate("*", ["br", "gzip"]) == "br"
+    assert negotiate("*;q=0, gzip;q=0", ["gzip"]) is None
+    assert negotiate("identity", ["gzip"]) is None
+    assert negotiate("", ["gzip"]) is None
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
+
+
+def test_compresses_and_caches_by_etag(get):
+    app = _app(minimum_size=500)
+
+    async def run():
+        first = await get(app, "/portfolio", **{"accept-encoding": "gzip"})
+        assert first.headers["content-encoding"] == "gzip"
+        assert first.headers["vary"] == "Accept-Encoding"
+        assert first.headers["etag"].startswith('W/"')
+        assert first.content == PAYLOAD  # httpx decoded it
+        assert int(first.headers["content-length"]) < len(PAYLOAD) / 5
+
+        second = await get(app, "/portfolio", **{"accept-encoding": "gzip"})
+        assert second.content == PAYLOAD
+
+        # The weak ETag revalidates against the app's strong one
+        revalidated = await get(app, "/portfolio", **{"accept-encoding": "gzip", "if-none-match": first.headers["etag"]})
+        assert revalidated.status_code == 304
+
+        plain = await get(app, "/portfolio", **{"accept-encoding": "identity"})
+        assert "content-encoding" not in plain.headers and plain.content == PAYLOAD
+        assert plain.headers["vary"] == "Accept-Encoding"
+
+    asyncio.run(run())
+
+
+def test_cache_skips_recompression(get):
+    middleware = CompressionMiddleware(_routes(), encodings=["gzip"], minimum_size=500)
+    compressions = []
+    original = middleware.compress
+    middleware.compress = lambda encoding, body: compressions.append(encoding) or original(encoding, body)
+
+    async def run():
+        for _ in range(3):
+            response = await get(middleware, "/portfolio", **{"accept-encoding": "gzip"})
+            assert response.headers["content-encoding"] == "gzip" and response.content == PAYLOAD
+
+    asyncio.run(run())
+    assert compressions == ["gzip"]
+    assert len(middleware.cache) == 1
+
+
+def test_leaves_small_binary_and_ranged_responses_alone(get):
+    app = _app(minimum_size=500)
+
+    async def run():
+        for url in ("/small", "/image", "/ranged"):
+            response = await get(app, url, **{"accept-encoding": "gzip"})
+            assert "content-encoding" not in response.headers, url
+
+    asyncio.run(run())
+
+
+def test_streams_server_sent_events():
+    middleware = CompressionMiddleware(_routes(), encodings=["gzip"])
+    sent = []
+
+    async def receive():
+        await asyncio.sleep(10)  # No request body; the client never disconnects
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": "GET", "path": "/events", "raw_path": b"/events", "query_string": b"",
+        "headers": [(b"accept-encoding", b"gzip")], "http_version": "1.1", "scheme": "http",
+        "server": ("test", 80), "client": ("127.0.0.1", 1234), "root_path": "",
+    }
+    asyncio.run(middleware(scope, receive, send))
+
+    start, *bodies = sent
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip" and b"content-length" not in headers
+    # Every event is decodable from the chunks sent so far, without waiting for the end
+    decoder = zlib.decompressobj(31)
+    events = [decoder.decompress(message["body"]).decode() for message in bodies]
+    assert [event for event in events if event] == [f"data: token {i}\n\n" for i in range(3)]
+    assert bodies[-1]["more_body"] is False and decoder.eof
@@ -0,0 +1,104 @@
+import asyncio
+import os
+from pathlib import Path
+
+import httpx
+import pytest
+
+from app.api.routes import upload
+from app.core.config import settings
+from app.core.file_response import RangeFileResponse, parse_range
+from app.services.storage import LocalStorage, get_storage
+
+CONTENT = os.urandom(600 * 1024)  # Spans several 256KB chunks
+URL = "/api/upload/files/resumes/cv.pdf"
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch) -> Path:
+    """User 1's resume in a temporary upload directory"""
+    monkeypatch.setattr(upload, "UPLOAD_DIR", tmp_path)
+    (tmp_path / "1" / "resumes").mkdir(parents=True)
+    (tmp_path / "1" / "resumes" / "cv.pdf").write_bytes(CONTENT)
+    return tmp_path
+
+
+@pytest.fixture
+def get(upload_dir, make_app, asgi_client):
+    """``await get(url, user_id=1, method="GET", **headers)`` against the upload router"""
+
+    async def request(url: str, user_id: int = 1, method: str = "GET", **headers) -> httpx.Response:
+        app = make_app(
+            (upload.router, "/api/upload"),
+            user_id=user_id,
+            overrides={get_storage: lambda: LocalStorage(upload_dir)},
+        )
+        async with asgi_client(app) as client:
+            return await client.request(method, url, headers=headers)
+
+    return request
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=990-5000", 1000) == (990, 999)
+    assert parse_range("bytes=0-1,5-6", 1000) is None  # Multiple ranges: serve the whole file
+    assert parse_range("items=0-1", 1000) is None
+    assert parse_range("bytes=abc", 1000) is None
+
+
+def test_download_ranges_and_conditionals(get):
+    async def run():
+        full = await get(URL)
+        assert full.status_code == 200 and full.content == CONTENT
+        assert full.headers["accept-ranges"] == "bytes"
+        assert full.headers["content-type"] == "application/pdf"
+        assert full.headers["content-disposition"].startswith("inline")
+        etag = full.headers["etag"]
+
+        part = await get(URL, range="bytes=300000-")
+        assert part.status_code == 206 and part.content == CONTENT[300000:]
+        assert part.headers["content-range"] == f"bytes 300000-{len(CONTENT) - 1}/{len(CONTENT)}"
+
+        tail = await get(URL, range="bytes=-10")
+        assert tail.status_code == 206 and tail.content == CONTENT[-10:]
+
+        assert (await get(URL, range=f"bytes={len(CONTENT)}-")).status_code == 416
+        assert (await get(URL, **{"if-none-match": etag})).status_code == 304
+        stale = await get(URL, range="bytes=0-9", **{"if-range": '"old"'})
+        assert stale.status_code == 200 and len(stale.content) == len(CONTENT)
+
+        head = await get(URL, method="HEAD")
+        assert head.headers["content-length"] == str(len(CONTENT)) and head.content == b""
+
+        assert (await get("/api/upload/files/resumes/missing.pdf")).status_code == 404
+        assert (await get("/api/upload/files/..%2F..%2Fetc/passwd")).status_code == 404
+
+        # Other users' files don't exist for them
+        assert (await get(URL, user_id=2)).status_code == 404
+
+    asyncio.run(run())
+
+
+def test_offload_and_zero_copy(upload_dir, get, monkeypatch):
+    monkeypatch.setattr(settings, "DOWNLOAD_OFFLOAD", "x-accel-redirect")
+    response = asyncio.run(get(URL))
+    assert response.status_code == 200 and response.content == b""
+    assert response.headers["x-accel-redirect"] == "/_protected/uploads/1/resumes/cv.pdf"
+
+    # Servers with the zero-copy extension get the file handle, not bytes
+    messages = []
+
+    async def send(message):
+        if message["type"] == "http.response.zerocopysend":
+            message = {**message, "file": message["file"].name}
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "headers": [(b"range", b"bytes=100-199")],
+             "extensions": {"http.response.zerocopysend": {}}}
+    asyncio.run(RangeFileResponse(upload_dir / "1" / "resumes" / "cv.pdf")(scope, None, send))
+    assert messages[0]["status"] == 206
+    assert messages[1]["type"] == "http.response.zerocopysend"
+    assert (messages[1]["offset"], messages[1]["count"]) == (100, 100)
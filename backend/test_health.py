@@ -0,0 +1,23 @@
+import asyncio
+
+from app.core.config import settings
+from app.main import app
+
+
+def _status(asgi_client, path: str, ip: str) -> int:
+    async def run():
+        async with asgi_client(app, ip=ip) as client:
+            return (await client.get(path)).status_code
+    return asyncio.run(run())
+
+
+def test_diagnostics_only_on_internal_networks(asgi_client, monkeypatch):
+    for path in ("/health/db", "/health/startup"):
+        assert _status(asgi_client, path, "127.0.0.1") == 200
+        assert _status(asgi_client, path, "203.0.113.7") == 403
+    assert _status(asgi_client, "/health", "203.0.113.7") == 200  # Liveness stays public
+
+    monkeypatch.setattr(settings, "DIAGNOSTICS_NETWORKS", ["10.0.0.0/8"])
+    assert _status(asgi_client, "/health/db", "10.1.2.3") == 200
+    assert _status(asgi_client, "/health/db", "127.0.0.1") == 403
+    assert _status(asgi_client, "/health/db", "testclient") == 403  # Not an address
@@ -0,0 +1,102 @@
+import asyncio
+import io
+import zipfile
+
+import pytest
+from sqlalchemy import event, select
+
+from app.api.routes import upload
+from app.core.security import create_access_token
+from app.models import Experience, Portfolio, Project, Skill, User
+from app.services.linkedin_import import LinkedInExport, LinkedInImportError, parse_date
+
+POSITIONS = (
+    "﻿Company Name,Title,Description,Location,Started On,Finished On\n"
+    'Acme,Backend Engineer,"Built APIs, pipelines",Berlin,Jan 2021,\n'
+    "Initech,Intern,,,Jun 2019,Aug 2019\n"
+    ",Missing Company,,,,\n"
+)
+PROJECTS = "Title,Description,Url,Started On,Finished On\nAIVA,Portfolio assistant,https://aiva.dev,Mar 2024,\n"
+
+
+def _archive(skills: int = 1200) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("Positions.csv", POSITIONS)
+        archive.writestr("Skills.csv", "Name\n" + "".join(f"Skill {i}\n" for i in range(skills)))
+        archive.writestr("Projects.csv", PROJECTS)
+        archive.writestr("Connections.csv", "Notes:\nFirst Name,Last Name\nAda,Lovelace\n")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def app(session_factory, make_app):
+    """User 1's portfolio with one existing skill"""
+    with session_factory() as db:
+        db.add_all([
+            User(id=1, email="li@example.com", username="li", hashed_password="x"),
+            Portfolio(id=1, user_id=1, title="LinkedIn", slug="linkedin"),
+            Skill(portfolio_id=1, name="Old skill"),
+        ])
+        db.commit()
+    return make_app((upload.router, "/api/upload"))
+
+
+@pytest.fixture
+def post(app, asgi_client):
+    """Upload a LinkedIn export for portfolio 1 as its owner"""
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+
+    def send(filename: str, content: bytes, **form):
+        async def run():
+            async with asgi_client(app) as client:
+                return await client.post(
+                    "/api/upload/linkedin/export",
+                    files={"file": (filename, content, "application/zip")},
+                    data={"portfolio_id": "1", **form},
+                    headers=headers,
+                )
+
+        return asyncio.run(run())
+
+    return send
+
+
+def test_zip_export_imported_in_batches(engine, post):
+    inserts = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_inserts(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT"):
+            inserts.append(statement)
+
+    response = post("Basic_LinkedInDataExport.zip", _archive(), replace="true")
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["experiences"], body["skills"], body["projects"], body["skipped"]) == (2, 1200, 1, 1)
+    # 1200 skills at 500 per statement = 3 INSERTs, plus one each for positions and projects
+    assert len(inserts) == 5
+
+    with engine.connect() as connection:
+        skills = connection.execute(select(Skill.name).order_by(Skill.order_index)).scalars().all()
+        experience = connection.execute(select(Experience).order_by(Experience.order_index)).first()
+        project = connection.execute(select(Project)).first()
+    assert "Old skill" not in skills and skills[0] == "Skill 0"
+    assert experience.company == "Acme" and experience.description == "Built APIs, pipelines"
+    assert experience.start_date.year == 2021 and experience.end_date is None
+    assert project.demo_url == "https://aiva.dev"
+
+
+def test_single_csv_and_bad_uploads(post):
+
+    response = post("Projects.csv", PROJECTS.encode())
+    assert response.status_code == 200 and response.json()["projects"] == 1
+
+    assert post("notes.txt", b"hello").status_code == 400
+
+    # Declared uncompressed size is checked before anything is inflated
+    with pytest.raises(LinkedInImportError):
+        LinkedInExport(io.BytesIO(_archive(skills=5000)), "export.zip", max_uncompressed=1024)
+
+    assert parse_date("Jan 2020").month == 1 and parse_date("2018").year == 2018
+    assert parse_date("sometime") is None
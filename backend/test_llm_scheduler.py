@@ -0,0 +1,151 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.llm import LLMClient
+from app.services.llm_scheduler import BACKGROUND, INTERACTIVE, DeadlineExceeded, LLMScheduler
+
+
+async def _job(scheduler: LLMScheduler, priority: str, log: list, name: str, hold: float = 0.0, flow=None, weight: float = 1.0):
+    queued = time.monotonic()
+    await scheduler.acquire(priority, flow, weight=weight)
+    log.append((name, time.monotonic() - queued, dict(scheduler.running)))
+    try:
+        await asyncio.sleep(hold)
+    finally:
+        scheduler.release(priority)
+
+
+def test_interactive_not_stuck_behind_background():
+    scheduler = LLMScheduler(3, limits={BACKGROUND: 1})
+    log = []
+
+    async def run():
+        batch = [asyncio.create_task(_job(scheduler, BACKGROUND, log, f"summary-{i}", hold=0.03)) for i in range(6)]
+        await asyncio.sleep(0.005)
+        assert scheduler.depth[BACKGROUND].value == 5
+        for i in range(8):
+            await asyncio.gather(*(_job(scheduler, INTERACTIVE, log, f"chat-{i}-{j}", hold=0.01) for j in range(2)))
+        await asyncio.gather(*batch)
+
+    asyncio.run(run())
+    chats = [entry for entry in log if entry[0].startswith("chat")]
+    assert len(chats) == 16 and max(wait for _, wait, _ in chats) < 0.01
+    assert max(running[BACKGROUND] for _, _, running in log) == 1
+    assert scheduler.active == 0 and scheduler.depth[BACKGROUND].value == 0
+
+
+def test_fair_queuing_between_candidates():
+    scheduler = LLMScheduler(1)
+    log = []
+
+    async def run():
+        jobs = [_job(scheduler, BACKGROUND, log, "busy", flow="busy") for _ in range(6)]
+        jobs += [_job(scheduler, BACKGROUND, log, "quiet", flow="quiet") for _ in range(2)]
+        await asyncio.gather(*jobs)
+
+    asyncio.run(run())
+    assert [name for name, _, _ in log] == ["busy", "quiet", "busy", "quiet", "busy", "busy", "busy", "busy"]
+
+    log.clear()
+    scheduler = LLMScheduler(1)
+
+    async def weighted():
+        jobs = [_job(scheduler, BACKGROUND, log, "paid", flow="paid", weight=2) for _ in range(4)]
+        jobs += [_job(scheduler, BACKGROUND, log, "free", flow="free") for _ in range(4)]
+        await asyncio.gather(*jobs)
+
+    asyncio.run(weighted())
+    assert [name for name, _, _ in log][:6] == ["paid", "free", "paid", "paid", "free", "paid"]
+
+
+def test_stale_requests_are_dropped():
+    scheduler = LLMScheduler(1, deadlines={INTERACTIVE: 0.02})
+    dropped = scheduler.dropped[INTERACTIVE].value
+
+    async def run():
+        holder = asyncio.create_task(_job(scheduler, BACKGROUND, [], "long", hold=0.1))
+        await asyncio.sleep(0)
+        with pytest.raises(DeadlineExceeded):
+            await scheduler.acquire(INTERACTIVE)
+        assert scheduler.depth[INTERACTIVE].value == 0
+
+        # A cancelled waiter leaves the queue too
+        waiter = asyncio.create_task(scheduler.acquire(BACKGROUND))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await holder
+        assert scheduler.active == 0 and scheduler.depth[BACKGROUND].value == 0
+
+        # Already past its deadline when a slot frees up: never started
+        await scheduler.acquire(INTERACTIVE)
+        late = asyncio.create_task(scheduler.acquire(INTERACTIVE, deadline=time.monotonic() - 1))
+        await asyncio.sleep(0)
+        scheduler.release(INTERACTIVE)
+        with pytest.raises(DeadlineExceeded):
+            await late
+        assert scheduler.active == 0
+
+    asyncio.run(run())
+    assert scheduler.dropped[INTERACTIVE].value - dropped == 2
+
+
+def test_llm_client_holds_a_slot_per_call():
+    scheduler = LLMScheduler(1)
+    peak = []
+    open_calls = []
+
+    class FakeLLM(LLMClient):
+        async def _complete(self, messages):
+            peak.append(scheduler.active)
+            open_calls.append(messages)
+            try:
+                for word in ("Built", " AIVA"):
+                    await asyncio.sleep(0.01)
+                    yield word
+            finally:
+                open_calls.remove(messages)
+
+    llm = FakeLLM("sk-test", "gpt-test", 0.7, 100, scheduler=scheduler)
+    prompt = [{"role": "user", "content": "Summarise the project"}]
+
+    async def run():
+        results = await asyncio.gather(
+            llm.complete(prompt, priority=BACKGROUND, flow=1),
+            llm.complete(prompt, priority=INTERACTIVE, flow=1),  # Same prompt, other class: not shared
+        )
+        assert results == ["Built AIVA", "Built AIVA"]
+
+        for client in (llm, FakeLLM("sk-test", "gpt-test", 0.7, 100, coalesce=False, scheduler=scheduler)):
+            stream = client.stream([{"role": "user", "content": "Skills?"}])
+            assert await stream.__anext__() == "Built"
+            await stream.aclose()  # Client left mid-answer
+            assert scheduler.active == 0 and not open_calls  # Released before aclose() returned
+
+    asyncio.run(run())
+    assert peak == [1, 1, 1, 1] and scheduler.active == 0
+
+
+def test_shared_completion_keeps_each_callers_deadline():
+    scheduler = LLMScheduler(1)
+
+    class FakeLLM(LLMClient):
+        async def _complete(self, messages):
+            yield "Built AIVA"
+
+    llm = FakeLLM("sk-test", "gpt-test", 0.7, 100, scheduler=scheduler)
+    prompt = [{"role": "user", "content": "Skills?"}]
+
+    async def run():
+        holder = asyncio.create_task(_job(scheduler, BACKGROUND, [], "long", hold=0.1))
+        await asyncio.sleep(0)
+        impatient = asyncio.create_task(llm.complete(prompt, deadline=time.monotonic() + 0.03))
+        patient = asyncio.create_task(llm.complete(prompt))
+        with pytest.raises(DeadlineExceeded):
+            await impatient
+        assert await patient == "Built AIVA"  # Didn't inherit the first caller's deadline
+        await holder
+
+    asyncio.run(run())
+    assert scheduler.active == 0
@@ -0,0 +1,147 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from app.models.message import Conversation, Message, MessageType
+from app.models.user import User
+from app.services.message_writer import MessageWriter
+
+
+@pytest.fixture
+def engine(engine):
+    """The test database with a user and two conversations to write into"""
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert().values(id=1, email="w@example.com", username="w", hashed_password="x"))
+        connection.execute(Conversation.__table__.insert(), [{"id": 1, "user_id": 1}, {"id": 2, "user_id": 1}])
+    return engine
+
+
+def _contents(engine, conversation_id):
+    with engine.connect() as connection:
+        return connection.execute(
+            select(Message.content)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at, Message.id)
+        ).scalars().all()
+
+
+def test_batches_preserve_order(engine):
+    writer = MessageWriter(engine, batch_size=7, flush_interval=0.01)
+
+    for i in range(50):
+        writer.submit(1 + i % 2, f"message {i}", MessageType.USER if i % 4 < 2 else MessageType.AI)
+    assert writer.flush(timeout=5)
+    assert writer.pending == 0
+
+    assert _contents(engine, 1) == [f"message {i}" for i in range(0, 50, 2)]
+    assert _contents(engine, 2) == [f"message {i}" for i in range(1, 50, 2)]
+    with engine.connect() as connection:
+        updated = connection.execute(select(Conversation.updated_at)).scalars().all()
+    assert all(updated)
+    writer.stop()
+
+
+def test_stop_drains_queue(engine):
+    writer = MessageWriter(engine, batch_size=10, flush_interval=1.0)
+
+    # Hold the first batch open while more messages pile up behind it
+    writes = []
+    real_write = writer._write
+
+    def slow_write(rows):
+        writes.append(len(rows))
+        time.sleep(0.05)
+        real_write(rows)
+
+    writer._write = slow_write
+    for i in range(35):
+        writer.submit(1, f"message {i}", MessageType.USER)
+    writer.stop()
+
+    assert len(_contents(engine, 1)) == 35
+    assert max(writes) <= 10
+
+
+def test_rejected_rows_do_not_block_others(engine):
+    writer = MessageWriter(engine, batch_size=10, flush_interval=0.05)
+
+    writer.submit(1, "before", MessageType.USER)
+    writer.submit(1, None, MessageType.USER)  # content is NOT NULL
+    writer.submit(1, "after", MessageType.USER)
+    assert writer.flush(timeout=5)
+
+    assert _contents(engine, 1) == ["before", "after"]
+    writer.stop()
+
+
+def test_only_connection_errors_are_retried(engine):
+    writer = MessageWriter(engine, batch_size=10, flush_interval=0.01)
+    failures = [OperationalError("INSERT", {}, Exception("server closed the connection"))]
+    real_write = writer._write
+
+    def flaky_write(rows):
+        if failures:
+            raise failures.pop()
+        real_write(rows)
+
+    writer._write = flaky_write
+    writer.submit(1, "after outage", MessageType.USER)
+    assert writer.flush(timeout=5)
+    assert _contents(engine, 1) == ["after outage"]
+
+    # A schema mismatch fails every attempt: dropped instead of wedging the queue
+    def broken_write(rows):
+        raise ProgrammingError("INSERT", {}, Exception('column "is_truncated" does not exist'))
+
+    writer._write = broken_write
+    writer.submit(1, "lost", MessageType.USER)
+    assert writer.flush(timeout=5)
+    writer._write = real_write
+    writer.submit(1, "next", MessageType.USER)
+    assert writer.flush(timeout=5)
+    assert _contents(engine, 1) == ["after outage", "next"]
+    writer.stop()
+
+
+def test_submit_nowait_never_blocks(engine, wait_until):
+    writer = MessageWriter(engine, batch_size=1, flush_interval=0.01, max_pending=1)
+    release = threading.Event()
+    real_write = writer._write
+
+    def stuck_write(rows):
+        release.wait(5)  # Database hiccup
+        real_write(rows)
+
+    writer._write = stuck_write
+    writer.submit(1, "in flight", MessageType.USER)
+    assert wait_until(lambda: writer._queue.empty())
+    assert writer.submit_nowait(1, "queued", MessageType.AI)
+    started = time.monotonic()
+    assert not writer.submit_nowait(1, "dropped", MessageType.AI)  # Queue full
+    assert time.monotonic() - started < 0.1
+
+    release.set()
+    assert writer.flush(timeout=5)
+    assert _contents(engine, 1) == ["in flight", "queued"]
+    writer.stop()
+
+
+def test_stop_with_database_down(engine, wait_until):
+    writer = MessageWriter(engine, batch_size=1, flush_interval=0.01, max_pending=2)
+
+    def down(rows):
+        raise OperationalError("INSERT", {}, Exception("could not connect to server"))
+
+    writer._write = down
+    for i in range(3):
+        writer.submit(1, f"message {i}", MessageType.USER)
+    assert wait_until(lambda: writer._queue.full())
+
+    started = time.monotonic()
+    writer.stop(timeout=2)
+    assert time.monotonic() - started < 2.5
+    assert wait_until(lambda: not writer._thread.is_alive())
+    assert writer.pending == 0
@@ -0,0 +1,78 @@
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect
+
+from app.db.init_db import _register_models, init_db
+from app.db.migrations import (
+    SCHEMA_REVISION,
+    SchemaOutOfDateError,
+    alembic_config,
+    ensure_schema,
+    read_revision,
+)
+from app.db.session import Base
+
+
+# Tables that did not exist when the app still used create_all()
+TABLES_ADDED_BY_MIGRATIONS = {"refresh_tokens", "revoked_tokens", "storage_usage"}
+
+
+@pytest.fixture
+def empty_engine(tmp_path):
+    """A SQLite file with no tables, for migrations to build"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_schema_revision_is_head():
+    """SCHEMA_REVISION matches the newest migration script"""
+    script = ScriptDirectory.from_config(alembic_config())
+    assert script.get_current_head() == SCHEMA_REVISION
+
+
+def test_fresh_database_migrates_to_head(empty_engine):
+    assert ensure_schema(empty_engine, migrate=True) == "migrated"
+    assert ensure_schema(empty_engine, migrate=True) == "current"
+
+    with empty_engine.connect() as connection:
+        assert read_revision(connection) == SCHEMA_REVISION
+
+        # Models and migrations describe the same schema
+        _register_models()
+        context = MigrationContext.configure(connection)
+        assert compare_metadata(context, Base.metadata) == []
+
+
+def test_legacy_create_all_database_is_stamped(empty_engine):
+    """Databases created by the old create_all() startup are adopted, not recreated"""
+    _register_models()
+    Base.metadata.create_all(
+        empty_engine,
+        tables=[t for name, t in Base.metadata.tables.items() if name not in TABLES_ADDED_BY_MIGRATIONS],
+    )
+    # Simulate the pre-migration schema, which had none of the 0002 indexes or later columns
+    with empty_engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX ix_messages_conversation_created")
+        connection.exec_driver_sql("ALTER TABLE messages DROP COLUMN is_truncated")
+
+    assert ensure_schema(empty_engine, migrate=True) == "migrated"
+    with empty_engine.connect() as connection:
+        assert read_revision(connection) == SCHEMA_REVISION
+    index_names = {index["name"] for index in inspect(empty_engine).get_indexes("messages")}
+    assert "ix_messages_conversation_created" in index_names
+
+
+def test_init_db_database_is_current(empty_engine):
+    """Databases built by init_db() (benchmarks, local setups) need no upgrade"""
+    init_db(empty_engine)
+    assert ensure_schema(empty_engine, migrate=True) == "current"
+    with empty_engine.connect() as connection:
+        assert read_revision(connection) == SCHEMA_REVISION
+
+
+def test_check_only_mode_refuses_stale_schema(empty_engine):
+    with pytest.raises(SchemaOutOfDateError, match="alembic upgrade head"):
+        ensure_schema(empty_engine, migrate=False)
@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import event, func, select
+
+from app.api.routes import portfolios
+from app.core.security import create_access_token
+from app.models import Experience, Portfolio, Project, Skill, User
+
+
+@pytest.fixture
+def app(session_factory, make_app):
+    """Portfolio 1 with one project, owned by user 1; user 2 is a stranger"""
+    with session_factory() as db:
+        db.add_all([
+            User(id=1, email="owner@example.com", username="owner", hashed_password="x"),
+            User(id=2, email="other@example.com", username="other", hashed_password="x"),
+            Portfolio(id=1, user_id=1, title="Bulk", slug="bulk"),
+            Project(portfolio_id=1, title="Existing project"),
+        ])
+        db.commit()
+    return make_app((portfolios.router, "/api/portfolios"))
+
+
+def _headers(user_id: int) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+
+def _payload(count: int) -> dict:
+    return {
+        "projects": [{"title": f"Project {i}", "tech_stack": ["Python"], "order_index": i} for i in range(count)],
+        "skills": [{"name": f"Skill {i}", "proficiency": 80} for i in range(count)],
+        "experiences": [{"title": "Engineer", "company": f"Company {i}"} for i in range(count)],
+    }
+
+
+def test_import_batches_and_export_streams(app, engine, asgi_client):
+    inserts = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_inserts(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT"):
+            inserts.append(statement)
+
+    async def run():
+        async with asgi_client(app) as client:
+            response = await client.post("/api/portfolios/1/import", json=_payload(600), headers=_headers(1))
+            assert response.status_code == 201, response.text
+            assert response.json() == {"projects": 600, "skills": 600, "experiences": 600}
+
+            # 600 rows per type at 500 per statement = 2 INSERTs each
+            assert len(inserts) == 6
+
+            response = await client.get("/api/portfolios/1/export", headers=_headers(1))
+            assert response.status_code == 200
+            assert response.headers["content-type"] == "application/x-ndjson"
+            return [json.loads(line) for line in response.text.splitlines()]
+
+    lines = asyncio.run(run())
+    assert lines[0]["type"] == "portfolio" and lines[0]["slug"] == "bulk"
+    types = [line["type"] for line in lines[1:]]
+    assert types.count("project") == 601 and types.count("skill") == 600 and types.count("experience") == 600
+    projects = [line for line in lines if line["type"] == "project"]
+    assert projects[1]["title"] == "Project 0" and projects[1]["tech_stack"] == ["Python"]
+
+
+def test_import_replace_and_ownership(app, engine, asgi_client):
+
+    async def run():
+        async with asgi_client(app) as client:
+            # Other users can't see or write to the portfolio
+            response = await client.post("/api/portfolios/1/import", json=_payload(1), headers=_headers(2))
+            assert response.status_code == 404
+            assert (await client.get("/api/portfolios/1/export", headers=_headers(2))).status_code == 404
+
+            # Invalid items reject the whole request before anything is written
+            bad = _payload(2)
+            bad["skills"][1]["proficiency"] = 500
+            response = await client.post("/api/portfolios/1/import", json=bad, headers=_headers(1))
+            assert response.status_code == 422
+
+            response = await client.post(
+                "/api/portfolios/1/import", json={**_payload(3), "replace": True}, headers=_headers(1)
+            )
+            assert response.status_code == 201
+
+    asyncio.run(run())
+    with engine.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(Project)).scalar() == 3
+        assert connection.execute(select(func.count()).select_from(Skill)).scalar() == 3
+        assert connection.execute(select(func.count()).select_from(Experience)).scalar() == 3
@@ -0,0 +1,60 @@
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy.orm import Session, selectinload
+
+from app.models import Portfolio, Project, Skill, Experience, User, PortfolioVisibility
+from app.schemas.portfolio import PortfolioResponse
+from app.services.portfolio_serializer import dumps, load_portfolio_payload
+
+
+def _seed(db: Session) -> None:
+    now = datetime(2024, 5, 1, 12, 30, 15, 250000, tzinfo=timezone.utc)
+    db.add(User(id=1, email="c@example.com", username="c", hashed_password="x"))
+    db.add(Portfolio(
+        id=1, user_id=1, title="Portfolio", slug="fast", visibility=PortfolioVisibility.PUBLIC,
+        created_at=now, published_at=now,
+    ))
+    for i in range(3):
+        db.add(Project(
+            id=i + 1, portfolio_id=1, title=f"Project {i}", start_date=datetime(2023, 1, i + 1),
+            tech_stack=["Python", "React"], features=None, order_index=2 - i, created_at=now,
+        ))
+        db.add(Skill(id=i + 1, portfolio_id=1, name=f"Skill {i}", proficiency=50, order_index=i, created_at=now))
+        db.add(Experience(
+            id=i + 1, portfolio_id=1, title="Engineer", company="Acme",
+            achievements=["Shipped"], order_index=i, created_at=now,
+        ))
+    db.commit()
+
+
+def test_fast_path_matches_pydantic(engine):
+    """Fast-path JSON is identical to PortfolioResponse serialization"""
+    with Session(engine) as db:
+        _seed(db)
+        payload = load_portfolio_payload(db, "fast")
+        fast = json.loads(dumps(payload))
+
+        portfolio = (
+            db.query(Portfolio)
+            .options(
+                selectinload(Portfolio.projects),
+                selectinload(Portfolio.skills),
+                selectinload(Portfolio.experiences),
+            )
+            .filter(Portfolio.slug == "fast")
+            .one()
+        )
+        reference = json.loads(PortfolioResponse.model_validate(portfolio).model_dump_json())
+
+    # Fast path orders nested items by order_index; the relationship does not
+    for key in ("projects", "skills", "experiences"):
+        reference[key].sort(key=lambda item: (item["order_index"], item["id"]))
+
+    assert fast == reference
+    assert [p["order_index"] for p in fast["projects"]] == [0, 1, 2]
+
+
+def test_missing_slug_returns_none(engine):
+    with Session(engine) as db:
+        assert load_portfolio_payload(db, "missing") is None
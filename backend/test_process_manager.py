@@ -0,0 +1,196 @@
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+from app.server import available_cpus, max_requests
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+# Runs the server with an extra route that keeps a request in flight
+SERVER_WITH_SLOW_ROUTE = """
+import asyncio, sys
+from app.main import app
+
+@app.get("/slow")
+async def slow(seconds: float):
+    await asyncio.sleep(seconds)
+    return {"slept": seconds}
+
+from app.server import main
+main()
+"""
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(log_path: Path, pattern: str, count: int = 1, timeout: float = 30) -> list:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        matches = re.findall(pattern, log_path.read_text())
+        if len(matches) >= count:
+            return matches
+        time.sleep(0.1)
+    raise AssertionError(f"Timed out waiting for {pattern!r}:\n{log_path.read_text()}")
+
+
+@pytest.fixture
+def start_server(tmp_path):
+    """
+    ``master, url, log_path = start_server(workers=2, **settings)``
+
+    Starts ``python -m app.server`` (plus a /slow route) and waits for every
+    worker; any master still running at teardown is terminated.
+    """
+    masters = []
+
+    def start(workers: int = 2, **settings):
+        port = _free_port()
+        log_path = tmp_path / f"server-{port}.log"
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path}/server.db", DEBUG="False")
+        env.update({name: str(value) for name, value in settings.items()})
+        with open(log_path, "w") as log:
+            master = subprocess.Popen(
+                [
+                    sys.executable, "-c", SERVER_WITH_SLOW_ROUTE,
+                    "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers),
+                ],
+                cwd=BACKEND_DIR,
+                env=env,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            )
+        masters.append(master)
+        _wait_for(log_path, r"Worker (\d+) ready", count=workers)
+        return master, f"http://127.0.0.1:{port}", log_path
+
+    yield start
+
+    for master in masters:
+        if master.poll() is None:
+            master.send_signal(signal.SIGTERM)
+            master.wait(timeout=30)
+
+
+def test_available_cpus():
+    assert available_cpus() >= 1
+
+
+def test_max_requests_jitter():
+    assert max_requests(0, 50) is None
+    assert max_requests(100, 0) == 100
+    assert {max_requests(100, 10) for _ in range(200)} <= set(range(100, 111))
+
+
+def test_rolling_restart_keeps_serving(start_server):
+    """SIGHUP replaces every worker while requests keep succeeding"""
+    master, url, log_path = start_server(workers=2)
+    original = set(_wait_for(log_path, r"Worker (\d+) ready", count=2))
+
+    failures = []
+    stop = threading.Event()
+
+    def hammer():
+        with httpx.Client(base_url=url) as client:
+            while not stop.is_set():
+                try:
+                    if client.get("/health").status_code != 200:
+                        failures.append("status")
+                except httpx.HTTPError as e:
+                    failures.append(repr(e))
+
+    thread = threading.Thread(target=hammer)
+    thread.start()
+    master.send_signal(signal.SIGHUP)
+    _wait_for(log_path, r"Rolling restart complete")
+    time.sleep(0.5)
+    stop.set()
+    thread.join()
+
+    ready = set(_wait_for(log_path, r"Worker (\d+) ready", count=4))
+    assert len(ready - original) == 2
+    assert not failures, failures
+
+    master.send_signal(signal.SIGTERM)
+    assert master.wait(timeout=30) == 0
+
+
+def test_crashed_worker_is_replaced(start_server):
+    """A worker killed outright is reported and respawned; the others keep serving"""
+    master, url, log_path = start_server(workers=2)
+    original = _wait_for(log_path, r"Worker (\d+) ready", count=2)
+
+    os.kill(int(original[0]), signal.SIGKILL)
+    _wait_for(log_path, rf"Worker {original[0]} exited unexpectedly")
+    ready = _wait_for(log_path, r"Worker (\d+) ready", count=3)
+    assert ready[2] not in original
+
+    for _ in range(20):
+        assert httpx.get(f"{url}/health").status_code == 200
+    phases = httpx.get(f"{url}/health/startup").json()["phases_ms"]
+    assert {"warm_db_pool", "warm_statements"} <= set(phases)  # Every worker reports its own boot
+    assert master.poll() is None
+
+
+def test_sigterm_finishes_in_flight_requests(start_server):
+    """Graceful shutdown lets a request shorter than the timeout complete"""
+    master, url, _ = start_server(workers=1, WORKER_GRACEFUL_TIMEOUT=10)
+    responses = []
+    request = threading.Thread(target=lambda: responses.append(httpx.get(f"{url}/slow?seconds=1", timeout=10)))
+    request.start()
+    time.sleep(0.3)  # Request is in flight
+
+    master.send_signal(signal.SIGTERM)
+    request.join()
+    assert responses[0].status_code == 200
+    assert responses[0].json() == {"slept": 1.0}
+    assert master.wait(timeout=30) == 0
+
+
+def test_sigterm_gives_up_after_graceful_timeout(start_server):
+    """A request that outlives WORKER_GRACEFUL_TIMEOUT does not hold up shutdown"""
+    master, url, _ = start_server(workers=1, WORKER_GRACEFUL_TIMEOUT=1)
+    outcomes = []
+
+    def slow_request():
+        try:
+            outcomes.append(httpx.get(f"{url}/slow?seconds=60", timeout=60).status_code)
+        except httpx.HTTPError as e:
+            outcomes.append(e)
+
+    request = threading.Thread(target=slow_request)
+    request.start()
+    time.sleep(0.3)
+
+    start = time.monotonic()
+    master.send_signal(signal.SIGTERM)
+    assert master.wait(timeout=30) == 0
+    assert time.monotonic() - start < 10  # Timeout plus the master's 5s grace, not 60s
+    request.join(timeout=10)
+    assert outcomes and outcomes[0] != 200  # Cancelled (500) or cut off, not served
+
+
+def test_workers_recycle_after_max_requests(start_server):
+    """WORKER_MAX_REQUESTS replaces a worker without failing the requests around it"""
+    master, url, log_path = start_server(workers=1, WORKER_MAX_REQUESTS=5)
+
+    for _ in range(12):
+        assert httpx.get(f"{url}/health", timeout=30).status_code == 200
+
+    recycled = _wait_for(log_path, r"Worker (\d+) recycled", count=2)
+    ready = _wait_for(log_path, r"Worker (\d+) ready", count=3)
+    assert set(recycled) < set(ready)
+    assert "exited unexpectedly" not in log_path.read_text()
+    assert master.poll() is None
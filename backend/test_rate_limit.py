@@ -0,0 +1,166 @@
+import asyncio
+
+import fakeredis
+import pytest
+from fastapi import FastAPI
+
+from app.core.ratelimit import (
+    Limit,
+    MemoryBackend,
+    RateLimitMiddleware,
+    RateLimitRule,
+    RateLimiter,
+    RedisBackend,
+    create_backend,
+    parse_limit,
+)
+from app.core.security import create_access_token
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _app(backend, rules):
+    app = FastAPI()
+
+    @app.post("/api/auth/login")
+    async def login():
+        return {"ok": True}
+
+    @app.post("/api/chat/send")
+    async def chat():
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    app.add_middleware(RateLimitMiddleware, backend=backend, rules=rules)
+    return app
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "redis":
+        return RedisBackend(client=fakeredis.FakeAsyncRedis())
+    return MemoryBackend()
+
+
+def test_parse_limit():
+    assert parse_limit("10/minute") == Limit(10, 60)
+    assert parse_limit("5 / seconds") == Limit(5, 1)
+    assert parse_limit("100/15minutes") == Limit(100, 900)
+    for bad in ("ten/minute", "0/minute", "10/fortnight"):
+        with pytest.raises(ValueError):
+            parse_limit(bad)
+
+
+def test_bucket_bursts_then_refills():
+    """Full burst is allowed, then one token per interval"""
+    clock = FakeClock()
+    backend = MemoryBackend(clock=clock)
+    limit = Limit(3, 60)
+
+    async def run():
+        results = [await backend.hit("k", limit) for _ in range(4)]
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert [r.remaining for r in results[:3]] == [2, 1, 0]
+        assert abs(results[3].retry_after - 20) < 1e-6
+
+        clock.now += 20
+        assert (await backend.hit("k", limit)).allowed
+        assert not (await backend.hit("k", limit)).allowed
+
+        # Fully refilled buckets are swept away
+        clock.now += 120
+        backend._sweep(clock.now)
+        assert len(backend) == 0
+
+    asyncio.run(run())
+
+
+def test_middleware_limits_per_ip_with_retry_after(asgi_client):
+    rules = [RateLimitRule("auth", "/api/auth/login", Limit(2, 60), "ip", frozenset({"POST"}))]
+    app = _app(MemoryBackend(), rules)
+
+    async def run():
+        async with asgi_client(app, "10.0.0.1") as client:
+            assert (await client.post("/api/auth/login")).status_code == 200
+            assert (await client.post("/api/auth/login")).status_code == 200
+            response = await client.post("/api/auth/login")
+            assert response.status_code == 429
+            assert response.headers["retry-after"] == "30"
+            assert response.json() == {"detail": "Too many requests"}
+            # Unmatched routes are never limited
+            assert (await client.get("/health")).status_code == 200
+
+        async with asgi_client(app, "10.0.0.2") as other:
+            assert (await other.post("/api/auth/login")).status_code == 200
+
+    asyncio.run(run())
+
+
+def test_middleware_limits_per_user(asgi_client):
+    rules = [RateLimitRule("chat", "/api/chat", Limit(1, 60), "user")]
+    app = _app(MemoryBackend(), rules)
+    alice = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+    bob = {"Authorization": f"Bearer {create_access_token({'sub': '2'})}"}
+
+    async def run():
+        # Same IP, different users: separate buckets
+        async with asgi_client(app) as client:
+            assert (await client.post("/api/chat/send", headers=alice)).status_code == 200
+            assert (await client.post("/api/chat/send", headers=bob)).status_code == 200
+            assert (await client.post("/api/chat/send", headers=alice)).status_code == 429
+
+    asyncio.run(run())
+
+
+def test_redis_script_matches_memory_backend():
+    backend = RedisBackend(client=fakeredis.FakeAsyncRedis())
+    limit = Limit(3, 60)
+
+    async def run():
+        results = [await backend.hit("k", limit) for _ in range(4)]
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert [r.remaining for r in results[:3]] == [2, 1, 0]
+        assert 19 < results[3].retry_after <= 20
+        assert (await backend.hit("other", limit)).allowed  # Separate bucket
+        ttl = await backend._client.pttl("ratelimit:k")
+        assert 59_000 < ttl <= 60_000  # Expires once the bucket has refilled
+
+    asyncio.run(run())
+
+
+def test_redis_backend_never_falls_back():
+    assert isinstance(create_backend("memory"), MemoryBackend)
+    assert isinstance(create_backend("redis", "redis://localhost:6379/0"), RedisBackend)
+    for name, url in (("redis", ""), ("memcached", "")):
+        with pytest.raises(ValueError):  # Fails at startup instead of limiting per process
+            create_backend(name, url)
+
+
+def test_rejected_requests_take_no_tokens(backend):
+    rules = [
+        RateLimitRule("api", "/api/", Limit(3, 60), "ip"),  # Hit first, then auth rejects
+        RateLimitRule("auth", "/api/auth/login", Limit(1, 60), "ip"),
+    ]
+
+    async def run():
+        limiter = RateLimiter(backend, rules)
+        assert await limiter.check("POST", "/api/auth/login", ip="10.0.0.1") is None
+        for _ in range(5):
+            rule, _ = await limiter.check("POST", "/api/auth/login", ip="10.0.0.1")
+            assert rule.name == "auth"
+        # Only the allowed login came out of the per-IP API budget
+        assert await limiter.check("GET", "/api/portfolios", ip="10.0.0.1") is None
+        assert await limiter.check("GET", "/api/portfolios", ip="10.0.0.1") is None
+        rule, _ = await limiter.check("GET", "/api/portfolios", ip="10.0.0.1")
+        assert rule.name == "api"
+
+    asyncio.run(run())
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from app.api.routes import auth
+from app.core.revocation import RevocationSet, revocations, sync_revocations
+
+USER = {"email": "rotate@example.com", "username": "rotate", "password": "rotate-password"}
+
+
+@pytest.fixture
+def app(make_app):
+    revocations.clear()
+    return make_app((auth.router, "/api/auth"))
+
+
+async def _login(client) -> dict:
+    response = await client.post("/api/auth/login", json={"email": USER["email"], "password": USER["password"]})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def _me(client, tokens) -> int:
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    return (await client.get("/api/auth/me", headers=headers)).status_code
+
+
+def test_refresh_rotation_and_reuse_detection(app, engine, asgi_client):
+    """A refresh token works once; replaying it revokes the whole family"""
+
+    async def run():
+        async with asgi_client(app) as client:
+            assert (await client.post("/api/auth/signup", json=USER)).status_code == 201
+            first = await _login(client)
+
+            response = await client.post("/api/auth/refresh", json={"refresh_token": first["refresh_token"]})
+            assert response.status_code == 200
+            second = response.json()
+            assert second["refresh_token"] != first["refresh_token"]
+            assert await _me(client, second) == 200
+
+            # Replaying the rotated token is treated as theft
+            replay = await client.post("/api/auth/refresh", json={"refresh_token": first["refresh_token"]})
+            assert replay.status_code == 401
+            assert "reuse" in replay.json()["detail"]
+
+            # ...which revokes the newer refresh token and access tokens too
+            response = await client.post("/api/auth/refresh", json={"refresh_token": second["refresh_token"]})
+            assert response.status_code == 401
+            assert await _me(client, second) == 401
+            assert await _me(client, first) == 401
+
+            # Other workers learn about it from the revoked_tokens table
+            other_worker = RevocationSet()
+            assert sync_revocations(engine, other_worker) == 1
+            assert len(other_worker) == 1
+
+    asyncio.run(run())
+
+
+def test_logout_revokes_session(app, asgi_client):
+    async def run():
+        async with asgi_client(app) as client:
+            assert (await client.post("/api/auth/signup", json=USER)).status_code == 201
+            session = await _login(client)
+            other_session = await _login(client)
+
+            headers = {"Authorization": f"Bearer {session['access_token']}"}
+            assert (await client.post("/api/auth/logout", headers=headers)).status_code == 200
+            assert await _me(client, session) == 401
+            response = await client.post("/api/auth/refresh", json={"refresh_token": session["refresh_token"]})
+            assert response.status_code == 401
+
+            # Logging out one device leaves other logins alone
+            assert await _me(client, other_session) == 200
+
+    asyncio.run(run())
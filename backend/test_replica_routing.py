@@ -0,0 +1,108 @@
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.core import deps
+from app.db.routing import PRIMARY_COOKIE, ReadYourWritesMiddleware, SessionRouter, ReplicaWriteError
+from app.models import User
+
+
+@pytest.fixture
+def router(tmp_path) -> SessionRouter:
+    """Two local SQLite files stand in for a primary and a lagging replica"""
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+
+    for engine, label in ((primary, "primary"), (replica, "replica")):
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE source (label TEXT)"))
+            conn.execute(text("INSERT INTO source VALUES (:label)"), {"label": label})
+        User.__table__.create(engine)
+
+    return SessionRouter(primary, [replica], sticky_seconds=5.0)
+
+
+def _source(session) -> str:
+    return session.execute(text("SELECT label FROM source")).scalar()
+
+
+def test_reads_go_to_replica(router):
+    """Anonymous and idle users read from the replica"""
+    with router.read_session() as db:
+        assert _source(db) == "replica"
+    with router.read_session(user_id=1) as db:
+        assert _source(db) == "replica"
+    with router.write_session() as db:
+        assert _source(db) == "primary"
+
+
+def test_read_your_writes(router):
+    """A user who commits a write reads from the primary until the window expires"""
+    with router.write_session() as db:
+        db.info["user_id"] = 42
+        db.add(User(email="a@example.com", username="a", hashed_password="x"))
+        db.commit()
+
+    with router.read_session(user_id=42) as db:
+        assert _source(db) == "primary"
+        assert db.query(User).count() == 1
+    with router.read_session(user_id=7) as db:
+        assert _source(db) == "replica"
+
+    router._recent_writes[42] = 0  # Expire the window
+    with router.read_session(user_id=42) as db:
+        assert _source(db) == "replica"
+
+
+def test_read_only_commit_is_not_sticky(router):
+    """Committing a session that only read does not pin the user"""
+    with router.write_session() as db:
+        db.info["user_id"] = 42
+        db.query(User).count()
+        db.commit()
+
+    assert not router.is_sticky(42)
+
+
+def test_replica_rejects_writes(router):
+    """Replica sessions refuse ORM writes"""
+    with router.read_session() as db:
+        db.add(User(email="b@example.com", username="b", hashed_password="x"))
+        with pytest.raises(ReplicaWriteError):
+            db.flush()
+
+
+def test_write_cookie_pins_reads_on_other_workers(router, monkeypatch):
+    """The response to a write pins the client's reads, whichever worker serves them"""
+    other_worker = SessionRouter(router.primary_engine, router.replica_engines)  # Knows nothing of the write
+    monkeypatch.setattr(deps, "get_session_router", lambda: other_worker)
+
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware, sticky_seconds=5)
+
+    @app.post("/write")
+    def write():
+        with router.write_session() as db:
+            db.add(User(email="c@example.com", username="c", hashed_password="x"))
+            db.commit()
+        return {}
+
+    @app.get("/read")
+    def read(db: Session = Depends(deps.get_read_db)):
+        return {"source": _source(db)}
+
+    with TestClient(app) as client:
+        assert client.get("/read").json() == {"source": "replica"}
+        assert PRIMARY_COOKIE not in client.get("/read").cookies  # Reads set nothing
+
+        assert PRIMARY_COOKIE in client.post("/write").cookies
+        assert client.get("/read").json() == {"source": "primary"}
+
+        # Forged or stale values don't pin the client
+        for value in (str(time.time() + 3600), str(time.time() - 1), "soon"):
+            client.cookies.set(PRIMARY_COOKIE, value)
+            assert client.get("/read").json() == {"source": "replica"}
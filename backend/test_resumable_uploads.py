@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from app.api.routes import upload
+from app.models import User
+from app.services.resumable_uploads import ResumableUploads, UploadNotFound, get_resumable_uploads, partial_dir
+from app.services.storage import LocalStorage, get_storage
+
+CONTENT = os.urandom(3 * 1024 * 1024 + 12345)
+SESSIONS = "/api/upload/sessions"
+
+
+@pytest.fixture
+def uploads(tmp_path) -> ResumableUploads:
+    return ResumableUploads(tmp_path / ".partial", ttl_seconds=3600, max_size=10 * 1024 * 1024)
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch, uploads, session_factory, make_app):
+    """The upload router for user 1, storing into ``tmp_path``"""
+    monkeypatch.setattr(upload, "UPLOAD_DIR", tmp_path)
+    with session_factory() as db:
+        db.add(User(id=1, email="u@example.com", username="u", hashed_password="x"))
+        db.commit()
+    return make_app(
+        (upload.router, "/api/upload"),
+        user_id=1,
+        overrides={get_resumable_uploads: lambda: uploads, get_storage: lambda: LocalStorage(tmp_path)},
+    )
+
+
+async def _create(client, size: int = len(CONTENT), checksum: str = None) -> dict:
+    body = {"file_name": "thesis.pdf", "content_type": "application/pdf", "size": size}
+    if checksum:
+        body["checksum"] = checksum
+    response = await client.post(SESSIONS, json=body)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_chunked_upload_roundtrip(app, asgi_client, tmp_path):
+    async def run():
+        async with asgi_client(app) as client:
+            session = await _create(client, checksum=hashlib.sha256(CONTENT).hexdigest())
+            url = session["upload_url"]
+            assert session["offset"] == 0
+
+            chunk = 1024 * 1024
+            for start in range(0, len(CONTENT), chunk):
+                piece = CONTENT[start:start + chunk]
+                headers = {"Upload-Offset": str(start)}
+                if start == 0:
+                    headers["Upload-Checksum"] = f"sha256 {hashlib.sha256(piece).hexdigest()}"
+                response = await client.patch(url, content=piece, headers=headers)
+                assert response.status_code == 200, response.text
+                assert response.headers["upload-offset"] == str(start + len(piece))
+
+            state = await client.get(url)
+            assert state.json()["offset"] == len(CONTENT)
+
+            done = await client.post(f"{url}/complete")
+            assert done.status_code == 200, done.text
+            stored = Path(done.json()["file_path"])
+            assert stored.parent.parent == tmp_path / "1" / "documents"
+            assert stored.read_bytes() == CONTENT
+
+            assert (await client.get(url)).status_code == 404
+
+    asyncio.run(run())
+
+
+def test_rejects_bad_chunks(app, uploads, asgi_client):
+    async def run():
+        async with asgi_client(app) as client:
+            session = await _create(client, size=100)
+            url = session["upload_url"]
+
+            wrong_offset = await client.patch(url, content=b"x" * 10, headers={"Upload-Offset": "5"})
+            assert wrong_offset.status_code == 409
+            assert wrong_offset.headers["upload-offset"] == "0"
+
+            corrupt = await client.patch(url, content=b"x" * 10, headers={
+                "Upload-Offset": "0", "Upload-Checksum": f"sha256 {hashlib.sha256(b'y').hexdigest()}"
+            })
+            assert corrupt.status_code == 422
+            assert (await client.get(url)).json()["offset"] == 0
+
+            too_long = await client.patch(url, content=b"x" * 101, headers={"Upload-Offset": "0"})
+            assert too_long.status_code == 413
+
+            early = await client.post(f"{url}/complete")
+            assert early.status_code == 409
+
+            # A second writer for the same session is turned away
+            fd = uploads._lock(session["upload_id"], {"offset": 0})
+            try:
+                busy = await client.patch(url, content=b"x", headers={"Upload-Offset": "0"})
+                assert busy.status_code == 409
+            finally:
+                os.close(fd)
+
+            bad_type = await client.post(SESSIONS, json={
+                "file_name": "a.exe", "content_type": "application/x-msdownload", "size": 10
+            })
+            assert bad_type.status_code == 400
+            huge = await client.post(SESSIONS, json={
+                "file_name": "a.pdf", "content_type": "application/pdf", "size": 11 * 1024 * 1024
+            })
+            assert huge.status_code == 413
+            huge_image = await client.post(SESSIONS, json={
+                "file_name": "a.png", "content_type": "image/png", "size": 6 * 1024 * 1024
+            })
+            assert huge_image.status_code == 413  # Same 5MB cap as direct image uploads
+
+            assert (await client.delete(url)).status_code == 204
+            assert (await client.get(url)).status_code == 404
+
+    asyncio.run(run())
+
+
+def test_resume_after_dropped_connection(tmp_path):
+    root = tmp_path / ".partial"
+    first_worker = ResumableUploads(root, ttl_seconds=3600, max_size=len(CONTENT))
+    session = first_worker.create(
+        1, "big.pdf", "application/pdf", len(CONTENT), "documents",
+        checksum=hashlib.sha256(CONTENT).hexdigest()
+    )
+    upload_id = session["upload_id"]
+
+    async def dropped_body():
+        yield CONTENT[:1024 * 1024]
+        yield CONTENT[1024 * 1024:1536 * 1024]
+        raise ConnectionError("network went away")
+
+    async def rest(offset):
+        yield CONTENT[offset:]
+
+    async def run():
+        with pytest.raises(ConnectionError):
+            await first_worker.append(upload_id, 1, 0, dropped_body())
+        offset = first_worker.get(upload_id, 1)["offset"]
+        assert 0 < offset <= 1536 * 1024
+
+        # Another worker picks up the rest and rebuilds the running hash from disk
+        second_worker = ResumableUploads(root, ttl_seconds=3600, max_size=len(CONTENT))
+        await second_worker.append(upload_id, 1, offset, rest(offset))
+        target = tmp_path / "done.pdf"
+        _, digest = second_worker.complete(upload_id, 1, target)
+        assert digest == hashlib.sha256(CONTENT).hexdigest()
+        assert target.read_bytes() == CONTENT
+
+    asyncio.run(run())
+
+
+def test_purges_expired_sessions(tmp_path):
+    uploads = ResumableUploads(tmp_path, ttl_seconds=60, max_size=1000)
+    stale = uploads.create(1, "a.pdf", "application/pdf", 10, "documents")
+    uploads.create(1, "b.pdf", "application/pdf", 10, "documents")
+    (tmp_path / f"{'o' * 32}.part").touch()  # Partial file whose session was never written
+
+    assert uploads.purge_expired() == 0
+    assert uploads.purge_expired(now=time.time() + 120) == 3
+    assert not any(tmp_path.iterdir())
+    with pytest.raises(UploadNotFound):
+        uploads.get(stale["upload_id"], 1)
+
+
+def test_nodes_sharing_the_partial_dir(tmp_path):
+    settings = type("S", (), {"UPLOAD_DIR": "uploads", "UPLOAD_PARTIAL_DIR": ""})
+    assert partial_dir(settings) == Path("uploads/.partial")
+    settings.UPLOAD_PARTIAL_DIR = "/mnt/shared/partial"
+    assert partial_dir(settings) == Path("/mnt/shared/partial")
+
+    async def body(data: bytes):
+        yield data
+
+    node_a = ResumableUploads(tmp_path, ttl_seconds=60, max_size=1000)
+    node_b = ResumableUploads(tmp_path, ttl_seconds=60, max_size=1000)
+    session = node_a.create(1, "a.pdf", "application/pdf", 10, "documents")
+
+    async def run():
+        await node_a.append(session["upload_id"], 1, 0, body(b"01234"))
+        await node_b.append(session["upload_id"], 1, 5, body(b"56789"))
+
+    asyncio.run(run())
+    _, digest = node_b.complete(session["upload_id"], 1, tmp_path / "done.pdf")
+    assert (tmp_path / "done.pdf").read_bytes() == b"0123456789"
+    assert digest == hashlib.sha256(b"0123456789").hexdigest()
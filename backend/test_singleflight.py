@@ -0,0 +1,163 @@
+import asyncio
+import time
+
+from app.api.routes import portfolios
+from app.core.deps import get_optional_user
+from app.core.singleflight import SingleFlight
+from app.models import Portfolio, Skill, User
+from app.models.portfolio import PortfolioVisibility
+from app.services.llm import LLMClient
+
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight("test.do")
+    started = []
+
+    async def load(key):
+        started.append(key)
+        await asyncio.sleep(0.05)
+        return {"key": key}
+
+    async def run():
+        results = await asyncio.gather(*(flight.do("a", lambda: load("a")) for _ in range(10)))
+        assert all(result is results[0] for result in results)
+        await flight.do("a", lambda: load("a"))  # Finished calls aren't cached
+        await asyncio.gather(flight.do("b", lambda: load("b")), flight.do("c", lambda: load("c")))
+
+    collapsed = flight.calls_collapsed.value
+    asyncio.run(run())
+    assert started == ["a", "a", "b", "c"]
+    assert flight.calls_collapsed.value - collapsed == 9
+    assert flight.in_flight == 0
+
+
+def test_cancelled_caller_and_errors():
+    flight = SingleFlight("test.cancel")
+    runs = []
+
+    async def slow():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("database went away")
+
+    async def run():
+        leader = asyncio.create_task(flight.do("k", slow))
+        follower = asyncio.create_task(flight.do("k", slow))
+        await asyncio.sleep(0.01)
+        leader.cancel()  # The first caller disconnects; the follower still gets the result
+        assert await follower == "done"
+        assert leader.cancelled() and runs == [1]
+
+        alone = asyncio.create_task(flight.do("k", slow))
+        await asyncio.sleep(0.01)
+        alone.cancel()
+        await asyncio.sleep(0)
+        assert flight.in_flight == 0  # Abandoned work is dropped
+
+        results = await asyncio.gather(*(flight.do("e", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+
+    asyncio.run(run())
+
+
+def test_streams_are_shared_with_late_joiners():
+    flight = SingleFlight("test.stream")
+    upstream = {"started": 0, "closed": 0}
+
+    async def tokens():
+        upstream["started"] += 1
+        try:
+            for token in ("Hel", "lo", " the", "re"):
+                await asyncio.sleep(0.01)
+                yield token
+        finally:
+            upstream["closed"] += 1
+
+    async def collect(delay: float = 0):
+        await asyncio.sleep(delay)
+        return [token async for token in flight.stream("prompt", tokens)]
+
+    async def run():
+        first, late = await asyncio.gather(collect(), collect(0.025))
+        assert first == late == ["Hel", "lo", " the", "re"]
+        assert upstream == {"started": 1, "closed": 1}
+
+        # Every listener gone: the upstream call is stopped
+        stream = flight.stream("prompt", tokens)
+        assert await stream.__anext__() == "Hel"
+        await stream.aclose()
+        await asyncio.sleep(0.02)
+        assert upstream == {"started": 2, "closed": 2} and flight.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_llm_client_coalesces_identical_prompts():
+    calls = []
+
+    class FakeLLM(LLMClient):
+        async def _complete(self, messages):
+            calls.append(messages)
+            for word in ("AIVA", " is", " a", " portfolio", " assistant"):
+                await asyncio.sleep(0.005)
+                yield word
+
+    llm = FakeLLM("sk-test", "gpt-test", 0.7, 100)
+    question = [{"role": "system", "content": "Portfolio"}, {"role": "user", "content": "What is AIVA?"}]
+    other = [{"role": "system", "content": "Portfolio"}, {"role": "user", "content": "Which skills?"}]
+
+    async def answer(messages):
+        return "".join([token async for token in llm.stream(messages)])
+
+    async def run():
+        answers = await asyncio.gather(*(answer(question) for _ in range(5)), answer(other))
+        assert set(answers) == {"AIVA is a portfolio assistant"}
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    assert llm.prompt_key(question) != llm.prompt_key(other)
+
+    llm.coalesce = False
+    calls.clear()
+
+    async def run_uncoalesced():
+        await asyncio.gather(answer(question), answer(question))
+
+    asyncio.run(run_uncoalesced())
+    assert len(calls) == 2
+
+
+def test_portfolio_route_shares_reads(session_factory, make_app, asgi_client, monkeypatch):
+    with session_factory() as db:
+        db.add_all([
+            User(id=1, email="viral@example.com", username="viral", hashed_password="x"),
+            Portfolio(id=1, user_id=1, title="Viral", slug="viral", visibility=PortfolioVisibility.PUBLIC),
+            Skill(portfolio_id=1, name="Python"),
+        ])
+        db.commit()
+
+    loads = []
+    original = portfolios._load_shared
+
+    def counting_load(bind, slug):
+        loads.append(slug)
+        time.sleep(0.05)  # Long enough for every request to arrive while it runs
+        return original(bind, slug)
+
+    monkeypatch.setattr(portfolios, "_load_shared", counting_load)
+    app = make_app((portfolios.router, "/api/portfolios"), overrides={get_optional_user: lambda: None})
+
+    async def run():
+        async with asgi_client(app) as client:
+            responses = await asyncio.gather(*(client.get("/api/portfolios/slug/viral") for _ in range(8)))
+            assert all(response.status_code == 200 for response in responses)
+            assert responses[0].json()["skills"][0]["name"] == "Python"
+            assert len({response.headers["etag"] for response in responses}) == 1
+            assert (await client.get("/api/portfolios/slug/missing")).status_code == 404
+
+    asyncio.run(run())
+    assert loads == ["viral", "missing"]
@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import io
+import os
+import threading
+import time
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import httpx
+import pytest
+
+from app.api.routes import upload
+from app.models import User
+from app.services.storage import LocalStorage, S3Storage, StorageBackend, StorageError, get_storage, sign_v4
+
+
+class FakeS3:
+    """In-memory S3-compatible bucket (a stand-in for MinIO) behind an httpx transport"""
+
+    def __init__(self, bucket: str = "aiva", fail_part: int = 0, flaky: int = 0):
+        self.bucket = bucket
+        self.objects = {}
+        self.uploads = {}
+        self.aborted = []
+        self.fail_part = fail_part
+        self.flaky = flaky  # Number of requests answered with 503 before behaving
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        assert request.headers["authorization"].startswith("AWS4-HMAC-SHA256 Credential=key/")
+        with self.lock:
+            if self.flaky:
+                self.flaky -= 1
+                return httpx.Response(503)
+        path = unquote(urlsplit(str(request.url)).path)
+        query = {k: v[0] for k, v in parse_qs(urlsplit(str(request.url)).query, keep_blank_values=True).items()}
+        assert path.startswith(f"/{self.bucket}")
+        key = path[len(self.bucket) + 2:]
+
+        if request.method == "GET" and not key:
+            prefix = query.get("prefix", "")
+            items = "".join(
+                f"<Contents><Key>{k}</Key><Size>{len(v)}</Size>"
+                f"<LastModified>2026-01-01T00:00:00.000Z</LastModified></Contents>"
+                for k, v in sorted(self.objects.items()) if k.startswith(prefix)
+            )
+            return httpx.Response(200, content=f"<ListBucketResult>{items}<IsTruncated>false</IsTruncated></ListBucketResult>")
+        if request.method == "POST" and "uploads" in query:
+            upload_id = f"upload-{len(self.uploads) + 1}"
+            self.uploads[upload_id] = {}
+            return httpx.Response(200, content=f"<InitiateMultipartUploadResult><UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>")
+        if request.method == "PUT" and "partNumber" in query:
+            number = int(query["partNumber"])
+            with self.lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            time.sleep(0.02)
+            with self.lock:
+                self.in_flight -= 1
+            if number == self.fail_part:
+                return httpx.Response(400, content="<Error><Code>InvalidPart</Code></Error>")
+            body = request.read()
+            self.uploads[query["uploadId"]][number] = body
+            return httpx.Response(200, headers={"etag": f'"{hashlib.md5(body).hexdigest()}"'})
+        if request.method == "POST" and "uploadId" in query:
+            parts = self.uploads.pop(query["uploadId"])
+            self.objects[key] = b"".join(parts[n] for n in sorted(parts))
+            return httpx.Response(200, content="<CompleteMultipartUploadResult/>")
+        if request.method == "DELETE" and "uploadId" in query:
+            self.aborted.append(query["uploadId"])
+            self.uploads.pop(query["uploadId"], None)
+            return httpx.Response(204)
+        if request.method == "PUT":
+            self.objects[key] = request.read()
+            return httpx.Response(200, headers={"etag": '"x"'})
+        if request.method == "HEAD":
+            if key not in self.objects:
+                return httpx.Response(404)
+            return httpx.Response(200, headers={
+                "content-length": str(len(self.objects[key])), "last-modified": "Thu, 01 Jan 2026 00:00:00 GMT"
+            })
+        if request.method == "DELETE":
+            self.objects.pop(key, None)
+            return httpx.Response(204)
+        return httpx.Response(400)
+
+
+@pytest.fixture
+def s3():
+    """``s3(fake, **options)``: S3Storage talking to a FakeS3; closed after the test"""
+    storages = []
+
+    def connect(fake: FakeS3, **options) -> S3Storage:
+        storages.append(S3Storage(
+            fake.bucket, "key", "secret", endpoint_url="http://minio:9000",
+            transport=httpx.MockTransport(fake.handler), **options
+        ))
+        return storages[-1]
+
+    yield connect
+    for storage in storages:
+        storage.close()
+
+
+def test_signature_v4():
+    # Example request from the AWS Signature Version 4 documentation
+    signature, signed, scope = sign_v4(
+        "GET", "/", [("Action", "ListUsers"), ("Version", "2010-05-08")],
+        {
+            "content-type": "application/x-www-form-urlencoded; charset=utf-8",
+            "host": "iam.amazonaws.com",
+            "x-amz-date": "20150830T123600Z",
+        },
+        hashlib.sha256(b"").hexdigest(), "AKIDEXAMPLE", "wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY",
+        "us-east-1", "iam", "20150830T123600Z",
+    )
+    assert signature == "5d672d79c15b13162d9279b0855cfba6789a8edb4c82c400e06b5924a6f2b5d7"
+    assert signed == "content-type;host;x-amz-date"
+    assert scope == "20150830/us-east-1/iam/aws4_request"
+
+
+def test_local_storage(tmp_path):
+    storage = LocalStorage(tmp_path)
+    assert storage.save("1/resumes/cv.pdf", io.BytesIO(b"pdf bytes")) == 9
+    assert storage.stat("1/resumes/cv.pdf").size == 9
+    assert [item.key for item in storage.list("1/")] == ["1/resumes/cv.pdf"]
+    assert storage.local_path("1/resumes/cv.pdf").read_bytes() == b"pdf bytes"
+    with pytest.raises(StorageError):  # Keys outside the root are refused
+        storage.save("../escape", io.BytesIO(b""))
+    storage.delete("1/resumes/cv.pdf")
+    assert storage.stat("1/resumes/cv.pdf") is None
+
+    class Incomplete(StorageBackend):
+        def save(self, key, fileobj, content_type=None):
+            return 0
+
+    with pytest.raises(TypeError):  # A backend missing methods can't be created
+        Incomplete()
+
+
+def test_s3_single_and_multipart_uploads(s3):
+    fake = FakeS3()
+    storage = s3(fake, prefix="aiva", part_size=64 * 1024, concurrency=3)
+    assert storage.save("1/resumes/small.pdf", io.BytesIO(b"tiny"), "application/pdf") == 4
+    assert fake.objects["aiva/1/resumes/small.pdf"] == b"tiny"
+
+    content = os.urandom(64 * 1024 * 10 + 123)  # 11 parts
+    assert storage.save("1/documents/big.pdf", io.BytesIO(content)) == len(content)
+    assert fake.objects["aiva/1/documents/big.pdf"] == content
+    assert 1 < fake.max_in_flight <= 3  # Parts went up in parallel, bounded by concurrency
+
+    assert storage.stat("1/documents/big.pdf").size == len(content)
+    assert storage.stat("1/documents/missing.pdf") is None
+    assert [item.key for item in storage.list("1/")] == ["1/documents/big.pdf", "1/resumes/small.pdf"]
+    assert storage.location("1/documents/big.pdf") == "s3://aiva/aiva/1/documents/big.pdf"
+
+    url = storage.url("1/documents/big.pdf", filename="big.pdf")
+    assert url.startswith("http://minio:9000/aiva/aiva/1/documents/big.pdf?X-Amz-Algorithm=AWS4-HMAC-SHA256")
+    assert "X-Amz-Signature=" in url and "response-content-disposition=inline" in url
+
+    storage.delete("1/resumes/small.pdf")
+    assert "aiva/1/resumes/small.pdf" not in fake.objects
+
+
+def test_s3_failures_abort_and_retry(s3):
+    fake = FakeS3(fail_part=2)
+    with pytest.raises(StorageError):  # A rejected part fails the upload
+        s3(fake, part_size=1024, concurrency=2).save("1/documents/broken.pdf", io.BytesIO(os.urandom(5000)))
+    assert fake.aborted == ["upload-1"] and not fake.objects
+
+    flaky = FakeS3(flaky=2)
+    s3(flaky).save("1/resumes/cv.pdf", io.BytesIO(b"retried"))
+    assert flaky.objects["1/resumes/cv.pdf"] == b"retried"
+
+
+def test_routes_with_s3_storage(s3, session_factory, make_app, asgi_client):
+    with session_factory() as db:
+        db.add(User(id=3, email="u@example.com", username="u", hashed_password="x"))
+        db.commit()
+    storage = s3(FakeS3())
+    app = make_app((upload.router, "/api/upload"), user_id=3, overrides={get_storage: lambda: storage})
+
+    async def run():
+        async with asgi_client(app) as client:
+            response = await client.post("/api/upload/resume", files={"file": ("cv.pdf", b"%PDF-1.7", "application/pdf")})
+            assert response.status_code == 200, response.text
+            assert response.json()["file_path"].startswith("s3://aiva/3/resumes/")
+
+            listed = (await client.get("/api/upload/list")).json()["files"]
+            assert len(listed) == 1 and listed[0]["category"] == "resumes"
+
+            download = await client.get(listed[0]["download_url"])
+            assert download.status_code == 307
+            assert download.headers["location"].startswith("http://minio:9000/aiva/3/resumes/")
+            assert (await client.get("/api/upload/files/resumes/other.pdf")).status_code == 404
+
+    asyncio.run(run())
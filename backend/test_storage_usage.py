@@ -0,0 +1,208 @@
+import asyncio
+import io
+import threading
+
+import pytest
+from alembic import command
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes import upload
+from app.core.config import settings
+from app.db.migrations import alembic_config
+from app.models import User
+from app.services.storage import LocalStorage, file_bucket, file_key, get_storage, parse_file_key
+from app.services.storage_usage import QuotaExceeded, get_usage, release, replace_usage, reserve, reserved
+from app.services.upload_migration import migrate_layout
+
+
+def _add_users(factory) -> None:
+    with factory() as db:
+        db.add_all([
+            User(id=1, email="one@example.com", username="one", hashed_password="x"),
+            User(id=2, email="two@example.com", username="two", hashed_password="x"),
+        ])
+        db.commit()
+
+
+@pytest.fixture
+def users(session_factory):
+    """Users 1 and 2 in the test database; returns its session factory"""
+    _add_users(session_factory)
+    return session_factory
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch) -> LocalStorage:
+    monkeypatch.setattr(upload, "UPLOAD_DIR", tmp_path)
+    return LocalStorage(tmp_path)
+
+
+@pytest.fixture
+def upload_app(users, storage, make_app):
+    """The upload router for user 1 on local storage"""
+    return make_app((upload.router, "/api/upload"), user_id=1, overrides={get_storage: lambda: storage})
+
+
+def test_bucketed_keys():
+    key = file_key(1, "resumes", "cv.pdf")
+    assert key == f"1/resumes/{file_bucket('cv.pdf')}/cv.pdf"
+    assert len(file_bucket("cv.pdf")) == 2
+    assert parse_file_key(key) == (1, "resumes", "cv.pdf")
+    assert parse_file_key("1/resumes/cv.pdf") == (1, "resumes", "cv.pdf")  # Flat layout
+    assert parse_file_key("thumbnails/ab/abcdef/160.webp") is None
+    assert parse_file_key("1/resumes/zz/cv.pdf") is None  # Wrong bucket
+
+    buckets = {file_bucket(f"20260101_000000_scan_{i}.jpg") for i in range(5000)}
+    assert len(buckets) == 256
+
+
+def test_reserve_and_release(users):
+    with users() as db:
+        assert get_usage(db, 1) == (0, 0)
+        reserve(db, 1, 600, quota=1000)
+        reserve(db, 1, 400, quota=1000)
+        assert get_usage(db, 1) == (1000, 2)
+        with pytest.raises(QuotaExceeded) as exceeded:
+            reserve(db, 1, 1, quota=1000)
+        assert exceeded.value.bytes_used == 1000
+        assert get_usage(db, 1) == (1000, 2)
+
+        release(db, 1, 400)
+        assert get_usage(db, 1) == (600, 1)
+        reserve(db, 2, 100)
+        release(db, 2, 500)  # A file stored before it was counted
+        release(db, 2, 500)
+        assert get_usage(db, 2) == (0, 0)
+
+        with pytest.raises(OSError):
+            with reserved(db, 1, 100, quota=1000):
+                raise OSError("disk full")
+        assert get_usage(db, 1) == (600, 1)  # Failed write gave the reservation back
+
+
+def test_concurrent_reservations_respect_quota(file_engine):
+    factory = sessionmaker(bind=file_engine)  # Separate connections, so sessions really are concurrent
+    _add_users(factory)
+    accepted = []
+    barrier = threading.Barrier(8)
+
+    def upload_one():
+        with factory() as db:
+            barrier.wait()
+            try:
+                reserve(db, 1, 300, quota=1000)
+                accepted.append(1)
+            except QuotaExceeded:
+                pass
+
+    threads = [threading.Thread(target=upload_one) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with factory() as db:
+        assert len(accepted) == 3
+        assert get_usage(db, 1) == (900, 3)
+
+
+def test_migration_moves_flat_files_and_recounts(users, engine, storage):
+    storage.save("1/resumes/old.pdf", io.BytesIO(b"a" * 100))
+    storage.save("2/images/old.jpg", io.BytesIO(b"b" * 50))
+    storage.save(file_key(1, "documents", "new.pdf"), io.BytesIO(b"c" * 10))
+    storage.save("thumbnails/ab/abcdef/160.webp", io.BytesIO(b"thumb"))
+
+    moved, totals = migrate_layout(storage, dry_run=True)
+    assert moved == 2 and storage.stat("1/resumes/old.pdf") is not None
+
+    moved, totals = migrate_layout(storage)
+    assert moved == 2
+    assert totals == {1: (110, 2), 2: (50, 1)}
+    assert storage.stat("1/resumes/old.pdf") is None
+    assert storage.stat(file_key(1, "resumes", "old.pdf")).size == 100
+    assert migrate_layout(storage)[0] == 0  # Nothing left to move
+
+    with users() as db:
+        reserve(db, 1, 9999)  # Drifted counter
+    with engine.begin() as connection:
+        replace_usage(connection, totals)
+    with users() as db:
+        assert get_usage(db, 1) == (110, 2)
+        assert get_usage(db, 2) == (50, 1)
+
+
+def test_usage_migration_counts_existing_uploads(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    get_storage.cache_clear()
+    engine = create_engine(f"sqlite:///{tmp_path / 'usage.db'}")
+    try:
+        storage = get_storage()
+        storage.save("1/resumes/old.pdf", io.BytesIO(b"a" * 100))
+        storage.save("7/images/gone.jpg", io.BytesIO(b"b" * 50))  # User since deleted
+
+        with engine.connect() as connection:
+            config = alembic_config(connection)
+            command.upgrade(config, "0003")
+            connection.execute(User.__table__.insert().values(
+                id=1, email="one@example.com", username="one", hashed_password="x"
+            ))
+            connection.commit()
+            command.upgrade(config, "head")
+            connection.commit()
+
+        with sessionmaker(bind=engine)() as db:
+            assert get_usage(db, 1) == (100, 1)
+            assert get_usage(db, 7) == (0, 0)
+    finally:
+        get_storage.cache_clear()
+        engine.dispose()
+
+
+def test_routes_count_uploads_and_deletes(upload_app, storage, asgi_client, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_QUOTA_BYTES", 1000)
+    storage.save("1/resumes/legacy.pdf", io.BytesIO(b"x" * 10))  # Not migrated yet
+
+    async def run():
+        async with asgi_client(upload_app) as client:
+            response = await client.post("/api/upload/resume", files={"file": ("cv.pdf", b"%" * 700, "application/pdf")})
+            assert response.status_code == 200, response.text
+            usage = (await client.get("/api/upload/usage")).json()
+            assert usage == {"bytes_used": 700, "file_count": 1, "quota_bytes": 1000}
+
+            over = await client.post("/api/upload/resume", files={"file": ("cv2.pdf", b"%" * 400, "application/pdf")})
+            assert over.status_code == 413
+            batch = (await client.post("/api/upload/documents", files=[
+                ("files", ("a.pdf", b"%" * 200, "application/pdf")),
+                ("files", ("b.pdf", b"%" * 200, "application/pdf")),
+            ])).json()
+            assert [item["success"] for item in batch] == [True, False]
+
+            listed = (await client.get("/api/upload/list")).json()["files"]
+            names = sorted(item["file_name"].rsplit("_", 1)[-1] for item in listed)
+            assert names == ["a.pdf", "cv.pdf", "legacy.pdf"]
+            legacy = await client.get("/api/upload/files/resumes/legacy.pdf")
+            assert legacy.status_code == 200 and legacy.content == b"x" * 10
+
+            document = next(item for item in listed if item["file_name"].endswith("_cv.pdf"))
+            assert (await client.delete(document["download_url"])).status_code == 204
+            assert (await client.get(document["download_url"])).status_code == 404
+            assert (await client.delete(document["download_url"])).status_code == 404
+            usage = (await client.get("/api/upload/usage")).json()
+            assert usage["bytes_used"] == 200 and usage["file_count"] == 1
+
+    asyncio.run(run())
+
+
+def test_same_name_uploads_keep_separate_files(upload_app, asgi_client):
+    """Uploads of one name in the same second each get their own key"""
+    async def run():
+        async with asgi_client(upload_app) as client:
+            for _ in range(3):
+                response = await client.post("/api/upload/resume", files={"file": ("cv.pdf", b"%" * 100, "application/pdf")})
+                assert response.status_code == 200, response.text
+            listed = (await client.get("/api/upload/list")).json()["files"]
+            usage = (await client.get("/api/upload/usage")).json()
+            assert len(listed) == usage["file_count"] == 3
+            assert usage["bytes_used"] == sum(item["file_size"] for item in listed) == 300
+
+    asyncio.run(run())
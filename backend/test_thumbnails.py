@@ -0,0 +1,131 @@
+import asyncio
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+from app.api.routes import upload
+from app.core.config import settings
+from app.models import User
+from app.services.storage import get_storage
+from app.services.thumbnails import ThumbnailPipeline, content_hash, get_thumbnail_pipeline, render_derivatives
+
+
+def _jpeg(width: int, height: int, orientation: int = 1) -> bytes:
+    image = Image.new("RGB", (width, height), (200, 40, 40))
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    exif[0x010F] = "Camera maker"
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=95, exif=exif)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    """Uploads and derivatives go to a temporary directory"""
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(upload, "UPLOAD_DIR", tmp_path)
+    get_storage.cache_clear()
+    get_thumbnail_pipeline.cache_clear()
+    yield tmp_path
+    get_thumbnail_pipeline().shutdown()
+    get_thumbnail_pipeline.cache_clear()
+    get_storage.cache_clear()
+
+
+def test_render_resizes_rotates_and_strips_metadata(tmp_path):
+    source = tmp_path / "photo.jpg"
+    source.write_bytes(_jpeg(3000, 2000, orientation=6))  # Stored landscape, displayed portrait
+    target = tmp_path / "out"
+
+    assert render_derivatives(str(source), str(target), [160, 480, 960], 80) == [160, 480, 960]
+    for width in (160, 480, 960):
+        with Image.open(target / f"{width}.webp") as derivative:
+            assert derivative.format == "WEBP"
+            assert derivative.size == (width, width * 3 // 2)
+            assert not derivative.getexif() and "icc_profile" not in derivative.info
+    assert (target / "160.webp").stat().st_size < source.stat().st_size / 10
+
+    # Never upscaled: a small image gets one derivative at its own width
+    small = tmp_path / "small.png"
+    Image.new("RGBA", (300, 200)).save(small)
+    assert render_derivatives(str(small), str(tmp_path / "small"), [160, 480, 960], 80) == [160, 300]
+
+
+def test_upload_schedules_thumbnails_and_serves_them(upload_dir, session_factory, make_app, asgi_client):
+    with session_factory() as db:
+        db.add(User(id=7, email="u@example.com", username="u", hashed_password="x"))
+        db.commit()
+    app = make_app((upload.router, "/api/upload"), user_id=7)
+    content = _jpeg(2400, 1600)
+
+    async def run():
+        async with asgi_client(app) as client:
+            response = await client.post(
+                "/api/upload/documents", files=[("files", ("photo.jpg", content, "image/jpeg"))]
+            )
+            assert response.status_code == 200, response.text
+            uploaded = response.json()[0]
+            assert uploaded["content_hash"] == content_hash(uploaded["file_path"])
+
+            # Served as soon as the render finishes, with an immutable cache header
+            thumbnail = await client.get(uploaded["thumbnails"]["480"])
+            assert thumbnail.status_code == 200
+            assert thumbnail.headers["content-type"] == "image/webp"
+            assert "immutable" in thumbnail.headers["cache-control"]
+            assert len(thumbnail.content) < len(content) / 5
+
+            # Same bytes again: the cached set is reused
+            assert get_thumbnail_pipeline().schedule(uploaded["file_path"], uploaded["content_hash"]) is None
+
+            assert (await client.get(f"/api/upload/thumbnails/{'0' * 64}/480.webp")).status_code == 404
+            assert (await client.get(f"/api/upload/thumbnails/{uploaded['content_hash']}/123.webp")).status_code == 404
+
+    asyncio.run(run())
+
+
+def test_pool_replaced_after_worker_dies(tmp_path, wait_until):
+    """A killed worker breaks the pool; the next render starts a new one"""
+    pipeline = ThumbnailPipeline(tmp_path / "derivatives", [160], workers=1)
+    sources = []
+    for i in range(2):
+        sources.append(tmp_path / f"photo{i}.jpg")
+        sources[-1].write_bytes(_jpeg(400 + i, 300))
+    try:
+        assert pipeline.schedule(str(sources[0]), "a" * 64).result(timeout=30) == [160]
+
+        broken = pipeline._executor
+        for process in list(broken._processes.values()):
+            process.kill()  # As the OOM killer would
+        assert wait_until(lambda: broken._broken, timeout=10)
+
+        assert pipeline.schedule(str(sources[1]), "b" * 64).result(timeout=30) == [160]
+        assert pipeline._executor is not broken
+        assert pipeline.available("b" * 64) == [160]
+    finally:
+        pipeline.shutdown()
+
+
+def test_concurrent_uploads_share_one_render(tmp_path, wait_until):
+    """Threads scheduling the same content at once get the same future"""
+    pipeline = ThumbnailPipeline(tmp_path / "derivatives", [160, 480], workers=2)
+    source = tmp_path / "photo.jpg"
+    source.write_bytes(_jpeg(2400, 1600))
+    start = threading.Barrier(8)
+
+    def schedule():
+        start.wait()
+        return pipeline.schedule(str(source), "c" * 64)
+
+    try:
+        with ThreadPoolExecutor(8) as threads:
+            futures = list(threads.map(lambda _: schedule(), range(8)))
+        scheduled = {id(future) for future in futures if future is not None}
+        assert len(scheduled) == 1
+        assert next(f for f in futures if f is not None).result(timeout=30) == [160, 480]
+        assert wait_until(lambda: not pipeline._pending)
+    finally:
+        pipeline.shutdown()
@@ -0,0 +1,223 @@
+import asyncio
+import json
+import multiprocessing
+import os
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.api.routes import chat
+from app.core import tracing
+from app.core.config import settings
+from app.core.metrics import get_histogram
+from app.core.ratelimit import get_rate_limiter
+from app.core.security import create_access_token
+from app.core.tracing import TracingMiddleware, instrument_sqlalchemy, parse_traceparent, span, summarize
+from app.models.portfolio import Portfolio, PortfolioVisibility
+from app.models.user import User
+from app.services.llm import LLMClient, get_llm
+from app.services.llm_scheduler import LLMScheduler
+from app.services.message_writer import MessageWriter, get_message_writer
+
+INCOMING = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+
+@pytest.fixture
+def tracing_settings(monkeypatch):
+    """``tracing_settings(TRACING_ENABLED=False)``: patch settings and rebuild the tracer from them"""
+
+    def configure(**values):
+        for name, value in values.items():
+            monkeypatch.setattr(settings, name, value)
+        tracing.get_tracer.cache_clear()
+
+    yield configure
+    tracing.get_tracer().close()
+    tracing.get_tracer.cache_clear()
+
+
+@pytest.fixture
+def traced(tmp_path, tracing_settings) -> str:
+    """A tracer exporting every span to a JSON lines file; returns its path"""
+    path = str(tmp_path / "traces.jsonl")
+    tracing_settings(TRACING_ENABLED=True, TRACING_EXPORTER="file", TRACING_FILE=path, TRACING_SAMPLE_RATE=1.0)
+    return path
+
+
+def _spans(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+class SlowLLM(LLMClient):
+    """A real client whose upstream answer starts after a short wait"""
+
+    def __init__(self):
+        super().__init__("sk-test", "gpt-test", 0.7, 100, scheduler=LLMScheduler(2))
+
+    async def _complete(self, messages):
+        await asyncio.sleep(0.02)
+        for word in ("Five", " years", " of", " Python."):
+            yield word
+
+
+def test_traceparent_parsing():
+    assert parse_traceparent(INCOMING) == ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", True)
+    assert parse_traceparent(INCOMING[:-2] + "00")[2] is False
+    assert parse_traceparent("01-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01-future") is not None
+    for invalid in (
+        None, "", "garbage",
+        "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01-extra",  # Version 00 has no extra fields
+        "ff-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01",
+        "00-00000000000000000000000000000000-00f067aa0ba902b7-01",
+        "00-4bf92f3577b34da6a3ce929d0e0e4736-0000000000000000-01",
+        "00-4BF92F3577B34DA6A3CE929D0E0E4736-00f067aa0ba902b7-01",
+    ):
+        assert parse_traceparent(invalid) is None, invalid
+
+
+def test_spans_nest_across_threads(traced):
+    def work():
+        with span("in_thread"):
+            pass
+
+    async def run():
+        with span("outer") as outer:
+            headers = tracing.trace_headers()
+            await asyncio.to_thread(work)
+            timer = tracing.start_span("detached")
+            assert tracing.current_span() is outer  # start_span doesn't make it current
+            timer.end()
+        assert tracing.current_span() is None
+        return outer, headers
+
+    outer, headers = asyncio.run(run())
+    spans = {record["name"]: record for record in _spans(traced)}
+
+    assert headers == {"traceparent": outer.traceparent()}
+    assert spans["in_thread"]["parent_id"] == spans["detached"]["parent_id"] == outer.span_id
+    assert {record["trace_id"] for record in spans.values()} == {outer.trace_id}
+    assert spans["outer"]["parent_id"] is None
+
+
+def _export_spans(path: str, count: int) -> None:
+    exporter = tracing.FileExporter(path)
+    for i in range(count):
+        exporter.export(tracing.Span("worker", "a" * 32, None, True, None, {"padding": "x" * 2000, "i": i}))
+    os._exit(0)  # Like a killed worker: no close()
+
+
+def test_file_exporter_across_workers(tmp_path):
+    path = str(tmp_path / "traces.jsonl")
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_export_spans, args=(path, 200)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert len(_spans(path)) == 800
+
+
+def test_middleware_continues_incoming_trace(engine, session_factory, traced):
+    instrument_sqlalchemy()
+
+    def session():
+        with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+
+    @app.get("/ping")
+    def ping(db: Session = Depends(session)):
+        return {"value": db.execute(text("SELECT 1")).scalar()}
+
+    queries = get_histogram("span.db.query")
+    before = queries.snapshot()["count"]
+    with engine.connect() as conn:  # Untraced work (startup, the message writer) makes no spans
+        conn.execute(text("SELECT 1"))
+    assert queries.snapshot()["count"] == before
+
+    with TestClient(app) as client:
+        response = client.get("/ping", headers={"traceparent": INCOMING, "tracestate": "vendor=1"})
+        assert response.json() == {"value": 1}
+    spans = {record["name"]: record for record in _spans(traced)}
+
+    root = spans["http.request"]
+    assert root["trace_id"] == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert root["parent_id"] == "00f067aa0ba902b7"
+    assert root["attributes"]["status"] == 200
+    assert response.headers["traceresponse"] == f"00-{root['trace_id']}-{root['span_id']}-01"
+    assert spans["db.query"]["trace_id"] == root["trace_id"]
+    assert spans["db.query"]["attributes"]["operation"] == "SELECT"
+
+
+@pytest.fixture
+def chat_app(engine, session_factory, make_app):
+    """The chat router with a slow LLM and one public portfolio; yields the app, a token and the writer"""
+    with session_factory() as db:
+        user = User(email="trace@example.com", username="trace", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add(Portfolio(
+            user_id=user.id, title="Jane Doe", bio="Backend engineer", slug="jane",
+            visibility=PortfolioVisibility.PUBLIC,
+        ))
+        db.commit()
+        token = create_access_token({"sub": str(user.id)})
+
+    writer = MessageWriter(engine, flush_interval=0.01)
+    app = make_app((chat.router, "/api/chat"), overrides={get_llm: SlowLLM, get_message_writer: lambda: writer})
+    app.add_middleware(TracingMiddleware)
+    get_rate_limiter.cache_clear()
+    yield app, token, writer
+    writer.stop()  # Before the engine fixture drops the database
+
+
+def _ask(app: FastAPI, token: str, headers: dict) -> dict:
+    """Send one chat message and return the final "done" frame"""
+    with TestClient(app) as client:
+        with client.websocket_connect("/api/chat/ws", headers=headers) as ws:
+            ws.send_json({"type": "auth", "token": token})
+            ws.receive_json()
+            ws.send_json({"type": "start", "slug": "jane"})
+            ws.receive_json()
+            ws.send_json({"type": "message", "content": "How much Python?"})
+            while True:
+                frame = ws.receive_json()
+                if frame["type"] == "done":
+                    return frame
+
+
+def test_chat_pipeline_stages(chat_app, traced):
+    app, token, _ = chat_app
+    first_token = get_histogram("span.llm.first_token").snapshot()["count"]
+    _ask(app, token, {"traceparent": INCOMING})
+    records = _spans(traced)
+    report = summarize([traced])
+
+    by_name = {record["name"]: record for record in records}
+    stages = (
+        "chat.auth", "chat.open", "chat.retrieval", "chat.prompt_assembly", "chat.message",
+        "chat.persist_user", "llm.queue_wait", "llm.completion", "llm.first_token", "chat.persist_reply",
+    )
+    for stage in stages:
+        assert stage in by_name, stage
+        assert report[stage]["count"] >= 1
+    assert {record["trace_id"] for record in records} == {"4bf92f3577b34da6a3ce929d0e0e4736"}
+    assert by_name["llm.first_token"]["parent_id"] == by_name["llm.completion"]["span_id"]
+    assert by_name["llm.completion"]["parent_id"] == by_name["chat.message"]["span_id"]
+    assert by_name["llm.completion"]["attributes"]["tokens"] == 4
+    assert by_name["chat.message"]["attributes"]["outcome"] == "ok"
+    assert by_name["llm.first_token"]["duration_ms"] >= 15
+    assert get_histogram("span.llm.first_token").snapshot()["count"] == first_token + 1
+
+
+def test_chat_without_tracing(chat_app, tracing_settings):
+    app, token, _ = chat_app
+    tracing_settings(TRACING_ENABLED=False)
+    done = _ask(app, token, {})
+    assert done == {"type": "done", "conversation_id": done["conversation_id"]}